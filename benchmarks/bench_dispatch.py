@@ -0,0 +1,48 @@
+# PYTHONPATH=. python -m benchmarks.bench_dispatch [count]
+import sys
+import time
+import timeit
+
+from openctp_client.clients import SimpleCtpClient, SimpleCtpClientEvent
+from openctp_client.objects import *
+from openctp_client.objects.responses import *
+
+
+class LegacyDispatchClient(SimpleCtpClient):
+    """the dict lookup plus list iteration dispatch replaced by the compiled dispatch table"""
+    
+    def __init__(self, config: CtpConfig) -> None:
+        super().__init__(config)
+        self._ctp_callback[CtpMethod.OnRtnDepthMarketData] = self._on_tick
+    
+    def _process_rsp(self, rsp: CtpResponse) -> None:
+        if rsp.method in self._ctp_callback:
+            self._ctp_callback[rsp.method](rsp)
+    
+    def _on_tick(self, rsp: RtnDepthMarketData) -> None:
+        for callback in self._event_callback[SimpleCtpClientEvent.on_tick]:
+            callback(rsp.DepthMarketData)
+
+
+def consume(client: SimpleCtpClient, rsp: CtpResponse, count: int) -> float:
+    """put count responses into the queue and return the seconds used by _consume_rsp"""
+    for _ in range(count):
+        client._queue.put(rsp)
+    client._queue.put(None)
+    start = time.perf_counter()
+    client._consume_rsp()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rsp = RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="rb2401", LastPrice=3800.0))
+    for client_type in (LegacyDispatchClient, SimpleCtpClient):
+        client = client_type(CtpConfig())
+        ticks = []
+        client.on_event(SimpleCtpClientEvent.on_tick, ticks.append)
+        seconds = consume(client, rsp, count)
+        assert len(ticks) == count
+        print(f"{client_type.__name__ + '._consume_rsp':<40} {count} ticks {seconds:8.3f} s {seconds / count * 1e6:8.3f} us/tick")
+        seconds = min(timeit.repeat(lambda: client._process_rsp(rsp), number=count // 10, repeat=5))
+        print(f"{client_type.__name__ + '._process_rsp':<40} {seconds / (count // 10) * 1e6:8.3f} us/tick")
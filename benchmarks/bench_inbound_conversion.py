@@ -0,0 +1,15 @@
+# PYTHONPATH=. python -m benchmarks.bench_inbound_conversion
+from openctp_client.objects import *
+from benchmarks.utils import bench, sample_ctp_object
+
+
+if __name__ == "__main__":
+    for field_type in (DepthMarketDataField, OrderField, TradeField):
+        obj = sample_ctp_object(field_type)
+        assert field_type.from_ctp_object(obj) == field_type.construct_from_ctp_object(obj)
+        validated = bench(f"{field_type.__name__}.from_ctp_object", lambda: field_type.from_ctp_object(obj))
+        trusted = bench(f"{field_type.__name__}.construct_from_ctp_object", lambda: field_type.construct_from_ctp_object(obj))
+        print(f"{'speedup':<60} {validated / trusted:8.2f} x")
+    
+    obj = sample_ctp_object(DepthMarketDataField)
+    bench("DepthMarketDataSnapshot.from_ctp_object", lambda: DepthMarketDataSnapshot.from_ctp_object(obj))
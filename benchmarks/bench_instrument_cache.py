@@ -0,0 +1,25 @@
+# PYTHONPATH=. python -m benchmarks.bench_instrument_cache [count]
+import sys
+import tempfile
+import time
+
+from openctp_client.objects.fields import InstrumentField
+from openctp_client.stores import InstrumentCache
+
+from .utils import sample_field
+
+
+def make_instruments(count: int) -> list[InstrumentField]:
+    instrument = sample_field(InstrumentField)
+    return [instrument.model_copy(update={"InstrumentID": f"i{i}", "ExpireDate": f"2024{i % 12 + 1:02d}15"}) for i in range(count)]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    with tempfile.TemporaryDirectory() as root:
+        InstrumentCache(root).update("20231212", make_instruments(count))
+        cache = InstrumentCache(root)
+        start = time.perf_counter()
+        assert cache.load("20231212")
+        seconds = time.perf_counter() - start
+        print(f"{'InstrumentCache.load':<60} {len(cache)} instruments {seconds:8.3f} s {len(cache) / seconds:12,.0f} instruments/s")
@@ -0,0 +1,30 @@
+# PYTHONPATH=. python -m benchmarks.bench_md_capacity [instruments]
+import sys
+
+from openctp_client.clients import SimpleCtpClient, SimpleCtpClientEvent
+from openctp_client.objects import *
+from openctp_client.tools import LoadGenerator
+
+
+def report(name: str, rate: float, reports: list[dict[str, float]]) -> None:
+    print(f"{name:<60} max {rate:10,.0f} ticks/s")
+    for step in reports:
+        print(
+            f"    {step['rate']:10,.0f} ticks/s backlog {step['backlog']:8d} utilization {step['utilization']:5.2f}"
+            f" p50 {step['p50_us']:10.1f} us p99 {step['p99_us']:10.1f} us max {step['max_us']:10.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    instruments = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    client = SimpleCtpClient(CtpConfig(trusted_inbound=True))
+    generator = LoadGenerator(client.mdapi, instruments)
+
+    client.mdapi.raw_callback = generator.track()
+    report("MdAPI raw callback in the spi thread", *generator.find_max_rate(start=5000, step=0.5))
+
+    client.mdapi.raw_callback = None
+    client.on_event(SimpleCtpClientEvent.on_tick, generator.track())
+    client._start_process()
+    report("SimpleCtpClient on_tick through the queue", *generator.find_max_rate(start=5000, step=0.5))
+    client.disconnect()
@@ -0,0 +1,27 @@
+# PYTHONPATH=. python -m benchmarks.bench_order_rate_limiter
+from openctp_client.apis import TdAPI, OrderRateLimiter
+from openctp_client.clients import OrderTemplates
+from openctp_client.objects import *
+from openctp_client.objects.enums import Direction, Offset
+from benchmarks.utils import bench
+
+
+class NullTraderApi(object):
+    
+    def ReqOrderInsert(self, req, req_id):
+        return 0
+
+
+if __name__ == "__main__":
+    td_api = TdAPI(CtpConfig())
+    td_api._api = NullTraderApi()
+    req = OrderTemplates("9999", "000001").fill("SHFE", "rb2401", Direction.Buy, Offset.Open, 3800.0, 1, "1", 1)
+    
+    baseline = bench("TdAPI.ReqOrderInsert without limiter", lambda: td_api.ReqOrderInsert(req, 1))
+    # the rates are high enough that every order is under the limit
+    td_api.order_rate_limiter = OrderRateLimiter(account_rate=1e9)
+    account = bench("TdAPI.ReqOrderInsert with account limit", lambda: td_api.ReqOrderInsert(req, 1))
+    td_api.order_rate_limiter = OrderRateLimiter(account_rate=1e9, instrument_rate=1e9, exchange_rate=1e9)
+    all_limits = bench("TdAPI.ReqOrderInsert with account, instrument, exchange limits", lambda: td_api.ReqOrderInsert(req, 1))
+    print(f"{'added by account limit':<60} {account - baseline:8.3f} us")
+    print(f"{'added by all limits':<60} {all_limits - baseline:8.3f} us")
@@ -0,0 +1,54 @@
+# PYTHONPATH=. python -m benchmarks.bench_outbound_conversion
+from openctp_client.apis import TdAPI
+from openctp_client.objects import *
+from benchmarks.utils import bench
+
+
+class NullTraderApi(object):
+    
+    def ReqOrderInsert(self, req, req_id):
+        return 0
+
+
+def reflective_ctp_object(field: CtpField):
+    """the model_dump based conversion replaced by the generated copiers"""
+    obj = field._ctp_type_()
+    for key, value in field.model_dump().items():
+        if value is not None:
+            setattr(obj, key, value)
+    return obj
+
+
+def same_ctp_object(field_type: type[CtpField], a, b) -> bool:
+    """the swig structs have no __eq__, compare them field by field"""
+    return all(getattr(a, name) == getattr(b, name) for name in field_type.model_fields)
+
+
+if __name__ == "__main__":
+    input_order = InputOrderField(
+        BrokerID="9999",
+        InvestorID="000001",
+        ExchangeID="SHFE",
+        InstrumentID="rb2401",
+        CombOffsetFlag="0",
+        CombHedgeFlag="1",
+        Direction="0",
+        VolumeTotalOriginal=1,
+        IsAutoSuspend=0,
+        IsSwapOrder=0,
+        OrderPriceType="2",
+        TimeCondition="3",
+        VolumeCondition="1",
+        ContingentCondition="1",
+        ForceCloseReason="0",
+        LimitPrice=3800.0,
+        StopPrice=0,
+    )
+    assert same_ctp_object(InputOrderField, reflective_ctp_object(input_order), input_order.ctp_object())
+    reflective = bench("InputOrderField reflective ctp_object", lambda: reflective_ctp_object(input_order))
+    generated = bench("InputOrderField.ctp_object", input_order.ctp_object)
+    print(f"{'speedup':<60} {reflective / generated:8.2f} x")
+    
+    td_api = TdAPI(CtpConfig())
+    td_api._api = NullTraderApi()
+    bench("TdAPI.ReqOrderInsert", lambda: td_api.ReqOrderInsert(input_order, 1))
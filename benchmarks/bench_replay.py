@@ -0,0 +1,47 @@
+# PYTHONPATH=. python -m benchmarks.bench_replay [count]
+import sys
+import tempfile
+import time
+
+from openctp_client.apis import MdAPI
+from openctp_client.objects import *
+from openctp_client.objects.fields import DepthMarketDataField
+from openctp_client.stores import TickJournal, TickJournalReader
+from openctp_client.tools import Replayer
+
+from .utils import sample_ctp_object
+
+
+def write_journal(root: str, count: int, instruments: int = 500) -> TickJournalReader:
+    journal = TickJournal(root)
+    tick = sample_ctp_object(DepthMarketDataField)
+    tick.TradingDay = tick.ActionDay = "20231212"
+    tick.UpdateTime = "09:00:00"
+    tick.UpdateMillisec = 0
+    for i in range(count):
+        tick.InstrumentID = f"i{i % instruments}"
+        journal.on_tick(tick)
+    journal.close()
+    return TickJournalReader(root, "20231212")
+
+
+def report(name: str, stats: dict[str, float]) -> None:
+    print(f"{name:<60} {stats['events']} ticks {stats['elapsed']:8.3f} s {stats['rate']:12,.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as root:
+        reader = write_journal(root, count)
+        start = time.perf_counter()
+        snapshots = sum(1 for _ in reader.snapshots())
+        seconds = time.perf_counter() - start
+        print(f"{'TickJournalReader.snapshots':<60} {snapshots} ticks {seconds:8.3f} s {snapshots / seconds:12,.0f} ticks/s")
+
+        md_api = MdAPI(CtpConfig())
+        md_api.raw_callback = lambda snapshot: None
+        report("Replayer fast, raw callback", Replayer(md_api).replay_journal(reader))
+        md_api.raw_callback = None
+        md_api.callback = lambda rsp: None
+        md_api.config.trusted_inbound = True
+        report("Replayer fast, callback of trusted DepthMarketDataField", Replayer(md_api).replay_journal(reader))
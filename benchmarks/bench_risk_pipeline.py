@@ -0,0 +1,27 @@
+# PYTHONPATH=. python -m benchmarks.bench_risk_pipeline
+from openctp_client.clients import OrderTemplates
+from openctp_client.objects import *
+from openctp_client.objects.enums import Direction, Offset
+from openctp_client.risk import RiskPipeline, MaxOrderSize, MaxPosition, Quotes, PriceBand, FatFinger, SelfTrade
+from openctp_client.stores import OrderTracker, PositionKeeper
+from benchmarks.utils import bench
+
+
+if __name__ == "__main__":
+    keeper = PositionKeeper({"rb2401": InstrumentField(InstrumentID="rb2401", VolumeMultiple=10)})
+    keeper.on_trade(TradeField(ExchangeID="SHFE", TradeID="T1", InstrumentID="rb2401", Direction="0", OffsetFlag="0", Price=3800.0, Volume=3))
+    tracker = OrderTracker()
+    tracker.on_order(OrderField(FrontID=1, SessionID=1, OrderRef="1", ExchangeID="SHFE", OrderSysID="S1", InstrumentID="rb2401", Direction="1", LimitPrice=3820.0, OrderStatus="3"))
+    quotes = Quotes()
+    quotes.on_tick(DepthMarketDataField(InstrumentID="rb2401", LastPrice=3800.0, LowerLimitPrice=3500.0, UpperLimitPrice=4100.0))
+    checks = (MaxOrderSize(10), MaxPosition(keeper, 100, order_tracker=tracker), PriceBand(quotes), FatFinger(quotes, 0.05), SelfTrade(tracker))
+    req = OrderTemplates("9999", "000001").fill("SHFE", "rb2401", Direction.Buy, Offset.Open, 3810.0, 1, "1", 1)
+    
+    for check in checks:
+        bench(f"{check.name}", lambda: check(req))
+    pipeline = RiskPipeline(checks)
+    bench("RiskPipeline.check, all passed", lambda: pipeline.check(req))
+    timed = RiskPipeline(checks, timing=True)
+    bench("RiskPipeline.check with timing, all passed", lambda: timed.check(req))
+    for name, stats in timed.stats.items():
+        print(f"{name:<60} {stats['total_ns'] / stats['calls'] / 1000:8.3f} us")
@@ -0,0 +1,41 @@
+# PYTHONPATH=. python -m benchmarks.bench_rsp_queue [count]
+import queue
+import sys
+import threading
+import time
+
+from openctp_client.clients import BatchQueue, RingBufferQueue
+
+
+class QueueAdapter(object):
+    """queue.Queue taken one item per get, as the consumer did before batching"""
+    
+    def __init__(self) -> None:
+        self._queue = queue.Queue()
+        self.put = self._queue.put
+    
+    def get_batch(self, max_items: int) -> list:
+        return [self._queue.get()]
+
+
+def transfer(rsp_queue, count: int, batch_size: int = 1024) -> float:
+    """seconds used to move count items from a producer thread to the consumer"""
+    def produce():
+        for i in range(count):
+            rsp_queue.put(i)
+    
+    producer = threading.Thread(target=produce)
+    start = time.perf_counter()
+    producer.start()
+    received = 0
+    while received < count:
+        received += len(rsp_queue.get_batch(batch_size))
+    producer.join()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for rsp_queue in (QueueAdapter(), BatchQueue(), RingBufferQueue()):
+        seconds = transfer(rsp_queue, count)
+        print(f"{type(rsp_queue).__name__:<30} {count} items {seconds:8.3f} s {seconds / count * 1e6:8.3f} us/item")
@@ -0,0 +1,75 @@
+# PYTHONPATH=. python -m benchmarks.compare [save] [pytest args]
+"""
+Gate of tests/benchmarks against the baseline of this machine, which is saved by the save argument.
+The min of the rounds is compared, and a benchmark slower than the baseline by more than BENCHMARK_THRESHOLD percent
+is run again up to BENCHMARK_RETRIES times keeping its best min, because a shared machine is often slower for a few seconds
+and every benchmark measured meanwhile is slower, even its min. It fails only if a benchmark is still slower after the retries.
+"""
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+STORAGE = os.path.join("tests", "benchmarks", "baselines")
+OPTIONS = [
+    "--benchmark-only",
+    f"--benchmark-storage=file://./{STORAGE}",
+    "--benchmark-warmup=on",
+    "--benchmark-disable-gc",
+    "--benchmark-min-rounds=20",
+    "--benchmark-max-time=0.25",
+]
+
+
+def latest_baseline() -> str | None:
+    paths = glob.glob(os.path.join(STORAGE, "*", "*_baseline.json"))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def load_mins(path: str) -> dict[str, float]:
+    with open(path) as f:
+        return {benchmark["fullname"]: benchmark["stats"]["min"] for benchmark in json.load(f)["benchmarks"]}
+
+
+def run(args: list[str]) -> dict[str, float]:
+    """run the benchmarks selected by args, return the min of each"""
+    with tempfile.TemporaryDirectory() as temp:
+        path = os.path.join(temp, "benchmarks.json")
+        subprocess.run([sys.executable, "-m", "pytest", *OPTIONS, f"--benchmark-json={path}", *args], check=True)
+        return load_mins(path)
+
+
+def regressions(baseline: dict[str, float], current: dict[str, float], threshold: float) -> list[str]:
+    return [name for name, value in current.items() if name in baseline and value > baseline[name] * (1 + threshold)]
+
+
+def main(argv: list[str]) -> int:
+    if argv[:1] == ["save"]:
+        subprocess.run([sys.executable, "-m", "pytest", "tests/benchmarks", *OPTIONS, "--benchmark-save=baseline", *argv[1:]], check=True)
+        return 0
+    baseline_path = latest_baseline()
+    if baseline_path is None:
+        print(f"no benchmark baseline in {STORAGE}, record one by bash scripts/benchmark.sh save, the comparison is skipped")
+        return 0
+    threshold = float(os.environ.get("BENCHMARK_THRESHOLD", "35").rstrip("%")) / 100
+    retries = int(os.environ.get("BENCHMARK_RETRIES", "3"))
+    baseline = load_mins(baseline_path)
+    current = run(["tests/benchmarks", *argv])
+    regressed = regressions(baseline, current, threshold)
+    for _ in range(retries):
+        if not regressed:
+            break
+        print(f"{len(regressed)} benchmarks are slower than {baseline_path}, run them again")
+        for name, value in run([*regressed, *argv]).items():
+            current[name] = min(current[name], value)
+        regressed = regressions(baseline, current, threshold)
+    for name in regressed:
+        print(f"{name} min {current[name] * 1e6:.2f} us, baseline {baseline[name] * 1e6:.2f} us, +{current[name] / baseline[name] - 1:.0%}")
+    print(f"{len(current) - len(regressed)} of {len(current)} benchmarks are within {threshold:.0%} of {baseline_path}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,34 @@
+import timeit
+import typing
+from typing import Any, Callable
+
+from openctp_client.objects.fields import CtpField
+
+
+def sample_value(field_type: type[CtpField], name: str) -> Any:
+    annotation = typing.get_args(field_type.model_fields[name].annotation)[0]
+    if annotation is int:
+        return 1
+    if annotation is float:
+        return 1.0
+    max_length = max(getattr(meta, "max_length", 2) for meta in annotation.__metadata__)
+    return "1" * (max_length - 1)
+
+
+def sample_ctp_object(field_type: type[CtpField]) -> Any:
+    """create a ctp object of field_type with every field filled"""
+    obj = field_type._ctp_type_()
+    for name in field_type.model_fields:
+        setattr(obj, name, sample_value(field_type, name))
+    return obj
+
+
+def sample_field(field_type: type[CtpField]) -> CtpField:
+    return field_type(**{name: sample_value(field_type, name) for name in field_type.model_fields})
+
+
+def bench(name: str, fn: Callable[[], Any], number: int = 100000, repeat: int = 5) -> float:
+    """print and return the best time per call in microseconds"""
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+    print(f"{name:<60} {best:8.3f} us")
+    return best
@@ -6,21 +6,11 @@ from openctp_client.objects.enums import CtpMethod
 from openctp_client.apis.td_api import TdAPI
 
 connected_event = threading.Event()
-settlement_event = threading.Event()
 
 def connected(login_info: RspUserLoginField, rsp_info: RspInfoField, request_id: int, is_last: bool):
     print("connected")
     connected_event.set()
 
-def on_settlement_info(settlement_info: SettlementInfoField, rsp_info: RspInfoField, request_id: int, is_last: bool):
-    if rsp_info and rsp_info.ErrorID != 0:
-        print(f"error {rsp_info.model_dump()}")
-    if settlement_info:
-        # pydantic这里的content是deepcopy的，不会存在ctp复用内存导致已经保存的数据被覆盖的问题
-        print(settlement_info.Content)
-    if is_last:
-        settlement_event.set()
-
 def on_settlement_confirm(settlement_info_confirm: SettlementInfoConfirmField, rsp_info: RspInfoField, request_id: int, is_last: bool):
     if rsp_info:
         print(f"settlement confirm error {rsp_info.model_dump()}")
@@ -40,7 +30,6 @@ config = CtpConfig(
 
 td_api = TdAPI(config=config)
 td_api.set_spi_callback(CtpMethod.OnRspUserLogin, connected)
-td_api.set_spi_callback(CtpMethod.OnRspQrySettlementInfo, on_settlement_info)
 td_api.set_spi_callback(CtpMethod.OnRspQrySettlementInfoConfirm, on_settlement_confirm)
 
 td_api.Connect()
@@ -51,8 +40,11 @@ qry_settlement_info = QrySettlementInfoField(
     InvestorID=config.user_id,
     TradingDay="20230803",
 )
-td_api.ReqQrySettlementInfo(qry_settlement_info)
-settlement_event.wait()
+# 结算单可能分成多个包返回，future在IsLast时返回所有的包，出错时抛出CtpException
+settlement_infos = td_api.query(td_api.ReqQrySettlementInfo, qry_settlement_info, timeout=10).result()
+for settlement_info in settlement_infos:
+    # pydantic这里的content是deepcopy的，不会存在ctp复用内存导致已经保存的数据被覆盖的问题
+    print(settlement_info.Content)
 ch = input("press to confirm settlement info\n")
 settlement_info_confirm = QrySettlementInfoConfirmField(
     BrokerID=config.broker_id,
@@ -14,16 +14,43 @@ class CThostFtdcMdSpi(object):
 
 
 class CThostFtdcMdApi(object):
+    """the requests are served by the current simulator of mock_openctp_ctp.simulator after Init, and return -1 before it"""
     
     @classmethod
     def CreateFtdcMdApi(cls, *args, **kwargs):
         return cls()
     
-    def RegisterSpi(self, *args, **kwargs):
-        pass
+    def __init__(self):
+        self._spi = None
+        self._session = None
+    
+    def RegisterSpi(self, spi, *args, **kwargs):
+        self._spi = spi
     
     def RegisterFront(self, *args, **kwargs):
         pass
+    
+    def Init(self):
+        from .simulator import current_simulator
+        self._session = current_simulator().connect_md(self._spi)
+    
+    def Release(self):
+        if self._session is not None:
+            self._session.simulator.disconnect(self._session)
+    
+    def Join(self):
+        if self._session is not None:
+            self._session.join()
+        return 0
+    
+    def ReqUserLogin(self, req, request_id):
+        return self._session.login(req, request_id) if self._session else -1
+    
+    def SubscribeMarketData(self, instrument_ids, request_id):
+        return self._session.subscribe(instrument_ids, request_id) if self._session else -1
+    
+    def UnSubscribeMarketData(self, instrument_ids, request_id):
+        return self._session.unsubscribe(instrument_ids, request_id) if self._session else -1
 
 
 class CThostFtdcDisseminationField(BaseModel):
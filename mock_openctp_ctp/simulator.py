@@ -0,0 +1,659 @@
+"""
+In-process simulated front for the mock apis.
+
+CThostFtdcMdApi and CThostFtdcTraderApi connect to the current Simulator when Init is called. Each api gets a session
+with its own spi thread, like the real SDK, and every spi method is called in that thread. The simulator:
+
+* answers ReqAuthenticate, ReqUserLogin and SubscribeMarketData,
+* streams synthetic depth market data of its instruments every tick_interval seconds,
+* matches ReqOrderInsert and ReqOrderAction against a price-time priority book of each instrument, the book has the
+  orders of every trader session plus a synthetic quote around the random walk price, with depth lots on each side,
+* answers the queries of instruments, orders and trades, and the other queries with an empty last response,
+  the positions and the trading account are not kept, so their queries are always empty.
+"""
+import bisect
+import itertools
+import logging
+import math
+import queue
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Iterable
+
+from . import mdapi, tdapi
+
+
+logger = logging.getLogger(__name__)
+
+# THOST_FTDC_D_*
+BUY = '0'
+SELL = '1'
+# THOST_FTDC_OPT_*
+ANY_PRICE = '1'
+# THOST_FTDC_TC_*
+IOC = '1'
+# THOST_FTDC_VC_*
+COMPLETE_VOLUME = '3'
+# THOST_FTDC_AF_*
+ACTION_DELETE = '0'
+# THOST_FTDC_OST_*
+ALL_TRADED = '0'
+PART_TRADED_QUEUEING = '1'
+PART_TRADED_NOT_QUEUEING = '2'
+NO_TRADE_QUEUEING = '3'
+NO_TRADE_NOT_QUEUEING = '4'
+CANCELED = '5'
+UNKNOWN = 'a'
+# THOST_FTDC_OSS_*
+INSERT_SUBMITTED = '0'
+ACCEPTED = '3'
+
+# the error ids of ctp
+ERROR_INVALID_LOGIN = 3
+ERROR_INVALID_FIELD = 15
+ERROR_INSTRUMENT_NOT_FOUND = 16
+ERROR_ORDER_NOT_FOUND = 25
+ERROR_ORDER_FINISHED = 26
+FRONT_ID = 1
+LEVELS = 5
+
+
+class SimulatedInstrument(object):
+    """instrument traded by the simulator, price is where the random walk starts"""
+
+    def __init__(self, instrument_id: str, exchange_id: str, price: float, price_tick: float = 1.0, volume_multiple: int = 10) -> None:
+        self.instrument_id = instrument_id
+        self.exchange_id = exchange_id
+        self.price = price
+        self.price_tick = price_tick
+        self.volume_multiple = volume_multiple
+
+
+DEFAULT_INSTRUMENTS = (
+    SimulatedInstrument("rb2401", "SHFE", 3800.0, 1.0, 10),
+    SimulatedInstrument("ag2406", "SHFE", 5800.0, 1.0, 15),
+    SimulatedInstrument("IF2312", "CFFEX", 3500.0, 0.2, 300),
+)
+
+
+class _Order(object):
+    __slots__ = ("session", "field", "buy", "price", "remaining")
+
+    def __init__(self, session: '_TraderSession', field: Any, buy: bool, price: float) -> None:
+        self.session = session
+        self.field = field
+        self.buy = buy
+        self.price = price
+        self.remaining = field.VolumeTotalOriginal
+
+
+class OrderBook(object):
+    """
+    Resting orders of one instrument, a deque of orders for each price, and the prices sorted ascending on each side.
+    It is not thread safe, the simulator holds its lock.
+    """
+
+    def __init__(self) -> None:
+        self._levels: tuple[dict[float, deque], dict[float, deque]] = ({}, {})
+        self._prices: tuple[list[float], list[float]] = ([], [])
+
+    def best(self, buy: bool) -> float | None:
+        """the best price of the resting buy orders if buy, or of the sell orders"""
+        prices = self._prices[0 if buy else 1]
+        if not prices:
+            return None
+        return prices[-1] if buy else prices[0]
+
+    def depth(self, buy: bool, levels: int = LEVELS) -> list[tuple[float, int]]:
+        """the best levels of one side as (price, volume)"""
+        side = 0 if buy else 1
+        prices = self._prices[side][-levels:][::-1] if buy else self._prices[side][:levels]
+        return [(price, sum(order.remaining for order in self._levels[side][price])) for price in prices]
+
+    def add(self, order: _Order) -> None:
+        side = 0 if order.buy else 1
+        level = self._levels[side].get(order.price)
+        if level is None:
+            level = self._levels[side][order.price] = deque()
+            bisect.insort(self._prices[side], order.price)
+        level.append(order)
+
+    def remove(self, order: _Order) -> None:
+        side = 0 if order.buy else 1
+        level = self._levels[side].get(order.price)
+        if level is None:
+            return
+        try:
+            level.remove(order)
+        except ValueError:
+            return
+        if not level:
+            self._remove_level(side, order.price)
+
+    def match(self, buy: bool, limit: float, volume: int) -> list[tuple[_Order, int]]:
+        """take up to volume from the resting orders of the other side at limit or better, in price-time priority"""
+        side = 1 if buy else 0
+        prices = self._prices[side]
+        fills = []
+        while volume and prices:
+            price = prices[0] if buy else prices[-1]
+            if (price > limit) if buy else (price < limit):
+                break
+            level = self._levels[side][price]
+            while volume and level:
+                order = level[0]
+                traded = min(volume, order.remaining)
+                order.remaining -= traded
+                volume -= traded
+                fills.append((order, traded))
+                if not order.remaining:
+                    level.popleft()
+            if not level:
+                self._remove_level(side, price)
+        return fills
+
+    def available(self, buy: bool, limit: float) -> int:
+        """volume of the other side at limit or better"""
+        side = 1 if buy else 0
+        return sum(
+            order.remaining
+            for price, level in self._levels[side].items()
+            if ((price <= limit) if buy else (price >= limit))
+            for order in level
+        )
+
+    def _remove_level(self, side: int, price: float) -> None:
+        del self._levels[side][price]
+        prices = self._prices[side]
+        del prices[bisect.bisect_left(prices, price)]
+
+
+class _Market(object):
+    """the book, the synthetic quote and the statistics of one instrument"""
+
+    def __init__(self, instrument: SimulatedInstrument, depth: int) -> None:
+        self.instrument = instrument
+        self.book = OrderBook()
+        self.last_price = instrument.price
+        self.open_price = 0.0
+        self.highest_price = -math.inf
+        self.lowest_price = math.inf
+        self.volume = 0
+        self.turnover = 0.0
+        self.depth = depth
+        # volume left at the synthetic bid and ask until the next tick
+        self.quote_volumes = [depth, depth]
+
+    @property
+    def quote(self) -> tuple[float, float]:
+        tick = self.instrument.price_tick
+        return (round(self.last_price - tick, 10), round(self.last_price + tick, 10))
+
+    def traded(self, price: float, volume: int) -> None:
+        self.last_price = price
+        if not self.open_price:
+            self.open_price = price
+        self.highest_price = max(self.highest_price, price)
+        self.lowest_price = min(self.lowest_price, price)
+        self.volume += volume
+        self.turnover += price * volume * self.instrument.volume_multiple
+
+
+class _Session(object):
+    """a connection of an api, the spi methods are called in its own thread in the order they are posted"""
+
+    def __init__(self, simulator: 'Simulator', spi: Any, name: str) -> None:
+        self.simulator = simulator
+        self.spi = spi
+        self.logged_in = False
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def post(self, method: str, *args: Any) -> None:
+        self._queue.put((method, args))
+
+    def close(self) -> None:
+        self._queue.put(None)
+
+    def join(self, timeout: float | None = None) -> None:
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            method, args = item
+            fn = getattr(self.spi, method, None)
+            if fn is None:
+                continue
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("spi %s raised", method)
+
+    def login(self, req: Any, request_id: int, **fields: Any) -> int:
+        password = self.simulator.password
+        if password is not None and req.Password != password:
+            self.post("OnRspUserLogin", None, _rsp_info(ERROR_INVALID_LOGIN, "CTP:不合法的登录"), request_id, True)
+            return 0
+        self.logged_in = True
+        rsp = type(self)._login_type.model_construct(
+            TradingDay=self.simulator.trading_day,
+            LoginTime=datetime.now().strftime("%H:%M:%S"),
+            BrokerID=req.BrokerID,
+            UserID=req.UserID,
+            SystemName="simulator",
+            **fields,
+        )
+        self.post("OnRspUserLogin", rsp, _rsp_info(), request_id, True)
+        return 0
+
+
+class _MdSession(_Session):
+    _login_type = mdapi.CThostFtdcRspUserLoginField
+
+    def __init__(self, simulator: 'Simulator', spi: Any) -> None:
+        super().__init__(simulator, spi, "SimulatorMdSpi")
+        self.instruments: set[str] = set()
+
+    def subscribe(self, instrument_ids: Iterable[str | bytes], request_id: int) -> int:
+        instrument_ids = [i.decode() if isinstance(i, bytes) else i for i in instrument_ids]
+        for n, instrument_id in enumerate(instrument_ids):
+            self.instruments.add(instrument_id)
+            specific = mdapi.CThostFtdcSpecificInstrumentField.model_construct(InstrumentID=instrument_id)
+            self.post("OnRspSubMarketData", specific, _rsp_info(), request_id, n == len(instrument_ids) - 1)
+        return 0
+
+    def unsubscribe(self, instrument_ids: Iterable[str | bytes], request_id: int) -> int:
+        for instrument_id in instrument_ids:
+            self.instruments.discard(instrument_id.decode() if isinstance(instrument_id, bytes) else instrument_id)
+        return 0
+
+
+class _TraderSession(_Session):
+    _login_type = tdapi.CThostFtdcRspUserLoginField
+
+    def __init__(self, simulator: 'Simulator', spi: Any, session_id: int) -> None:
+        super().__init__(simulator, spi, "SimulatorTdSpi")
+        self.session_id = session_id
+
+    def authenticate(self, req: Any, request_id: int) -> int:
+        rsp = tdapi.CThostFtdcRspAuthenticateField.model_construct(BrokerID=req.BrokerID, UserID=req.UserID, AppID=req.AppID)
+        self.post("OnRspAuthenticate", rsp, _rsp_info(), request_id, True)
+        return 0
+
+    def login(self, req: Any, request_id: int, **fields: Any) -> int:
+        return super().login(req, request_id, FrontID=FRONT_ID, SessionID=self.session_id, MaxOrderRef="0")
+
+    def respond(self, method: str, rows: list, request_id: int) -> int:
+        """post the rows of a query, an empty query is answered with None"""
+        if not rows:
+            self.post(method, None, None, request_id, True)
+        for n, row in enumerate(rows):
+            self.post(method, row, None, request_id, n == len(rows) - 1)
+        return 0
+
+
+class Simulator(object):
+    """
+    Simulated front shared by the mock apis connecting to it, see the module docstring.
+    tick_interval is None to publish the ticks only by publish_ticks, which is handy for the tests.
+    password is checked by ReqUserLogin if it is given.
+    """
+
+    def __init__(
+        self,
+        instruments: Iterable[SimulatedInstrument] = DEFAULT_INSTRUMENTS,
+        tick_interval: float | None = 0.5,
+        depth: int = 100,
+        trading_day: str | None = None,
+        password: str | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.trading_day = trading_day or datetime.now().strftime("%Y%m%d")
+        self.password = password
+        self._markets = {instrument.instrument_id: _Market(instrument, depth) for instrument in instruments}
+        self._tick_interval = tick_interval
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._md_sessions: tuple[_MdSession, ...] = ()
+        self._td_sessions: tuple[_TraderSession, ...] = ()
+        self._session_ids = itertools.count(1)
+        self._order_sys_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        # (FrontID, SessionID, OrderRef) and OrderSysID of the orders
+        self._orders: dict[tuple[int, int, str], _Order] = {}
+        self._by_sys_id: dict[str, _Order] = {}
+        self._trades: list = []
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats = {"orders": 0, "trades": 0, "actions": 0, "ticks": 0}
+
+    @property
+    def instruments(self) -> list[SimulatedInstrument]:
+        return [market.instrument for market in self._markets.values()]
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return dict(self._stats)
+
+    def order_book(self, instrument_id: str) -> OrderBook:
+        return self._markets[instrument_id].book
+
+    def last_price(self, instrument_id: str) -> float:
+        return self._markets[instrument_id].last_price
+
+    def connect_md(self, spi: Any) -> _MdSession:
+        session = _MdSession(self, spi)
+        with self._lock:
+            self._md_sessions = self._md_sessions + (session,)
+        self._start()
+        session.post("OnFrontConnected")
+        return session
+
+    def connect_trader(self, spi: Any) -> _TraderSession:
+        session = _TraderSession(self, spi, next(self._session_ids))
+        with self._lock:
+            self._td_sessions = self._td_sessions + (session,)
+        session.post("OnFrontConnected")
+        return session
+
+    def disconnect(self, session: _Session) -> None:
+        with self._lock:
+            self._md_sessions = tuple(s for s in self._md_sessions if s is not session)
+            self._td_sessions = tuple(s for s in self._td_sessions if s is not session)
+        session.close()
+
+    def stop(self) -> None:
+        """stop publishing the ticks"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def publish_ticks(self, move: bool = True) -> None:
+        """publish a tick of every instrument, the price walks by one tick at most if move"""
+        with self._lock:
+            for market in self._markets.values():
+                if move:
+                    step = self._random.choice((-1, 0, 1)) * market.instrument.price_tick
+                    market.last_price = round(market.last_price + step, 10)
+                market.quote_volumes = [market.depth, market.depth]
+                self._cross_quote(market)
+                self._publish(market)
+
+    def order_insert(self, session: _TraderSession, req: Any, request_id: int) -> int:
+        with self._lock:
+            self._stats["orders"] += 1
+            market = self._markets.get(req.InstrumentID)
+            if market is None:
+                # the spi thread gets the request later, a template reused by the caller would report its later values
+                session.post("OnRspOrderInsert", req.model_copy(), _rsp_info(ERROR_INSTRUMENT_NOT_FOUND, "CTP:找不到合约"), request_id, True)
+                return 0
+            if not req.VolumeTotalOriginal or req.VolumeTotalOriginal <= 0 or req.Direction not in (BUY, SELL):
+                session.post("OnRspOrderInsert", req.model_copy(), _rsp_info(ERROR_INVALID_FIELD, "CTP:报单字段有误"), request_id, True)
+                return 0
+            key = (FRONT_ID, session.session_id, req.OrderRef)
+            if key in self._orders:
+                session.post("OnRspOrderInsert", req.model_copy(), _rsp_info(ERROR_INVALID_FIELD, "CTP:报单重复"), request_id, True)
+                return 0
+            buy = req.Direction == BUY
+            market_order = req.OrderPriceType == ANY_PRICE
+            price = (math.inf if buy else -math.inf) if market_order else req.LimitPrice
+            order = _Order(session, self._order_field(market, session, req, request_id), buy, price)
+            self._orders[key] = order
+            self._by_sys_id[order.field.OrderSysID] = order
+            session.post("OnRtnOrder", order.field.model_copy())
+            if req.VolumeCondition == COMPLETE_VOLUME and self._available(market, buy, price) < order.remaining:
+                self._finish(order, CANCELED, "已撤单报单被拒绝")
+                return 0
+            self._match(market, order)
+            if not order.remaining:
+                return 0
+            if market_order or req.TimeCondition == IOC:
+                self._finish(order, CANCELED if not order.field.VolumeTraded else PART_TRADED_NOT_QUEUEING, "已撤单")
+            else:
+                market.book.add(order)
+                self._update(order, PART_TRADED_QUEUEING if order.field.VolumeTraded else NO_TRADE_QUEUEING, "未成交")
+        return 0
+
+    def order_action(self, session: _TraderSession, req: Any, request_id: int) -> int:
+        with self._lock:
+            self._stats["actions"] += 1
+            if req.OrderSysID:
+                order = self._by_sys_id.get(req.OrderSysID)
+            else:
+                order = self._orders.get((req.FrontID, req.SessionID, req.OrderRef))
+            if order is None or req.ActionFlag != ACTION_DELETE:
+                session.post("OnRspOrderAction", req.model_copy(), _rsp_info(ERROR_ORDER_NOT_FOUND, "CTP:撤单找不到相应报单"), request_id, True)
+                return 0
+            if order.field.OrderStatus not in (PART_TRADED_QUEUEING, NO_TRADE_QUEUEING):
+                session.post("OnRspOrderAction", req.model_copy(), _rsp_info(ERROR_ORDER_FINISHED, "CTP:报单已全成交或已撤销，不能再撤"), request_id, True)
+                return 0
+            self._markets[order.field.InstrumentID].book.remove(order)
+            self._finish(order, CANCELED, "已撤单")
+        return 0
+
+    def query_instruments(self, session: _TraderSession, req: Any, request_id: int) -> int:
+        rows = [
+            tdapi.CThostFtdcInstrumentField.model_construct(
+                InstrumentID=instrument.instrument_id,
+                ExchangeID=instrument.exchange_id,
+                InstrumentName=instrument.instrument_id,
+                ExchangeInstID=instrument.instrument_id,
+                VolumeMultiple=instrument.volume_multiple,
+                PriceTick=instrument.price_tick,
+                IsTrading=1,
+            )
+            for instrument in self.instruments
+            if not req.InstrumentID or req.InstrumentID == instrument.instrument_id
+        ]
+        return session.respond("OnRspQryInstrument", rows, request_id)
+
+    def query_orders(self, session: _TraderSession, req: Any, request_id: int) -> int:
+        with self._lock:
+            rows = [
+                order.field.model_copy()
+                for order in self._orders.values()
+                if _matches(order.field, req, ("InvestorID", "InstrumentID", "ExchangeID", "OrderSysID"))
+            ]
+        return session.respond("OnRspQryOrder", rows, request_id)
+
+    def query_trades(self, session: _TraderSession, req: Any, request_id: int) -> int:
+        with self._lock:
+            rows = [trade.model_copy() for trade in self._trades if _matches(trade, req, ("InvestorID", "InstrumentID", "ExchangeID", "TradeID"))]
+        return session.respond("OnRspQryTrade", rows, request_id)
+
+    def _start(self) -> None:
+        if self._tick_interval is not None and self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="SimulatorTicks", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._tick_interval):
+            self.publish_ticks()
+
+    def _order_field(self, market: _Market, session: _TraderSession, req: Any, request_id: int) -> Any:
+        now = datetime.now()
+        return tdapi.CThostFtdcOrderField.model_construct(
+            BrokerID=req.BrokerID,
+            InvestorID=req.InvestorID,
+            OrderRef=req.OrderRef,
+            UserID=req.UserID,
+            OrderPriceType=req.OrderPriceType,
+            Direction=req.Direction,
+            CombOffsetFlag=req.CombOffsetFlag,
+            CombHedgeFlag=req.CombHedgeFlag,
+            LimitPrice=req.LimitPrice,
+            VolumeTotalOriginal=req.VolumeTotalOriginal,
+            TimeCondition=req.TimeCondition,
+            VolumeCondition=req.VolumeCondition,
+            MinVolume=req.MinVolume,
+            ContingentCondition=req.ContingentCondition,
+            RequestID=request_id,
+            ExchangeID=market.instrument.exchange_id,
+            InstrumentID=req.InstrumentID,
+            OrderSubmitStatus=INSERT_SUBMITTED,
+            TradingDay=self.trading_day,
+            OrderSysID=f"{next(self._order_sys_ids):12d}",
+            OrderStatus=UNKNOWN,
+            VolumeTraded=0,
+            VolumeTotal=req.VolumeTotalOriginal,
+            InsertDate=now.strftime("%Y%m%d"),
+            InsertTime=now.strftime("%H:%M:%S"),
+            FrontID=FRONT_ID,
+            SessionID=session.session_id,
+            StatusMsg="报单已提交",
+        )
+
+    def _available(self, market: _Market, buy: bool, price: float) -> int:
+        bid, ask = market.quote
+        quote_volume = market.quote_volumes[1 if buy else 0] if ((ask <= price) if buy else (bid >= price)) else 0
+        return market.book.available(buy, price) + quote_volume
+
+    def _match(self, market: _Market, order: _Order) -> None:
+        """fill the order by the resting orders, then by the synthetic quote"""
+        for resting, volume in market.book.match(order.buy, order.price, order.remaining):
+            # the trade is at the price of the resting order
+            self._fill(order, resting.price, volume)
+            self._fill(resting, resting.price, volume)
+            self._traded(market, resting.price, volume)
+        if order.remaining:
+            bid, ask = market.quote
+            side = 1 if order.buy else 0
+            quote_price = ask if order.buy else bid
+            if ((quote_price <= order.price) if order.buy else (quote_price >= order.price)) and market.quote_volumes[side]:
+                volume = min(order.remaining, market.quote_volumes[side])
+                market.quote_volumes[side] -= volume
+                self._fill(order, quote_price, volume)
+                self._traded(market, quote_price, volume)
+
+    def _cross_quote(self, market: _Market) -> None:
+        """fill the resting orders crossed by the synthetic quote after it moves"""
+        bid, ask = market.quote
+        for buy, quote_price in ((True, ask), (False, bid)):
+            side = 1 if buy else 0
+            for resting, volume in market.book.match(not buy, quote_price, market.quote_volumes[side]):
+                market.quote_volumes[side] -= volume
+                self._fill(resting, resting.price, volume)
+                self._traded(market, resting.price, volume)
+
+    def _fill(self, order: _Order, price: float, volume: int) -> None:
+        field = order.field
+        field.VolumeTraded += volume
+        field.VolumeTotal = field.VolumeTotalOriginal - field.VolumeTraded
+        # the resting orders are already reduced by OrderBook.match
+        order.remaining = field.VolumeTotal
+        if field.VolumeTotal:
+            self._update(order, PART_TRADED_QUEUEING, "部分成交")
+        else:
+            self._update(order, ALL_TRADED, "全部成交")
+        now = datetime.now()
+        trade = tdapi.CThostFtdcTradeField.model_construct(
+            BrokerID=field.BrokerID,
+            InvestorID=field.InvestorID,
+            OrderRef=field.OrderRef,
+            UserID=field.UserID,
+            ExchangeID=field.ExchangeID,
+            TradeID=f"{next(self._trade_ids):20d}",
+            Direction=field.Direction,
+            OrderSysID=field.OrderSysID,
+            OffsetFlag=field.CombOffsetFlag[:1] if field.CombOffsetFlag else None,
+            HedgeFlag=field.CombHedgeFlag[:1] if field.CombHedgeFlag else None,
+            Price=price,
+            Volume=volume,
+            TradeDate=now.strftime("%Y%m%d"),
+            TradeTime=now.strftime("%H:%M:%S"),
+            TradingDay=self.trading_day,
+            InstrumentID=field.InstrumentID,
+        )
+        self._trades.append(trade)
+        order.session.post("OnRtnTrade", trade)
+
+    def _traded(self, market: _Market, price: float, volume: int) -> None:
+        market.traded(price, volume)
+        self._stats["trades"] += 1
+
+    def _update(self, order: _Order, status: str, message: str) -> None:
+        field = order.field
+        field.OrderStatus = status
+        field.OrderSubmitStatus = ACCEPTED
+        field.StatusMsg = message
+        field.UpdateTime = datetime.now().strftime("%H:%M:%S")
+        # the field is changed by the following events, the spi gets a copy like the real one
+        order.session.post("OnRtnOrder", field.model_copy())
+
+    def _finish(self, order: _Order, status: str, message: str) -> None:
+        order.remaining = 0
+        order.field.CancelTime = datetime.now().strftime("%H:%M:%S")
+        self._update(order, status, message)
+
+    def _publish(self, market: _Market) -> None:
+        instrument = market.instrument
+        sessions = [session for session in self._md_sessions if session.logged_in and instrument.instrument_id in session.instruments]
+        if not sessions:
+            return
+        self._stats["ticks"] += 1
+        now = datetime.now()
+        bid, ask = market.quote
+        fields = {
+            "TradingDay": self.trading_day,
+            "ActionDay": now.strftime("%Y%m%d"),
+            "UpdateTime": now.strftime("%H:%M:%S"),
+            "UpdateMillisec": now.microsecond // 1000,
+            "InstrumentID": instrument.instrument_id,
+            "ExchangeID": instrument.exchange_id,
+            "LastPrice": market.last_price,
+            "OpenPrice": market.open_price,
+            "HighestPrice": market.highest_price if market.volume else 0.0,
+            "LowestPrice": market.lowest_price if market.volume else 0.0,
+            "Volume": market.volume,
+            "Turnover": market.turnover,
+            "PreSettlementPrice": instrument.price,
+        }
+        for buy, quote_price, prefix in ((True, bid, "Bid"), (False, ask, "Ask")):
+            levels = dict(market.book.depth(buy))
+            quote_volume = market.quote_volumes[0 if buy else 1]
+            if quote_volume:
+                levels[quote_price] = levels.get(quote_price, 0) + quote_volume
+            for level, price in enumerate(sorted(levels, reverse=buy)[:LEVELS], 1):
+                fields[f"{prefix}Price{level}"] = price
+                fields[f"{prefix}Volume{level}"] = levels[price]
+        for session in sessions:
+            session.post("OnRtnDepthMarketData", mdapi.CThostFtdcDepthMarketDataField.model_construct(**fields))
+
+
+def _matches(row: Any, req: Any, names: Iterable[str]) -> bool:
+    """the row has the values of the fields given in the query"""
+    return all(not getattr(req, name, None) or getattr(row, name) == getattr(req, name) for name in names)
+
+
+def _rsp_info(error_id: int = 0, error_msg: str = "") -> Any:
+    return tdapi.CThostFtdcRspInfoField.model_construct(ErrorID=error_id, ErrorMsg=error_msg)
+
+
+_current: Simulator | None = None
+_current_lock = threading.Lock()
+
+
+def current_simulator() -> Simulator:
+    """the simulator the apis connect to, a Simulator of the default instruments is created if none is set"""
+    global _current
+    with _current_lock:
+        if _current is None:
+            _current = Simulator()
+        return _current
+
+
+def set_simulator(simulator: Simulator | None) -> Simulator | None:
+    """set the simulator of the apis initialized later, return the last one"""
+    global _current
+    with _current_lock:
+        last, _current = _current, simulator
+        return last
@@ -15,13 +15,18 @@ class CThostFtdcTraderSpi(object):
 
 
 class CThostFtdcTraderApi(object):
+    """the requests are served by the current simulator of mock_openctp_ctp.simulator after Init, and return -1 before it"""
     
     @classmethod
     def CreateFtdcTraderApi(cls, *args, **kwargs):
         return cls()
     
-    def RegisterSpi(self, *args, **kwargs):
-        pass
+    def __init__(self):
+        self._spi = None
+        self._session = None
+    
+    def RegisterSpi(self, spi, *args, **kwargs):
+        self._spi = spi
     
     def RegisterFront(self, *args, **kwargs):
         pass
@@ -32,6 +37,52 @@ class CThostFtdcTraderApi(object):
     def SubscribePublicTopic(self, *args, **kwargs):
         pass
     
+    def Init(self):
+        from .simulator import current_simulator
+        self._session = current_simulator().connect_trader(self._spi)
+    
+    def Release(self):
+        if self._session is not None:
+            self._session.simulator.disconnect(self._session)
+    
+    def Join(self):
+        if self._session is not None:
+            self._session.join()
+        return 0
+    
+    def ReqAuthenticate(self, req, request_id):
+        return self._session.authenticate(req, request_id) if self._session else -1
+    
+    def ReqUserLogin(self, req, request_id):
+        return self._session.login(req, request_id) if self._session else -1
+    
+    def ReqOrderInsert(self, req, request_id):
+        return self._session.simulator.order_insert(self._session, req, request_id) if self._session else -1
+    
+    def ReqOrderAction(self, req, request_id):
+        return self._session.simulator.order_action(self._session, req, request_id) if self._session else -1
+    
+    def ReqQryInstrument(self, req, request_id):
+        return self._session.simulator.query_instruments(self._session, req, request_id) if self._session else -1
+    
+    def ReqQrySettlementInfo(self, req, request_id):
+        return self._session.respond("OnRspQrySettlementInfo", [], request_id) if self._session else -1
+    
+    def ReqQrySettlementInfoConfirm(self, req, request_id):
+        return self._session.respond("OnRspQrySettlementInfoConfirm", [], request_id) if self._session else -1
+    
+    def ReqQryTradingAccount(self, req, request_id):
+        return self._session.respond("OnRspQryTradingAccount", [], request_id) if self._session else -1
+    
+    def ReqQryInvestorPosition(self, req, request_id):
+        return self._session.respond("OnRspQryInvestorPosition", [], request_id) if self._session else -1
+    
+    def ReqQryOrder(self, req, request_id):
+        return self._session.simulator.query_orders(self._session, req, request_id) if self._session else -1
+    
+    def ReqQryTrade(self, req, request_id):
+        return self._session.simulator.query_trades(self._session, req, request_id) if self._session else -1
+    
 
 class CThostFtdcDisseminationField(BaseModel):
     SequenceSeries: Optional[int] = Field(None, description='序列系列号')
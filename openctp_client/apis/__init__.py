@@ -1,2 +1,5 @@
 from .md_api import MdAPI
 from .td_api import TdAPI
+from .request_registry import RequestRegistry
+from .query_scheduler import QueryScheduler
+from .order_rate_limiter import OrderRateLimiter, RateLimitMode
@@ -1,3 +1,6 @@
+import logging
+import threading
+import time
 from typing import Any, Callable, Optional, Tuple
 from ..openctp import mdapi
 
@@ -5,6 +8,12 @@ from ..objects.config import CtpConfig
 from ..objects.enums import CtpMethod, Api
 from ..objects.fields import *
 from ..objects.responses import *
+from ..objects.snapshots import DepthMarketDataSnapshot
+from ..utils.histogram import CALLBACK, CONVERSION, LISTENERS, LatencyRecorder
+from ..utils.log import deprecated_log
+
+
+logger = logging.getLogger(__name__)
 
 
 class MdAPI(mdapi.CThostFtdcMdSpi):
@@ -13,8 +22,14 @@ class MdAPI(mdapi.CThostFtdcMdSpi):
         super().__init__()
         self.config: CtpConfig = config
         self._request_count: int = 0
+        self._counter_lock = threading.Lock()
         self._callback: Callable[[CtpResponse], None] = self._default_callback
+        self._raw_callback: Callable[[DepthMarketDataSnapshot], None] | None = None
+        self._tick_listeners: tuple[Callable[[mdapi.CThostFtdcDepthMarketDataField], None], ...] = ()
         self._spi_callback: dict[CtpMethod, Callable] = {}
+        self._latency_recorder: LatencyRecorder | None = None
+        # perf_counter_ns when the spi callback being timed was entered, it is read by the callback in the same thread
+        self.spi_ns: int = 0
         self._api: mdapi.CThostFtdcMdApi = mdapi.CThostFtdcMdApi.CreateFtdcMdApi(self.config.user_id)
         self._api.RegisterSpi(self)
         self._api.RegisterFront(self.config.md_addr)
@@ -25,8 +40,10 @@ class MdAPI(mdapi.CThostFtdcMdSpi):
     
     @property
     def request_id(self) -> int:
-        self._request_count += 1
-        return self._request_count
+        # the requests are sent from the user, scheduler and spi threads
+        with self._counter_lock:
+            self._request_count += 1
+            return self._request_count
     
     @property
     def callback(self) -> Callable[[CtpResponse], None]:
@@ -36,15 +53,38 @@ class MdAPI(mdapi.CThostFtdcMdSpi):
     def callback(self, callback: Callable[[CtpResponse], None]) -> None:
         self._callback = callback
     
+    @property
+    def raw_callback(self) -> Callable[[DepthMarketDataSnapshot], None] | None:
+        """In raw mode the depth market data is delivered as DepthMarketDataSnapshot and bypasses callback"""
+        return self._raw_callback
+    
+    @raw_callback.setter
+    def raw_callback(self, callback: Callable[[DepthMarketDataSnapshot], None] | None) -> None:
+        self._raw_callback = callback
+    
     def log(self, *args, **kwargs) -> None:
-        print(*args, **kwargs)
+        """deprecated, the arguments are logged at info level by the logger of this module"""
+        deprecated_log(logger, *args, **kwargs)
+    
+    @property
+    def latency_recorder(self) -> LatencyRecorder | None:
+        """the depth market data is timed into the recorder if it is set, which costs about nothing otherwise"""
+        return self._latency_recorder
+    
+    @latency_recorder.setter
+    def latency_recorder(self, recorder: LatencyRecorder | None) -> None:
+        self._latency_recorder = recorder
     
     def _default_callback(self, response: CtpResponse) -> None:
         if response.method in self._spi_callback:
             self._spi_callback[response.method](*response.args)
         else:
-            # TODO: add warning
-            self.log(f"no callback for {response.method.name()} found")
+            logger.debug("no callback for %s found", response.method.name)
+    
+    def _from_ctp_object(self, field_type: type[CtpField], obj: Any) -> CtpField | None:
+        if self.config.trusted_inbound:
+            return field_type.construct_from_ctp_object(obj)
+        return field_type.from_ctp_object(obj)
     
     def set_spi_callback(self, method: CtpMethod, callback: Callable) -> None:
         self._spi_callback[method] = callback
@@ -54,6 +94,14 @@ class MdAPI(mdapi.CThostFtdcMdSpi):
     
     def del_spi_callback(self, method: CtpMethod) -> Callable | None:
         self._spi_callback.pop(method, None)
+    
+    def add_tick_listener(self, listener: Callable[[mdapi.CThostFtdcDepthMarketDataField], None]) -> None:
+        """The listener is called in the spi thread with the ctp object, which is reused by ctp after returning"""
+        if listener not in self._tick_listeners:
+            self._tick_listeners = self._tick_listeners + (listener,)
+    
+    def remove_tick_listener(self, listener: Callable[[mdapi.CThostFtdcDepthMarketDataField], None]) -> None:
+        self._tick_listeners = tuple(l for l in self._tick_listeners if l != listener)
             
     def Connect(self) -> None:
         self.api.Init()
@@ -66,8 +114,7 @@ class MdAPI(mdapi.CThostFtdcMdSpi):
         self._login()
 
     def OnFrontDisconnected(self, nReason):
-        # TODO: add log
-        pass
+        logger.warning("md front disconnected, reason: %s", nReason)
     
     def _login(self):
         req = mdapi.CThostFtdcReqUserLoginField()
@@ -79,15 +126,15 @@ class MdAPI(mdapi.CThostFtdcMdSpi):
     def OnRspUserLogin(self, pRspUserLogin: mdapi.CThostFtdcRspUserLoginField, pRspInfo: mdapi.CThostFtdcRspInfoField, nRequestID: int, bIsLast: bool):
         """called when login responding"""
         rsp = RspUserLogin(
-            RspUserLogin=RspUserLoginField.from_ctp_object(pRspUserLogin),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            RspUserLogin=self._from_ctp_object(RspUserLoginField, pRspUserLogin),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
         rsp.source = Api.Md
             
         if pRspInfo is not None:
-            self.log(f"login rsp info, ErrorID: {pRspInfo.ErrorID}, ErrorMsg: {pRspInfo.ErrorMsg}")
+            logger.info("md login rsp info, ErrorID: %s, ErrorMsg: %s", pRspInfo.ErrorID, pRspInfo.ErrorMsg)
             
         self.callback(rsp)
    
@@ -99,17 +146,49 @@ class MdAPI(mdapi.CThostFtdcMdSpi):
     
     def OnRspSubMarketData(self, pSpecificInstrument: mdapi.CThostFtdcSpecificInstrumentField, pRspInfo: mdapi.CThostFtdcRspInfoField, nRequestID, bIsLast):
         rsp = RspSubMarketData(
-            SpecificInstrument=SpecificInstrumentField.from_ctp_object(pSpecificInstrument),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            SpecificInstrument=self._from_ctp_object(SpecificInstrumentField, pSpecificInstrument),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
         self.callback(rsp)
 
     def OnRtnDepthMarketData(self, pDepthMarketData: mdapi.CThostFtdcDepthMarketDataField):
-        rsp = RtnDepthMarketData(DepthMarketData=DepthMarketDataField.from_ctp_object(pDepthMarketData))
+        if self._latency_recorder is not None:
+            self._timed_rtn_depth_market_data(pDepthMarketData)
+            return
+        for listener in self._tick_listeners:
+            listener(pDepthMarketData)
+        if self._raw_callback is not None:
+            # a snapshot, replayed from the recorded ticks, is immutable and needs no copy
+            if type(pDepthMarketData) is not DepthMarketDataSnapshot:
+                pDepthMarketData = DepthMarketDataSnapshot.from_ctp_object(pDepthMarketData)
+            self._raw_callback(pDepthMarketData)
+            return
+        rsp = RtnDepthMarketData(DepthMarketData=self._from_ctp_object(DepthMarketDataField, pDepthMarketData))
         self.callback(rsp)
 
+    def _timed_rtn_depth_market_data(self, pDepthMarketData: mdapi.CThostFtdcDepthMarketDataField) -> None:
+        record = self._latency_recorder.record
+        method = CtpMethod.OnRtnDepthMarketData
+        self.spi_ns = entered = time.perf_counter_ns()
+        for listener in self._tick_listeners:
+            listener(pDepthMarketData)
+        listened = time.perf_counter_ns()
+        if self._raw_callback is not None:
+            if type(pDepthMarketData) is not DepthMarketDataSnapshot:
+                pDepthMarketData = DepthMarketDataSnapshot.from_ctp_object(pDepthMarketData)
+            converted = time.perf_counter_ns()
+            self._raw_callback(pDepthMarketData)
+        else:
+            rsp = RtnDepthMarketData(DepthMarketData=self._from_ctp_object(DepthMarketDataField, pDepthMarketData))
+            converted = time.perf_counter_ns()
+            self.callback(rsp)
+        called = time.perf_counter_ns()
+        record(method, LISTENERS, listened - entered)
+        record(method, CONVERSION, converted - listened)
+        record(method, CALLBACK, called - converted)
+
             
     # 理论上用户回调和SPI回调函数重名没有问题，但是这样真的好吗？
     # def __setattr__(self, __name: str, __value: Any) -> None:
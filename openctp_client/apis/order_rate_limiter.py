@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from collections import deque
+from enum import Enum, auto
+from typing import Any, Callable
+
+from ..objects.fields import InputOrderField
+from ..utils.token_bucket import TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+# the same as the return code of ctp when the requests per second exceed the limit
+RATE_LIMITED = -3
+# THOST_FTDC_AF_Delete
+ACTION_DELETE = '0'
+
+
+class RateLimitMode(Enum):
+    # return RATE_LIMITED without sending
+    Reject = auto()
+    # queue the request and send it by a pacing thread when there are tokens,
+    # a queued insert of this session and its cancel by OrderRef are both dropped
+    Delay = auto()
+
+
+class _Request(object):
+    __slots__ = ("send", "req", "req_id", "key")
+
+    def __init__(self, send: Callable[[Any, int], int], req: Any, req_id: int, key: tuple[str, str] | None) -> None:
+        self.send = send
+        self.req = req
+        self.req_id = req_id
+        # (InstrumentID, OrderRef) of a queued insert
+        self.key = key
+
+
+class OrderRateLimiter(object):
+    """
+    Token buckets limiting ReqOrderInsert and ReqOrderAction per account, per instrument and per exchange.
+    A rate of None means no limit, the burst of each bucket is one second of its rate but at least one request.
+    Under the limit the request is sent in the calling thread, the added cost is one lock and the bucket updates.
+    on_error is called with the ctp object, the request id and the error code of a delayed request failed when sent,
+    and of a queued insert dropped by its cancel, whose code is RATE_LIMITED.
+    """
+
+    def __init__(self, account_rate: float | None = None, instrument_rate: float | None = None, exchange_rate: float | None = None, mode: RateLimitMode = RateLimitMode.Reject, clock: Callable[[], float] = time.monotonic) -> None:
+        self._instrument_rate = instrument_rate
+        self._exchange_rate = exchange_rate
+        self._mode = mode
+        self._clock = clock
+        self._account_bucket = self._new_bucket(account_rate) if account_rate else None
+        self._instrument_buckets: dict[str, TokenBucket] = {}
+        self._exchange_buckets: dict[str, TokenBucket] = {}
+        self._bucket_lists: dict[tuple[str, str], tuple[TokenBucket, ...]] = {}
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._queue: deque[_Request] = deque()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._sent = 0
+        self._rejected = 0
+        self._delayed = 0
+        self._coalesced = 0
+        self._session: tuple[int, int] | None = None
+        self.on_error: Callable[[Any, int, int], None] | None = None
+
+    @property
+    def session(self) -> tuple[int, int] | None:
+        return self._session
+
+    @session.setter
+    def session(self, session: tuple[int, int] | None) -> None:
+        """(FrontID, SessionID) of the login, only the cancels of this session drop the queued inserts"""
+        self._session = session
+
+    @property
+    def mode(self) -> RateLimitMode:
+        return self._mode
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "sent": self._sent,
+                "rejected": self._rejected,
+                "delayed": self._delayed,
+                "coalesced": self._coalesced,
+                "queued": len(self._queue),
+            }
+
+    def order_insert(self, send: Callable[[Any, int], int], req: Any, req_id: int) -> int:
+        """send is ReqOrderInsert of the trader api, req is the ctp object"""
+        return self._submit(send, req, req_id, req.ExchangeID, req.InstrumentID, True)
+
+    def order_action(self, send: Callable[[Any, int], int], req: Any, req_id: int) -> int:
+        """send is ReqOrderAction of the trader api, req is the ctp object"""
+        if self._queue and req.ActionFlag == ACTION_DELETE and req.OrderRef and (req.FrontID, req.SessionID) == self._session:
+            dropped = self._coalesce(req)
+            if dropped is not None:
+                self._report(dropped.req, dropped.req_id, RATE_LIMITED)
+                return 0
+        return self._submit(send, req, req_id, req.ExchangeID, req.InstrumentID, False)
+
+    def close(self) -> None:
+        """stop the pacing thread, the queued requests are dropped"""
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+            self._not_empty.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _submit(self, send: Callable[[Any, int], int], req: Any, req_id: int, exchange: str, instrument: str, insert: bool) -> int:
+        with self._lock:
+            # the queued requests go first, a request under the limit must not overtake them
+            if not self._queue and self._try_acquire(exchange, instrument):
+                self._sent += 1
+            elif self._mode is RateLimitMode.Reject:
+                self._rejected += 1
+                return RATE_LIMITED
+            else:
+                self._delay(send, req, req_id, (instrument, req.OrderRef) if insert else None)
+                return 0
+        return send(req, req_id)
+
+    def _try_acquire(self, exchange: str, instrument: str) -> bool:
+        """take a token from each bucket of the request if all of them have one, called under the lock"""
+        buckets = self._bucket_lists.get((exchange, instrument))
+        if buckets is None:
+            buckets = self._bucket_lists[(exchange, instrument)] = self._buckets(exchange, instrument)
+        now = self._clock()
+        if len(buckets) == 1:
+            return buckets[0].try_acquire(1, now)
+        for bucket in buckets:
+            if bucket.wait_time(1, now) > 0:
+                return False
+        for bucket in buckets:
+            bucket.try_acquire(1, now)
+        return True
+
+    def _wait_time(self, exchange: str, instrument: str) -> float:
+        now = self._clock()
+        return max((bucket.wait_time(1, now) for bucket in self._bucket_lists[(exchange, instrument)]), default=0.0)
+
+    def _buckets(self, exchange: str, instrument: str) -> tuple[TokenBucket, ...]:
+        buckets = []
+        if self._account_bucket is not None:
+            buckets.append(self._account_bucket)
+        if self._exchange_rate:
+            bucket = self._exchange_buckets.get(exchange)
+            if bucket is None:
+                bucket = self._exchange_buckets[exchange] = self._new_bucket(self._exchange_rate)
+            buckets.append(bucket)
+        if self._instrument_rate:
+            bucket = self._instrument_buckets.get(instrument)
+            if bucket is None:
+                bucket = self._instrument_buckets[instrument] = self._new_bucket(self._instrument_rate)
+            buckets.append(bucket)
+        return tuple(buckets)
+
+    def _new_bucket(self, rate: float) -> TokenBucket:
+        # a bucket holding less than one token never has one for a request
+        return TokenBucket(rate, max(rate, 1), self._clock)
+
+    def _delay(self, send: Callable[[Any, int], int], req: Any, req_id: int, key: tuple[str, str] | None) -> None:
+        """queue the request under the lock, key is only given for inserts"""
+        if key is not None:
+            # the ctp object may be a template reused by the caller, so the queued one is a copy
+            req = InputOrderField.construct_from_ctp_object(req).ctp_object()
+        self._queue.append(_Request(send, req, req_id, key))
+        self._delayed += 1
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="OrderRateLimiter", daemon=True)
+            self._thread.start()
+        self._not_empty.notify()
+
+    def _coalesce(self, req: Any) -> _Request | None:
+        """drop and return the queued insert cancelled by req, None if it is not queued"""
+        key = (req.InstrumentID, req.OrderRef)
+        with self._lock:
+            for request in self._queue:
+                if request.key == key:
+                    self._queue.remove(request)
+                    self._coalesced += 1
+                    return request
+        return None
+
+    def _report(self, req: Any, req_id: int, error_id: int) -> None:
+        if self.on_error is not None:
+            self.on_error(req, req_id, error_id)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._closed and not self._queue:
+                    self._not_empty.wait()
+                if self._closed:
+                    return
+                request = self._queue[0]
+                exchange, instrument = request.req.ExchangeID, request.req.InstrumentID
+                if not self._try_acquire(exchange, instrument):
+                    self._not_empty.wait(self._wait_time(exchange, instrument))
+                    continue
+                self._queue.popleft()
+                self._sent += 1
+            ret = request.send(request.req, request.req_id)
+            if ret != 0:
+                logger.warning("delayed request %s failed, return code: %s", request.req_id, ret)
+                self._report(request.req, request.req_id, ret)
@@ -0,0 +1,221 @@
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Callable
+
+from ..exceptions import CallException
+from ..objects.fields import CtpField
+from ..utils.token_bucket import TokenBucket
+from .request_registry import RequestRegistry
+
+
+logger = logging.getLogger(__name__)
+
+# -2: too many requests in flight, -3: too many requests per second
+THROTTLED_CODES = (-2, -3)
+
+# the lower the earlier, the queries not listed here have DEFAULT_PRIORITY
+QUERY_PRIORITY = {
+    "ReqQryInvestorPosition": 0,
+    "ReqQryTradingAccount": 1,
+    "ReqQryOrder": 2,
+    "ReqQryTrade": 2,
+    "ReqQryInstrument": 3,
+    "ReqQrySettlementInfoConfirm": 4,
+    "ReqQrySettlementInfo": 5,
+}
+DEFAULT_PRIORITY = 3
+
+# seconds from a query being sent to it failing with TimeoutError, so that a lost response does not hold its slot forever
+DEFAULT_QUERY_TIMEOUT = 30.0
+
+
+class _Throttled(Exception):
+    def __init__(self, error_id: int) -> None:
+        super().__init__()
+        self.error_id = error_id
+
+
+class _ScheduledQuery(object):
+    __slots__ = ("request", "qry", "key", "timeout", "future", "retries")
+
+    def __init__(self, request: Callable[[CtpField, int], int], qry: CtpField, key: tuple, timeout: float | None) -> None:
+        self.request = request
+        self.qry = qry
+        self.key = key
+        self.timeout = timeout
+        self.future = Future()
+        self.retries = 0
+
+
+class QueryScheduler(object):
+    """
+    Queue of ReqQry* calls sent one by one in a background thread, paced by a token bucket of rate queries per second.
+    At most max_in_flight queries are waiting for IsLast, the throttled ones (-2, -3) are sent again after a token is refilled.
+    An identical query which is still queued or in flight shares the future of the pending one.
+    A query whose response is lost keeps its slot until its timeout, when the registry fails it with TimeoutError,
+    the timeout is DEFAULT_QUERY_TIMEOUT unless it is given, None waits for the response forever.
+    close cancels the queued and the in-flight queries, a closed scheduler can not be reopened.
+    """
+
+    def __init__(self, request_id: Callable[[], int], registry: RequestRegistry, rate: float = 1, max_in_flight: int = 1, max_retries: int = 10) -> None:
+        self._request_id = request_id
+        self._registry = registry
+        self._bucket = TokenBucket(rate)
+        self._max_in_flight = max_in_flight
+        self._max_retries = max_retries
+        self._queue: list[tuple[int, int, _ScheduledQuery]] = []
+        self._counter = itertools.count()
+        self._pending: dict[tuple, _ScheduledQuery] = {}
+        self._in_flight = 0
+        # the in-flight queries by their request ids
+        self._sent: dict[int, _ScheduledQuery] = {}
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def submit(self, request: Callable[[CtpField, int], int], qry: CtpField, priority: int | None = None, timeout: float | None = DEFAULT_QUERY_TIMEOUT) -> Future:
+        """
+        queue the query sent by request, one of the ReqQry* methods, the future is completed with all the rows.
+        The timeout counts from the query being sent, not from being queued.
+        """
+        name = request.__name__
+        key = (name, qry.model_dump_json())
+        if priority is None:
+            priority = QUERY_PRIORITY.get(name, DEFAULT_PRIORITY)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("query scheduler is closed")
+            query = self._pending.get(key)
+            if query is not None:
+                return query.future
+            query = self._pending[key] = _ScheduledQuery(request, qry, key, timeout)
+            heapq.heappush(self._queue, (priority, next(self._counter), query))
+            query.future.add_done_callback(lambda _: self._discard(query))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="QueryScheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return query.future
+
+    def close(self) -> None:
+        """stop sending, the queued and the in-flight queries are cancelled"""
+        with self._cond:
+            self._closed = True
+            queued = [query for _, _, query in self._queue]
+            self._queue.clear()
+            for query in queued:
+                self._forget(query)
+            sent = list(self._sent.items())
+            self._cond.notify()
+        for query in queued:
+            query.future.cancel()
+        for req_id, query in sent:
+            query.future.cancel()
+            # their responses may never arrive, release the requests in the registry
+            self._registry.fail(req_id, CancelledError())
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            query = self._next()
+            if query is None:
+                return
+            self._send(query)
+
+    def _next(self) -> _ScheduledQuery | None:
+        with self._cond:
+            while not self._closed:
+                if not self._queue or self._in_flight >= self._max_in_flight:
+                    self._cond.wait()
+                    continue
+                delay = self._bucket.wait_time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                query = heapq.heappop(self._queue)[2]
+                # cancelled by the caller before _discard took it out of the queue
+                if query.future.cancelled():
+                    self._forget(query)
+                    continue
+                self._bucket.try_acquire()
+                self._in_flight += 1
+                return query
+            return None
+
+    def _send(self, query: _ScheduledQuery) -> None:
+        req_id = self._request_id()
+        future = self._registry.register(req_id, query.timeout)
+        with self._cond:
+            closed = self._closed
+            if not closed:
+                self._sent[req_id] = query
+        future.add_done_callback(lambda done: self._finish(query, req_id, done))
+        if closed:
+            # closed after the query was taken from the queue
+            query.future.cancel()
+            self._registry.fail(req_id, CancelledError())
+            return
+        try:
+            ret = query.request(query.qry, req_id)
+        except Exception as e:
+            self._registry.fail(req_id, e)
+            return
+        if ret in THROTTLED_CODES:
+            self._registry.fail(req_id, _Throttled(ret))
+        elif ret != 0:
+            self._registry.fail(req_id, CallException(ret))
+
+    def _finish(self, query: _ScheduledQuery, req_id: int, done: Future) -> None:
+        exception = CancelledError() if done.cancelled() else done.exception()
+        with self._cond:
+            self._sent.pop(req_id, None)
+            self._in_flight -= 1
+            self._cond.notify()
+            if isinstance(exception, _Throttled):
+                query.retries += 1
+                if query.retries <= self._max_retries and not self._closed:
+                    logger.debug("%s is throttled with %s, retry %s", query.request.__name__, exception.error_id, query.retries)
+                    # the front is stricter than the bucket, wait for a whole token before sending anything
+                    self._bucket.drain()
+                    # the retried query goes before the queued ones, it has been waiting longer
+                    heapq.heappush(self._queue, (-1, next(self._counter), query))
+                    return
+                exception = CallException(exception.error_id)
+            self._forget(query)
+        if not query.future.set_running_or_notify_cancel():
+            return
+        if exception is not None:
+            query.future.set_exception(exception)
+        else:
+            query.future.set_result(done.result())
+
+    def _discard(self, query: _ScheduledQuery) -> None:
+        """take the query cancelled by the caller out of the queue, it is not sent if it is still queued"""
+        if not query.future.cancelled():
+            return
+        with self._cond:
+            self._forget(query)
+            queue = [entry for entry in self._queue if entry[2] is not query]
+            if len(queue) != len(self._queue):
+                heapq.heapify(queue)
+                self._queue = queue
+
+    def _forget(self, query: _ScheduledQuery) -> None:
+        """under the lock, a new identical query may have replaced this one"""
+        if self._pending.get(query.key) is query:
+            del self._pending[query.key]
@@ -0,0 +1,152 @@
+import heapq
+import math
+import threading
+import time
+from concurrent.futures import Future
+
+from ..exceptions import CtpException
+from ..objects.responses import CtpResponse
+
+
+# the minimum interval between two sweeps of the waiter, the requests expiring meanwhile are failed together
+_RESOLUTION = 0.05
+
+
+class _PendingRequest(object):
+    __slots__ = ("future", "rows", "deadline")
+
+    def __init__(self, future: Future, deadline: float) -> None:
+        self.future = future
+        self.rows: list = []
+        self.deadline = deadline
+
+
+class RequestRegistry(object):
+    """
+    Correlates the OnRsp* callbacks with the requests by RequestID, the rows are accumulated until IsLast,
+    then the future of the request is completed with the list of the rows.
+    The expired requests fail with TimeoutError, they are swept when a request is registered or fed,
+    and by one waiter thread sleeping until the earliest deadline in a heap, so that they expire without any further traffic.
+    The waiter wakes at most once per _RESOLUTION seconds and exits when there is no deadline left.
+    The futures are completed outside of the lock, in the thread feeding the last response or the waiter thread.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[int, _PendingRequest] = {}
+        self._lock = threading.Lock()
+        self._deadline_changed = threading.Condition(self._lock)
+        # (deadline, req_id) of the requests given a timeout, the entries of the completed requests are left until their deadline
+        self._deadlines: list[tuple[float, int]] = []
+        self._waiter: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, req_id: int) -> bool:
+        return req_id in self._pending
+
+    def register(self, req_id: int, timeout: float | None = None) -> Future:
+        """register the request before sending it, the response may arrive before the call returns"""
+        future = Future()
+        deadline = time.monotonic() + timeout if timeout is not None else math.inf
+        with self._lock:
+            expired = self._sweep(time.monotonic())
+            self._pending[req_id] = _PendingRequest(future, deadline)
+            if deadline != math.inf:
+                self._push(deadline, req_id)
+        _expire(expired)
+        # the entry of a request cancelled by the caller is removed at once
+        future.add_done_callback(lambda _: self._remove(req_id, future))
+        return future
+
+    def feed(self, rsp: CtpResponse) -> bool:
+        """return False if the response does not belong to any registered request"""
+        finished = None
+        with self._lock:
+            expired = self._sweep(time.monotonic())
+            pending = self._pending.get(rsp.RequestID)
+            if pending is not None:
+                if rsp.ok and rsp.args[0] is not None:
+                    pending.rows.append(rsp.args[0])
+                if rsp.IsLast or not rsp.ok:
+                    finished = self._pending.pop(rsp.RequestID)
+        _expire(expired)
+        if finished is None:
+            return pending is not None
+        if rsp.ok:
+            _complete(finished.future, finished.rows)
+        else:
+            _fail(finished.future, CtpException(rsp.RspInfo.ErrorID, rsp.RspInfo.ErrorMsg))
+        return True
+
+    def fail(self, req_id: int, exception: BaseException) -> None:
+        with self._lock:
+            pending = self._pending.pop(req_id, None)
+        if pending is not None:
+            _fail(pending.future, exception)
+
+    def sweep(self) -> int:
+        """fail the expired requests with TimeoutError, return the number of them"""
+        with self._lock:
+            expired = self._sweep(time.monotonic())
+        _expire(expired)
+        return len(expired)
+
+    def _push(self, deadline: float, req_id: int) -> None:
+        """add the deadline under the lock, start the waiter or wake it up if the deadline is the earliest"""
+        earliest = not self._deadlines or deadline < self._deadlines[0][0]
+        heapq.heappush(self._deadlines, (deadline, req_id))
+        if self._waiter is None:
+            self._waiter = threading.Thread(target=self._wait, name="RequestTimeout", daemon=True)
+            self._waiter.start()
+        elif earliest:
+            self._deadline_changed.notify()
+
+    def _wait(self) -> None:
+        last_sweep = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._deadlines:
+                    self._waiter = None
+                    return
+                wake_at = max(self._deadlines[0][0], last_sweep + _RESOLUTION)
+                now = time.monotonic()
+                if now < wake_at:
+                    self._deadline_changed.wait(wake_at - now)
+                    continue
+                expired = self._sweep(now)
+                last_sweep = now
+            _expire(expired)
+
+    def _sweep(self, now: float) -> list[tuple[int, Future]]:
+        """remove the expired requests under the lock, they are failed by _expire after the lock is released"""
+        deadlines = self._deadlines
+        expired = []
+        while deadlines and deadlines[0][0] <= now:
+            deadline, req_id = heapq.heappop(deadlines)
+            pending = self._pending.get(req_id)
+            if pending is not None and pending.deadline == deadline:
+                del self._pending[req_id]
+                expired.append((req_id, pending.future))
+        return expired
+
+    def _remove(self, req_id: int, future: Future) -> None:
+        with self._lock:
+            pending = self._pending.get(req_id)
+            if pending is not None and pending.future is future:
+                del self._pending[req_id]
+
+
+def _expire(expired: list[tuple[int, Future]]) -> None:
+    for req_id, future in expired:
+        _fail(future, TimeoutError("request %s timed out" % req_id))
+
+
+def _complete(future: Future, rows: list) -> None:
+    if future.set_running_or_notify_cancel():
+        future.set_result(rows)
+
+
+def _fail(future: Future, exception: BaseException) -> None:
+    if future.set_running_or_notify_cancel():
+        future.set_exception(exception)
@@ -1,10 +1,26 @@
-from typing import Callable, Tuple
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Tuple
 from ..openctp import tdapi
 
+from ..exceptions import CallException
+
 from ..objects.config import CtpConfig
 from ..objects.enums import CtpMethod, Api
 from ..objects.fields import *
 from ..objects.responses import *
+from ..utils.log import deprecated_log
+from .order_rate_limiter import OrderRateLimiter
+from .query_scheduler import DEFAULT_QUERY_TIMEOUT, QueryScheduler
+from .request_registry import RequestRegistry
+
+if TYPE_CHECKING:
+    from ..risk import RiskPipeline
+
+
+logger = logging.getLogger(__name__)
 
 
 class TdAPI(tdapi.CThostFtdcTraderSpi):
@@ -13,8 +29,17 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
         super().__init__()
         self.config = config
         self._request_count = 0
+        self._order_ref = 0
+        self._counter_lock = threading.Lock()
         self._callback = self._default_callback
         self._spi_callback: dict[CtpMethod, Callable] = {}
+        self._listeners: dict[CtpMethod, Tuple[Callable, ...]] = {}
+        self._requests = RequestRegistry()
+        self._query_scheduler = self._new_query_scheduler()
+        self._order_rate_limiter: OrderRateLimiter | None = None
+        # (FrontID, SessionID) of the login
+        self._session: tuple[int, int] | None = None
+        self._risk_pipeline: 'RiskPipeline | None' = None
         self._api: tdapi.CThostFtdcTraderApi = tdapi.CThostFtdcTraderApi.CreateFtdcTraderApi(self.config.user_id)
         self._api.RegisterSpi(self)
         self._api.SubscribePrivateTopic(tdapi.THOST_TERT_QUICK)
@@ -23,13 +48,53 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     @property
     def request_id(self) -> int:
-        self._request_count += 1
-        return self._request_count
+        # the requests are sent from the user, scheduler and spi threads
+        with self._counter_lock:
+            self._request_count += 1
+            return self._request_count
+    
+    @property
+    def order_ref(self) -> str:
+        with self._counter_lock:
+            self._order_ref += 1
+            return str(self._order_ref)
     
     @property
     def api(self) -> tdapi.CThostFtdcTraderApi:
         return self._api
     
+    @property
+    def requests(self) -> RequestRegistry:
+        return self._requests
+    
+    @property
+    def query_scheduler(self) -> QueryScheduler:
+        return self._query_scheduler
+    
+    @property
+    def order_rate_limiter(self) -> OrderRateLimiter | None:
+        return self._order_rate_limiter
+    
+    @order_rate_limiter.setter
+    def order_rate_limiter(self, limiter: OrderRateLimiter | None) -> None:
+        """
+        ReqOrderInsert and ReqOrderAction pass through the limiter if it is set,
+        the delayed requests failed or dropped by the limiter are answered by OnRspOrderInsert or OnRspOrderAction.
+        """
+        if limiter is not None:
+            limiter.session = self._session
+            limiter.on_error = self._on_rate_limiter_error
+        self._order_rate_limiter = limiter
+    
+    @property
+    def risk_pipeline(self) -> 'RiskPipeline | None':
+        return self._risk_pipeline
+    
+    @risk_pipeline.setter
+    def risk_pipeline(self, pipeline: 'RiskPipeline | None') -> None:
+        """the RiskPipeline checking the orders before ReqOrderInsert sends them, RiskException is raised when rejected"""
+        self._risk_pipeline = pipeline
+    
     @property
     def callback(self) -> Callable:
         return self._callback
@@ -39,15 +104,51 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
         self._callback = callback
     
     def log(self, *args, **kwargs) -> None:
-        print(*args, **kwargs)
+        """deprecated, the arguments are logged at info level by the logger of this module"""
+        deprecated_log(logger, *args, **kwargs)
     
     def _default_callback(self, response: CtpResponse) -> None:
         if response.method in self._spi_callback:
             self._spi_callback[response.method](*response.args)
         else:
-            # TODO: add warning
-            self.log(f"no callback for {response.method.name()} found")
+            logger.debug("no callback for %s found", response.method.name)
 
+
+    def _from_ctp_object(self, field_type: type[CtpField], obj: Any) -> CtpField | None:
+        if self.config.trusted_inbound:
+            return field_type.construct_from_ctp_object(obj)
+        return field_type.from_ctp_object(obj)
+    
+    def query(self, request: Callable[[CtpField, int], int], qry: CtpField, timeout: float | None = None) -> Future:
+        """
+        send the query by request, one of the ReqQry* methods, the future is completed with all the rows once IsLast arrives.
+        The responses of the query are not passed to the callback.
+        """
+        req_id = self.request_id
+        future = self._requests.register(req_id, timeout)
+        ret = request(qry, req_id)
+        if ret != 0:
+            self._requests.fail(req_id, CallException(ret))
+        return future
+    
+    def query_async(self, request: Callable[[CtpField, int], int], qry: CtpField, timeout: float | None = None) -> asyncio.Future:
+        """the asyncio version of query, it must be called in the event loop"""
+        return asyncio.wrap_future(self.query(request, qry, timeout))
+    
+    def schedule_query(self, request: Callable[[CtpField, int], int], qry: CtpField, priority: int | None = None, timeout: float | None = DEFAULT_QUERY_TIMEOUT) -> Future:
+        """
+        like query, but the query is queued and paced by the query scheduler, the throttled ones are retried.
+        The identical pending queries share one future, the positions are queried before the settlement info.
+        The pending queries are cancelled by Disconnect.
+        """
+        return self._query_scheduler.submit(request, qry, priority, timeout)
+    
+    def _new_query_scheduler(self) -> QueryScheduler:
+        return QueryScheduler(lambda: self.request_id, self._requests, self.config.query_rate)
+    
+    def _query_callback(self, rsp: CtpResponse) -> None:
+        if not self._requests.feed(rsp):
+            self.callback(rsp)
     
     def set_spi_callback(self, method: CtpMethod, callback: Callable):
         self._spi_callback[method] = callback
@@ -58,15 +159,46 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     def del_spi_callback(self, method: CtpMethod) -> Callable | None:
         return self._spi_callback.pop(method, None)
     
+    def add_listener(self, method: CtpMethod, listener: Callable) -> None:
+        """
+        The listener is called in the spi thread with the same arguments as the spi callback, before the callback.
+        Only the order and trade methods have listeners: OnRtnOrder, OnRtnTrade and the order insert and action errors.
+        """
+        listeners = self._listeners.get(method, ())
+        if listener not in listeners:
+            self._listeners[method] = listeners + (listener,)
+    
+    def remove_listener(self, method: CtpMethod, listener: Callable) -> None:
+        self._listeners[method] = tuple(l for l in self._listeners.get(method, ()) if l != listener)
+    
+    def _on_rate_limiter_error(self, req: Any, req_id: int, error_id: int) -> None:
+        rsp_info = RspInfoField(ErrorID=error_id, ErrorMsg="rejected by the order rate limiter")
+        if hasattr(req, "ActionFlag"):
+            rsp = RspOrderAction(InputOrderAction=self._from_ctp_object(InputOrderActionField, req), RspInfo=rsp_info, RequestID=req_id, IsLast=True)
+        else:
+            rsp = RspOrderInsert(InputOrder=self._from_ctp_object(InputOrderField, req), RspInfo=rsp_info, RequestID=req_id, IsLast=True)
+        self._notify_callback(rsp)
+    
+    def _notify_callback(self, rsp: CtpResponse) -> None:
+        for listener in self._listeners.get(rsp.method, ()):
+            listener(*rsp.args)
+        self.callback(rsp)
+    
     def Connect(self) -> None:
+        # the scheduler closed by Disconnect can not be reopened
+        if self._query_scheduler.closed:
+            self._query_scheduler = self._new_query_scheduler()
         self.api.Init()
     
     def Disconnect(self) -> None:
+        self._query_scheduler.close()
+        if self._order_rate_limiter is not None:
+            self._order_rate_limiter.close()
         self.api.Release()
         self.api.Join()
     
     def OnFrontConnected(self) -> None:
-        self.log("on front connected")
+        logger.info("td front connected")
         req = tdapi.CThostFtdcReqAuthenticateField()
         req.BrokerID = self.config.broker_id
         req.UserID = self.config.user_id
@@ -78,7 +210,7 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
         if pRspInfo is None or pRspInfo.ErrorID == 0:
             self._login()
         else:
-            self.log(f"on rsp authenticate {pRspInfo.ErrorID}, {pRspInfo.ErrorMsg}")
+            logger.error("td authenticate failed, ErrorID: %s, ErrorMsg: %s", pRspInfo.ErrorID, pRspInfo.ErrorMsg)
             self._authenticate_failed(pRspAuthenticateField, pRspInfo, nRequestID, bIsLast)
     
     def _login(self) -> None:
@@ -90,8 +222,8 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def _authenticate_failed(self, pRspAuthenticateField, pRspInfo, nRequestID, bIsLast) -> None:
         rsp = RspAuthenticate(
-            RspAuthenticate=RspAuthenticateField.from_ctp_object(pRspAuthenticateField),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            RspAuthenticate=self._from_ctp_object(RspAuthenticateField, pRspAuthenticateField),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
@@ -100,14 +232,21 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     def OnRspUserLogin(self, pRspUserLogin, pRspInfo, nRequestID, bIsLast):
         """called when login responding"""
         rsp = RspUserLogin(
-            RspUserLogin=RspUserLoginField.from_ctp_object(pRspUserLogin),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            RspUserLogin=self._from_ctp_object(RspUserLoginField, pRspUserLogin),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
         rsp.source = Api.Td
+        if pRspUserLogin is not None and pRspUserLogin.MaxOrderRef:
+            with self._counter_lock:
+                self._order_ref = int(pRspUserLogin.MaxOrderRef)
+        if pRspUserLogin is not None and pRspUserLogin.SessionID:
+            self._session = (pRspUserLogin.FrontID, pRspUserLogin.SessionID)
+            if self._order_rate_limiter is not None:
+                self._order_rate_limiter.session = self._session
         if pRspInfo is not None:
-            self.log(f"login rsp info, ErrorID: {pRspInfo.ErrorID}, ErrorMsg: {pRspInfo.ErrorMsg}")
+            logger.info("td login rsp info, ErrorID: %s, ErrorMsg: %s", pRspInfo.ErrorID, pRspInfo.ErrorMsg)
         self.callback(rsp)
     
     def ReqQrySettlementInfo(self, qry_settlement_info: QrySettlementInfoField, req_id: int | None = None) -> int:
@@ -117,12 +256,12 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def OnRspQrySettlementInfo(self, pSettlementInfo: tdapi.CThostFtdcSettlementInfoField, pRspInfo, nRequestID, bIsLast):
         rsp = RspQrySettlementInfo(
-            SettlementInfo=SettlementInfoField.from_ctp_object(pSettlementInfo),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            SettlementInfo=self._from_ctp_object(SettlementInfoField, pSettlementInfo),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._query_callback(rsp)
     
     def ReqQrySettlementInfoConfirm(self, qry_settlement_info_confirm: QrySettlementInfoConfirmField, req_id: int | None = None) -> int:
         req = qry_settlement_info_confirm.ctp_object()
@@ -131,12 +270,12 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def OnRspQrySettlementInfoConfirm(self, pSettlementInfoConfirm: tdapi.CThostFtdcSettlementInfoConfirmField, pRspInfo, nRequestID, bIsLast):
         rsp = RspQrySettlementInfoConfirm(
-            SettlementInfoConfirm=SettlementInfoConfirmField.from_ctp_object(pSettlementInfoConfirm),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            SettlementInfoConfirm=self._from_ctp_object(SettlementInfoConfirmField, pSettlementInfoConfirm),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._query_callback(rsp)
     
     def ReqQryInstrument(self, qry_instrument: QryInstrumentField, req_id: int | None = None) -> int:
         # TODO: use exception to throw the api error, and return the request_id
@@ -146,71 +285,78 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def OnRspQryInstrument(self, pInstrument: tdapi.CThostFtdcInstrumentField, pRspInfo, nRequestID, bIsLast):
         rsp = RspQryInstrument(
-            Instrument=InstrumentField.from_ctp_object(pInstrument),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            Instrument=self._from_ctp_object(InstrumentField, pInstrument),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._query_callback(rsp)
     
-    def ReqOrderInsert(self, input_order: InputOrderField, req_id: int | None = None) -> None:
-        req = input_order.ctp_object()
+    def ReqOrderInsert(self, input_order: InputOrderField | tdapi.CThostFtdcInputOrderField, req_id: int | None = None) -> None:
+        """input_order can also be a prebuilt ctp object, which is sent as is"""
+        req = input_order.ctp_object() if isinstance(input_order, CtpField) else input_order
+        if self._risk_pipeline is not None:
+            self._risk_pipeline.check(req)
         req_id = req_id or self.request_id
+        if self._order_rate_limiter is not None:
+            return self._order_rate_limiter.order_insert(self._api.ReqOrderInsert, req, req_id)
         return self._api.ReqOrderInsert(req, req_id)
         
     def OnRspOrderInsert(self, pInputOrder: tdapi.CThostFtdcInputOrderField, pRspInfo, nRequestID, bIsLast):
         """Error raised by the CTP"""
         rsp = RspOrderInsert(
-            InputOrder=InputOrderField.from_ctp_object(pInputOrder),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            InputOrder=self._from_ctp_object(InputOrderField, pInputOrder),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._notify_callback(rsp)
     
     def OnErrRtnOrderInsert(self, pInputOrder: tdapi.CThostFtdcInputOrderField, pRspInfo):
         """Error raised by the exchange"""
         rsp = ErrRtnOrderInsert(
-            InputOrder=InputOrderField.from_ctp_object(pInputOrder),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            InputOrder=self._from_ctp_object(InputOrderField, pInputOrder),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
         )
-        self.callback(rsp)
+        self._notify_callback(rsp)
     
     def OnRtnOrder(self, pOrder: tdapi.CThostFtdcOrderField):
         """Success order insert or order action"""
         rsp = RtnOrder(
-            Order=OrderField.from_ctp_object(pOrder),
+            Order=self._from_ctp_object(OrderField, pOrder),
         )
-        self.callback(rsp)
+        self._notify_callback(rsp)
     
     def OnRtnTrade(self, pTrade: tdapi.CThostFtdcTradeField):
         rsp = RtnTrade(
-            Trade=TradeField.from_ctp_object(pTrade),
+            Trade=self._from_ctp_object(TradeField, pTrade),
         )
-        self.callback(rsp)
+        self._notify_callback(rsp)
     
     def ReqOrderAction(self, input_order_action: InputOrderActionField, req_id: int | None = None) -> None:
         req = input_order_action.ctp_object()
         req_id = req_id or self.request_id
+        if self._order_rate_limiter is not None:
+            return self._order_rate_limiter.order_action(self._api.ReqOrderAction, req, req_id)
         return self._api.ReqOrderAction(req, req_id)
     
     def OnRspOrderAction(self, pInputOrderAction: tdapi.CThostFtdcInputOrderActionField, pRspInfo, nRequestID, bIsLast):
         """Error raised by the CTP"""
         rsp = RspOrderAction(
-            InputOrderAction=InputOrderActionField.from_ctp_object(pInputOrderAction),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            InputOrderAction=self._from_ctp_object(InputOrderActionField, pInputOrderAction),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._notify_callback(rsp)
     
     def OnErrRtnOrderAction(self, pInputOrderAction: tdapi.CThostFtdcInputOrderActionField, pRspInfo):
         """Error raised by the exchange"""
         rsp = ErrRtnOrderAction(
-            OrderAction=OrderActionField.from_ctp_object(pInputOrderAction),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            OrderAction=self._from_ctp_object(OrderActionField, pInputOrderAction),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
         )
-        self.callback(rsp)
+        self._notify_callback(rsp)
     
     def ReqQryTradingAccount(self, qry_trading_account: QryTradingAccountField, req_id: int | None = None) -> int:
         req = qry_trading_account.ctp_object()
@@ -219,12 +365,12 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def OnRspQryTradingAccount(self, pTradingAccount: tdapi.CThostFtdcTradingAccountField, pRspInfo, nRequestID, bIsLast):
         rsp = RspQryTradingAccount(
-            TradingAccount=TradingAccountField.from_ctp_object(pTradingAccount),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            TradingAccount=self._from_ctp_object(TradingAccountField, pTradingAccount),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._query_callback(rsp)
     
     def ReqQryInvestorPosition(self, qry_investor_position: QryInvestorPositionField, req_id: int | None = None) -> int:
         req = qry_investor_position.ctp_object()
@@ -233,12 +379,12 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def OnRspQryInvestorPosition(self, pInvestorPosition: tdapi.CThostFtdcInvestorPositionField, pRspInfo, nRequestID, bIsLast):
         rsp = RspQryInvestorPosition(
-            InvestorPosition=InvestorPositionField.from_ctp_object(pInvestorPosition),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            InvestorPosition=self._from_ctp_object(InvestorPositionField, pInvestorPosition),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._query_callback(rsp)
     
     def ReqQryOrder(self, qry_order: QryOrderField, req_id: int | None = None) -> int:
         req = qry_order.ctp_object()
@@ -247,12 +393,12 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def OnRspQryOrder(self, pOrder: tdapi.CThostFtdcOrderField, pRspInfo, nRequestID, bIsLast):
         rsp = RspQryOrder(
-            Order=OrderField.from_ctp_object(pOrder),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            Order=self._from_ctp_object(OrderField, pOrder),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._query_callback(rsp)
     
     def ReqQryTrade(self, qry_trade: QryTradeField, req_id: int | None = None) -> int:
         req = qry_trade.ctp_object()
@@ -261,9 +407,9 @@ class TdAPI(tdapi.CThostFtdcTraderSpi):
     
     def OnRspQryTrade(self, pTrade: tdapi.CThostFtdcTradeField, pRspInfo, nRequestID, bIsLast):
         rsp = RspQryTrade(
-            Trade=TradeField.from_ctp_object(pTrade),
-            RspInfo=RspInfoField.from_ctp_object(pRspInfo),
+            Trade=self._from_ctp_object(TradeField, pTrade),
+            RspInfo=self._from_ctp_object(RspInfoField, pRspInfo),
             RequestID=nRequestID,
             IsLast=bIsLast
         )
-        self.callback(rsp)
+        self._query_callback(rsp)
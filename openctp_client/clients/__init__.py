@@ -1 +1,4 @@
 from .simple_ctp_client import SimpleCtpClient, SimpleCtpClientEvent
+from .async_ctp_client import AsyncCtpClient
+from .order_template import OrderTemplates
+from .rsp_queues import BatchQueue, SpscRingBuffer, RingBufferQueue, ConflatingQueue, BoundedQueue, OverflowPolicy
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Callable, Optional
+
+from ..apis import MdAPI, TdAPI
+from ..exceptions import CtpException
+from ..objects import CtpConfig
+from ..objects.enums import Api, CtpMethod, Direction, Offset
+from ..objects.responses import *
+from .order_template import OrderTemplates
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCtpClient(object):
+    """
+    asyncio client of MdAPI and TdAPI, the spi callbacks are handed over to the event loop without a consumer thread.
+    The responses are buffered and the loop is woken up once for all the responses arrived before it runs.
+    A stream given maxsize drops its oldest item when it is full, the dropped items are counted in dropped.
+    """
+
+    def __init__(self, config: CtpConfig, query_timeout: float | None = None) -> None:
+        self._config = config
+        self._query_timeout = query_timeout
+        self._tdapi: TdAPI = TdAPI(config)
+        self._tdapi.callback = self._produce_rsp
+        self._mdapi: MdAPI = MdAPI(config)
+        self._mdapi.callback = self._produce_rsp
+        self._order_templates = OrderTemplates(config.broker_id, config.investor_id)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: deque = deque()
+        self._wakeup_scheduled = False
+        self._login_futures: dict[Api, asyncio.Future] = {}
+        # key is the instrument id, None for the streams of every instrument
+        self._tick_streams: dict[Optional[str], list[asyncio.Queue]] = {}
+        self._streams: dict[CtpMethod, list[asyncio.Queue]] = {}
+        self._dropped = 0
+
+    @property
+    def dropped(self) -> int:
+        """count of the items dropped by the full streams"""
+        return self._dropped
+
+    @property
+    def tdapi(self) -> TdAPI:
+        return self._tdapi
+
+    @property
+    def mdapi(self) -> MdAPI:
+        return self._mdapi
+
+    async def connect(self) -> None:
+        """connect and login to both md and td, raise CtpException when failed"""
+        self._loop = asyncio.get_running_loop()
+        self._login_futures = {Api.Md: self._loop.create_future(), Api.Td: self._loop.create_future()}
+        self._mdapi.Connect()
+        self._tdapi.Connect()
+        await asyncio.gather(*self._login_futures.values())
+
+    async def disconnect(self) -> None:
+        await self._loop.run_in_executor(None, self._mdapi.Disconnect)
+        await self._loop.run_in_executor(None, self._tdapi.Disconnect)
+
+    async def ticks(self, *instruments: str, maxsize: int = 0) -> AsyncIterator[DepthMarketDataField]:
+        """subscribe and iterate the depth market data of instruments, or of all the subscribed ones if not given"""
+        stream = asyncio.Queue(maxsize)
+        keys = instruments or (None,)
+        for key in keys:
+            self._tick_streams.setdefault(key, []).append(stream)
+        if instruments:
+            self._mdapi.SubscribeMarketData(list(instruments))
+        try:
+            while True:
+                yield await stream.get()
+        finally:
+            for key in keys:
+                self._tick_streams[key].remove(stream)
+
+    async def orders(self, maxsize: int = 0) -> AsyncIterator[OrderField]:
+        async for rsp in self._stream(CtpMethod.OnRtnOrder, maxsize):
+            yield rsp.Order
+
+    async def trades(self, maxsize: int = 0) -> AsyncIterator[TradeField]:
+        async for rsp in self._stream(CtpMethod.OnRtnTrade, maxsize):
+            yield rsp.Trade
+
+    def order_insert(self, exchange: str, instrument: str, price: float, volume: int, direction: Direction, offset: Offset) -> int:
+        req_id = self._tdapi.request_id
+        req = self._order_templates.fill(exchange, instrument, direction, offset, price, volume, self._tdapi.order_ref, req_id)
+        return self._tdapi.ReqOrderInsert(req, req_id)
+
+    async def query_instruments(self, qry_instrument: QryInstrumentField | None = None) -> list[InstrumentField]:
+        return await self._query(self._tdapi.ReqQryInstrument, qry_instrument or QryInstrumentField())
+
+    async def query_positions(self, qry_investor_position: QryInvestorPositionField | None = None) -> list[InvestorPositionField]:
+        qry = qry_investor_position or QryInvestorPositionField(BrokerID=self._config.broker_id, InvestorID=self._config.investor_id)
+        return await self._query(self._tdapi.ReqQryInvestorPosition, qry)
+
+    async def query_account(self, qry_trading_account: QryTradingAccountField | None = None) -> list[TradingAccountField]:
+        qry = qry_trading_account or QryTradingAccountField(BrokerID=self._config.broker_id, InvestorID=self._config.investor_id)
+        return await self._query(self._tdapi.ReqQryTradingAccount, qry)
+
+    async def query_orders(self, qry_order: QryOrderField | None = None) -> list[OrderField]:
+        qry = qry_order or QryOrderField(BrokerID=self._config.broker_id, InvestorID=self._config.investor_id)
+        return await self._query(self._tdapi.ReqQryOrder, qry)
+
+    async def query_trades(self, qry_trade: QryTradeField | None = None) -> list[TradeField]:
+        qry = qry_trade or QryTradeField(BrokerID=self._config.broker_id, InvestorID=self._config.investor_id)
+        return await self._query(self._tdapi.ReqQryTrade, qry)
+
+    async def query_settlement_info(self, qry_settlement_info: QrySettlementInfoField | None = None) -> list[SettlementInfoField]:
+        qry = qry_settlement_info or QrySettlementInfoField(BrokerID=self._config.broker_id, InvestorID=self._config.investor_id)
+        return await self._query(self._tdapi.ReqQrySettlementInfo, qry)
+
+    async def _query(self, request: Callable[[CtpField, int], int], qry: CtpField) -> list[CtpField]:
+        # the rows are collected by the request registry of TdAPI in the spi thread, the loop is woken up once per query
+        return await self._tdapi.query_async(request, qry, self._query_timeout)
+
+    async def _stream(self, method: CtpMethod, maxsize: int) -> AsyncIterator[CtpResponse]:
+        stream = asyncio.Queue(maxsize)
+        self._streams.setdefault(method, []).append(stream)
+        try:
+            while True:
+                yield await stream.get()
+        finally:
+            self._streams[method].remove(stream)
+
+    def _produce_rsp(self, rsp: CtpResponse) -> None:
+        """called in the spi threads"""
+        if self._loop is None:
+            logger.warning("not connected, %s is dropped", rsp.method)
+            return
+        self._pending.append(rsp)
+        if not self._wakeup_scheduled:
+            self._wakeup_scheduled = True
+            try:
+                self._loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                logger.warning("event loop is closed, %s is dropped", rsp.method)
+
+    def _drain(self) -> None:
+        # clear the flag before draining, the responses arrived after it schedule another drain
+        self._wakeup_scheduled = False
+        pending = self._pending
+        while pending:
+            self._process_rsp(pending.popleft())
+
+    def _process_rsp(self, rsp: CtpResponse) -> None:
+        method = rsp.method
+        if method is CtpMethod.OnRtnDepthMarketData:
+            self._put_tick(rsp.DepthMarketData)
+        elif method is CtpMethod.OnRspUserLogin:
+            self._login(rsp.source, rsp.RspInfo)
+        elif method is CtpMethod.OnRspAuthenticate:
+            self._login(Api.Td, rsp.RspInfo)
+        for stream in self._streams.get(method, ()):
+            self._offer(stream, rsp)
+
+    def _put_tick(self, tick: DepthMarketDataField) -> None:
+        for stream in self._tick_streams.get(tick.InstrumentID, ()):
+            self._offer(stream, tick)
+        for stream in self._tick_streams.get(None, ()):
+            self._offer(stream, tick)
+
+    def _offer(self, stream: asyncio.Queue, item: object) -> None:
+        # a slow consumer must not stop the drain, so the oldest item of a full stream makes room for the new one
+        if stream.full():
+            stream.get_nowait()
+            self._dropped += 1
+        stream.put_nowait(item)
+
+    def _login(self, source: Api, rsp_info: RspInfoField) -> None:
+        future = self._login_futures.get(source)
+        if future is None or future.done():
+            return
+        if rsp_info.ok:
+            logger.info("Connect to %s success.", source.name)
+            future.set_result(None)
+        else:
+            logger.error("Connect to %s failed.", source.name)
+            future.set_exception(CtpException(rsp_info.ErrorID, rsp_info.ErrorMsg))
@@ -0,0 +1,61 @@
+from typing import Tuple
+
+from ..openctp import tdapi
+from ..objects.enums import Direction, Offset
+from ..objects.fields import InputOrderField
+
+
+OrderTemplateKey = Tuple[str, str, Direction, Offset]
+
+
+class OrderTemplates(object):
+    """
+    Cache of prebuilt CThostFtdcInputOrderField, one for each (exchange, instrument, direction, offset).
+    The static fields are filled once, only the price, volume, order ref and request id are patched per order.
+    The cached ctp objects are reused, so the templates should be used by one thread only.
+    """
+
+    def __init__(self, broker_id: str, investor_id: str) -> None:
+        self._broker_id = broker_id
+        self._investor_id = investor_id
+        self._templates: dict[OrderTemplateKey, tdapi.CThostFtdcInputOrderField] = {}
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def get(self, exchange: str, instrument: str, direction: Direction, offset: Offset) -> tdapi.CThostFtdcInputOrderField:
+        key = (exchange, instrument, direction, offset)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._templates[key] = self._build(exchange, instrument, direction, offset)
+        return template
+
+    def fill(self, exchange: str, instrument: str, direction: Direction, offset: Offset, price: float, volume: int, order_ref: str, request_id: int) -> tdapi.CThostFtdcInputOrderField:
+        req = self.get(exchange, instrument, direction, offset)
+        req.LimitPrice = price
+        req.VolumeTotalOriginal = volume
+        req.OrderRef = order_ref
+        req.RequestID = request_id
+        return req
+
+    def clear(self) -> None:
+        self._templates.clear()
+
+    def _build(self, exchange: str, instrument: str, direction: Direction, offset: Offset) -> tdapi.CThostFtdcInputOrderField:
+        return InputOrderField(
+            BrokerID=self._broker_id,
+            InvestorID=self._investor_id,
+            ExchangeID=exchange,
+            InstrumentID=instrument,
+            CombOffsetFlag=offset.value,
+            CombHedgeFlag='1',
+            Direction=direction.value,
+            IsAutoSuspend=0,
+            IsSwapOrder=0,
+            OrderPriceType='2',
+            TimeCondition='3',
+            VolumeCondition='1',
+            ContingentCondition='1',
+            ForceCloseReason='0',
+            StopPrice=0
+        ).ctp_object()
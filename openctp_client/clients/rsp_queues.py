@@ -0,0 +1,370 @@
+import pickle
+import tempfile
+import threading
+import time
+from collections import deque
+from enum import Enum, auto
+from typing import Any, Callable
+
+from ..objects.enums import CtpMethod
+
+
+class BatchQueue(object):
+    """Unbounded FIFO queue, the consumer takes all the available items with one lock acquisition."""
+
+    def __init__(self) -> None:
+        self._items: deque = deque()
+        self._not_empty = threading.Condition(threading.Lock())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any) -> None:
+        with self._not_empty:
+            self._items.append(item)
+            self._not_empty.notify()
+
+    def get_batch(self, max_items: int) -> list[Any]:
+        """block until there is any item, then return at most max_items items"""
+        with self._not_empty:
+            while not self._items:
+                self._not_empty.wait()
+            items = self._items
+            return [items.popleft() for _ in range(min(len(items), max_items))]
+
+
+class _Waker(object):
+    """the consumer sets sleeping before waiting on the event, the producers set the event only when it is sleeping"""
+    __slots__ = ("sleeping", "event")
+
+    def __init__(self) -> None:
+        self.sleeping = False
+        self.event = threading.Event()
+
+
+class SpscRingBuffer(object):
+    """
+    Single producer single consumer ring buffer, put and get_batch do not take any lock.
+    The producer waits for the consumer when the buffer is full, and the consumer sleeps only when it is empty.
+    It is only safe when there is exactly one producer thread and one consumer thread, use RingBufferQueue otherwise.
+    """
+
+    def __init__(self, capacity: int = 65536, waker: _Waker | None = None) -> None:
+        # round the capacity up to a power of two so that the index can be masked
+        capacity = 1 << max(capacity - 1, 1).bit_length()
+        self._buffer: list[Any] = [None] * capacity
+        self._capacity = capacity
+        self._mask = capacity - 1
+        self._head = 0
+        self._tail = 0
+        self._waker = waker or _Waker()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def put(self, item: Any) -> None:
+        tail = self._tail
+        while tail - self._head >= self._capacity:
+            time.sleep(0)
+        self._buffer[tail & self._mask] = item
+        # publish the item before checking whether the consumer is sleeping
+        self._tail = tail + 1
+        if self._waker.sleeping:
+            self._waker.event.set()
+
+    def drain(self, max_items: int) -> list[Any]:
+        """return at most max_items items without blocking"""
+        head = self._head
+        count = min(self._tail - head, max_items)
+        buffer, mask = self._buffer, self._mask
+        items = []
+        for index in range(head, head + count):
+            items.append(buffer[index & mask])
+            buffer[index & mask] = None
+        self._head = head + count
+        return items
+
+    def get_batch(self, max_items: int) -> list[Any]:
+        """block until there is any item, then return at most max_items items"""
+        while self._tail == self._head:
+            _sleep(self._waker, lambda: self._tail == self._head)
+        return self.drain(max_items)
+
+
+class RingBufferQueue(object):
+    """
+    One SpscRingBuffer for each producer thread, so that the producers never share a lock.
+    The order of the items put by the same thread is kept, but there is no order between the threads.
+    The empty rings of the threads which have exited are reclaimed when a new producer thread is added.
+    The None sentinel is not put to a ring, it is returned only after every ring is drained.
+    """
+
+    def __init__(self, capacity: int = 65536) -> None:
+        self._capacity = capacity
+        self._waker = _Waker()
+        self._rings: dict[int, SpscRingBuffer] = {}
+        self._ring_list: tuple[SpscRingBuffer, ...] = ()
+        self._start = 0
+        self._stops = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(ring) for ring in self._ring_list)
+
+    def put(self, item: Any) -> None:
+        if item is None:
+            with self._lock:
+                self._stops += 1
+            if self._waker.sleeping:
+                self._waker.event.set()
+            return
+        ring = self._rings.get(threading.get_ident())
+        if ring is None:
+            ring = self._add_ring()
+        ring.put(item)
+
+    def get_batch(self, max_items: int) -> list[Any]:
+        """block until there is any item, then return at most max_items items"""
+        while True:
+            # read the sentinels before draining, the items put before them are already in the rings
+            stops = self._stops
+            rings = self._ring_list
+            # start from a different ring each time so that a busy producer can not starve the others
+            self._start = (self._start + 1) % max(len(rings), 1)
+            items = []
+            for ring in rings[self._start:] + rings[:self._start]:
+                items.extend(ring.drain(max_items - len(items)))
+            # every ring was drained when the batch is not full
+            if stops and len(items) < max_items:
+                with self._lock:
+                    self._stops -= 1
+                items.append(None)
+            if items:
+                return items
+            _sleep(self._waker, lambda: len(self) == 0 and not self._stops)
+
+    def _add_ring(self) -> SpscRingBuffer:
+        with self._lock:
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident, ring in list(self._rings.items()):
+                if ident not in alive and not len(ring):
+                    del self._rings[ident]
+            ring = self._rings[threading.get_ident()] = SpscRingBuffer(self._capacity, self._waker)
+            self._ring_list = tuple(self._rings.values())
+        return ring
+
+
+class _PendingTick(object):
+    """placeholder of the latest depth market data of the instrument in the inner queue, it is a tick for BoundedQueue"""
+    __slots__ = ("instrument",)
+    method = CtpMethod.OnRtnDepthMarketData
+
+    def __init__(self, instrument: str) -> None:
+        self.instrument = instrument
+
+
+class ConflatingQueue(object):
+    """
+    Depth market data overwrites the pending one of the same InstrumentID instead of being appended,
+    so the consumer always gets the latest tick. The other responses keep the FIFO order of the inner queue.
+    on_drop is called with each overwritten tick, and with the pending tick whose placeholder the inner queue drops.
+    """
+
+    def __init__(self, rsp_queue: Any = None) -> None:
+        self._queue = rsp_queue if rsp_queue is not None else BatchQueue()
+        self._pending: dict[str, Any] = {}
+        self._conflated: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.on_drop: Callable[[Any], None] | None = None
+        if hasattr(self._queue, "on_drop"):
+            self._queue.on_drop = self._on_inner_drop
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def conflated(self) -> dict[str, int]:
+        """count of the overwritten ticks of each instrument"""
+        with self._lock:
+            return dict(self._conflated)
+
+    def put(self, item: Any) -> None:
+        if item is None or item.method is not CtpMethod.OnRtnDepthMarketData:
+            self._queue.put(item)
+            return
+        instrument = item.DepthMarketData.InstrumentID
+        with self._lock:
+            overwritten = self._pending.get(instrument)
+            self._pending[instrument] = item
+            if overwritten is not None:
+                self._conflated[instrument] = self._conflated.get(instrument, 0) + 1
+        if overwritten is None:
+            self._queue.put(_PendingTick(instrument))
+        elif self.on_drop is not None:
+            self.on_drop(overwritten)
+
+    def get_batch(self, max_items: int) -> list[Any]:
+        items = self._queue.get_batch(max_items)
+        with self._lock:
+            pending = self._pending
+            return [pending.pop(item.instrument) if type(item) is _PendingTick else item for item in items]
+
+    def _on_inner_drop(self, item: Any) -> None:
+        """the inner queue dropped the item, forget the pending tick of a placeholder so that the next tick is put again"""
+        if type(item) is _PendingTick:
+            with self._lock:
+                item = self._pending.pop(item.instrument, None)
+            if item is None:
+                return
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+
+class OverflowPolicy(Enum):
+    # drop the oldest pending tick to make room for the new one
+    DropOldest = auto()
+    # drop the new tick
+    DropNewest = auto()
+    # block the producer until there is room
+    Block = auto()
+    # write the new tick to a temporary file, it is loaded back when the consumer catches up
+    Spill = auto()
+
+
+class BoundedQueue(object):
+    """
+    FIFO queue holding at most capacity depth market data, the overflow policy decides what happens to the extra ticks.
+    The order, trade and other responses are never dropped or blocked, and they do not count towards the capacity.
+    The spilled ticks keep their order among the ticks, but are delivered after the responses put while spilling.
+    Any item with method OnRtnDepthMarketData is a tick, and on_drop is called with each dropped tick under the lock of the queue.
+    """
+
+    def __init__(self, capacity: int = 100000, policy: OverflowPolicy = OverflowPolicy.DropOldest, spill_dir: str | None = None) -> None:
+        self._capacity = capacity
+        self._policy = policy
+        self._spill_dir = spill_dir
+        self._items: deque = deque()
+        self._ticks = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._spill_file = None
+        self._spill_read_pos = 0
+        self._spill_count = 0
+        self._high_water_mark = 0
+        self._dropped = 0
+        self._spilled = 0
+        self.on_drop: Callable[[Any], None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._items) + self._spill_count
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "ticks": self._ticks,
+                "spill_size": self._spill_count,
+                "high_water_mark": self._high_water_mark,
+                "dropped": self._dropped,
+                "spilled": self._spilled,
+            }
+
+    def put(self, item: Any) -> None:
+        with self._lock:
+            if _is_tick(item):
+                if not self._put_tick(item):
+                    return
+            else:
+                self._items.append(item)
+            if len(self._items) > self._high_water_mark:
+                self._high_water_mark = len(self._items)
+            self._not_empty.notify()
+
+    def get_batch(self, max_items: int) -> list[Any]:
+        """block until there is any item, then return at most max_items items"""
+        with self._lock:
+            while not self._items and not self._spill_count:
+                self._not_empty.wait()
+            if self._spill_count and (not self._items or self._ticks < self._capacity // 2):
+                self._load_spilled(self._capacity - self._ticks)
+            items = self._items
+            batch = [items.popleft() for _ in range(min(len(items), max_items))]
+            self._ticks -= sum(1 for item in batch if _is_tick(item))
+            self._not_full.notify_all()
+            return batch
+
+    def _put_tick(self, item: Any) -> bool:
+        """put the tick under the lock, return False when it is dropped or spilled"""
+        if self._spill_count:
+            # ticks are spilled until the spilled ones are loaded back, so that they keep their order
+            self._spill(item)
+            return False
+        if self._ticks >= self._capacity:
+            if self._policy is OverflowPolicy.DropNewest:
+                self._drop(item)
+                return False
+            if self._policy is OverflowPolicy.DropOldest:
+                self._drop_oldest_tick()
+            elif self._policy is OverflowPolicy.Block:
+                while self._ticks >= self._capacity:
+                    self._not_full.wait()
+            else:
+                self._spill(item)
+                return False
+        self._items.append(item)
+        self._ticks += 1
+        return True
+
+    def _drop_oldest_tick(self) -> None:
+        for index, pending in enumerate(self._items):
+            if _is_tick(pending):
+                del self._items[index]
+                self._ticks -= 1
+                self._drop(pending)
+                return
+
+    def _drop(self, item: Any) -> None:
+        self._dropped += 1
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+    def _spill(self, item: Any) -> None:
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(dir=self._spill_dir)
+        self._spill_file.seek(0, 2)
+        pickle.dump(item, self._spill_file, pickle.HIGHEST_PROTOCOL)
+        self._spill_count += 1
+        self._spilled += 1
+        # the consumer may be waiting for the spilled ticks only
+        self._not_empty.notify()
+
+    def _load_spilled(self, max_items: int) -> None:
+        self._spill_file.seek(self._spill_read_pos)
+        for _ in range(min(self._spill_count, max_items)):
+            self._items.append(pickle.load(self._spill_file))
+            self._ticks += 1
+            self._spill_count -= 1
+        self._spill_read_pos = self._spill_file.tell()
+        if not self._spill_count:
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_read_pos = 0
+
+
+def _is_tick(item: Any) -> bool:
+    return getattr(item, "method", None) is CtpMethod.OnRtnDepthMarketData
+
+
+def _sleep(waker: _Waker, empty: callable) -> None:
+    waker.event.clear()
+    waker.sleeping = True
+    # check again after announcing the sleep, a producer may have published an item in between
+    if empty():
+        waker.event.wait()
+    waker.sleeping = False
@@ -1,13 +1,25 @@
-import queue
+import logging
 import threading
+import time
 from enum import Enum, auto
-from typing import Optional, Callable
+from operator import attrgetter
+from typing import Any, Optional, Callable
 
 from ..apis import MdAPI, TdAPI
 from ..exceptions import CtpException
 from ..objects import CtpConfig
-from ..objects.enums import CtpMethod
+from ..objects.enums import CtpMethod, Direction, Offset
 from ..objects.responses import *
+from ..utils.histogram import HANDLER, QUEUEING, TOTAL, LatencyRecorder
+from ..utils.log import deprecated_log
+from .order_template import OrderTemplates
+from .rsp_queues import BatchQueue
+
+
+logger = logging.getLogger(__name__)
+
+# the most responses being timed between the enqueue and the dequeue
+_MAX_ENQUEUED = 1 << 16
 
 
 class SimpleCtpClientEvent(Enum):
@@ -18,19 +30,29 @@ class SimpleCtpClientEvent(Enum):
     on_account = auto()
     on_position = auto()
     on_tick = auto()
+    # called with the list of DepthMarketDataField taken by one wakeup of the consumer
+    on_tick_batch = auto()
 
 
-class Direction(Enum):
-    Buy = '0'
-    Sell = '1'
+# the ctp method of the event and the field of the response passed to the event callbacks
+_EVENT_SOURCES: dict[SimpleCtpClientEvent, tuple[CtpMethod, str]] = {
+    SimpleCtpClientEvent.on_order: (CtpMethod.OnRtnOrder, "Order"),
+    SimpleCtpClientEvent.on_trade: (CtpMethod.OnRtnTrade, "Trade"),
+    SimpleCtpClientEvent.on_instrument: (CtpMethod.OnRspQryInstrument, "Instrument"),
+    SimpleCtpClientEvent.on_account: (CtpMethod.OnRspQryTradingAccount, "TradingAccount"),
+    SimpleCtpClientEvent.on_position: (CtpMethod.OnRspQryInvestorPosition, "InvestorPosition"),
+    SimpleCtpClientEvent.on_tick: (CtpMethod.OnRtnDepthMarketData, "DepthMarketData"),
+}
 
 
-class Offset(Enum):
-    Open = '0'
-    Close = '1'
-    CloseToday = '3'
-    CloseYesterday = '4'
-    
+def _event_handler(callback: Callable, get_field: Callable[[CtpResponse], CtpField]) -> Callable[[CtpResponse], None]:
+    def handler(rsp: CtpResponse) -> None:
+        field = get_field(rsp)
+        # the last response of a query without any row has no field
+        if field is not None:
+            callback(field)
+    return handler
+
 
 # 1. 同步方式进行连接
 # 2. 精简方法调用，如下单简化、合约查询简化
@@ -39,37 +61,51 @@ class Offset(Enum):
 # 成交通知、行情通知
 class SimpleCtpClient(object):
     
-    def __init__(self, config: CtpConfig) -> None:
+    def __init__(self, config: CtpConfig, rsp_queue: BatchQueue | None = None, batch_size: int = 1024) -> None:
+        """rsp_queue can be any queue providing put and get_batch, like BatchQueue, RingBufferQueue, ConflatingQueue and BoundedQueue"""
         self._config = config
         self._tdapi: TdAPI = TdAPI(config)
         self._tdapi.callback = self._produce_rsp
         self._mdapi: MdAPI = MdAPI(config)
         self._mdapi.callback = self._produce_rsp
         self._connected_lock = threading.Lock()
+        # serializes the writers of the callbacks and the dispatch table, the consumer reads the table without it
+        self._callback_lock = threading.Lock()
         self._connected_event = threading.Event()
         self._connected: bool = False
         self._connect_error: RspInfoField = None
-        self._queue: queue.Queue = queue.Queue()
-        self._event_callback: dict[SimpleCtpClientEvent, list[Callable]] = {
-            SimpleCtpClientEvent.on_connected: [],
-            SimpleCtpClientEvent.on_order: [],
-            SimpleCtpClientEvent.on_trade: [],
-            SimpleCtpClientEvent.on_instrument: [],
-            SimpleCtpClientEvent.on_account: [],
-            SimpleCtpClientEvent.on_position: [],
-            SimpleCtpClientEvent.on_tick: [],
+        self._queue: BatchQueue = rsp_queue if rsp_queue is not None else BatchQueue()
+        self._batch_size = batch_size
+        self._order_templates = OrderTemplates(config.broker_id, config.investor_id)
+        self._event_callback: dict[SimpleCtpClientEvent, tuple[Callable, ...]] = {
+            event: () for event in SimpleCtpClientEvent
         }
         self._ctp_callback: dict[CtpMethod, Callable] = {
             CtpMethod.OnRspUserLogin: self._login,
             CtpMethod.OnRspAuthenticate: self._authenticate,
-            CtpMethod.OnRtnDepthMarketData: self._on_tick,
         }
+        # handlers of each ctp method compiled from the callbacks, it is replaced rather than modified
+        self._dispatch_table: dict[CtpMethod, tuple[Callable[[CtpResponse], None], ...]] = {}
+        self._compile_dispatch_table()
+        self._latency_recorder: LatencyRecorder | None = None
+        # (spi_ns, enqueue_ns, rsp) by the id of the rsp being timed, the rsp is kept so that its id is not reused
+        self._enqueued: dict[int, tuple[int, int, CtpResponse]] = {}
+        # on_drop of the queue before enable_latency hooked it
+        self._queue_on_drop: Callable[[Any], None] | None = None
         self._thread = threading.Thread(target=self._consume_rsp)
     
     @property
     def connected(self) -> bool:
         return self._connected
     
+    @property
+    def rsp_queue(self) -> BatchQueue:
+        return self._queue
+    
+    @property
+    def latency_recorder(self) -> LatencyRecorder | None:
+        return self._latency_recorder
+    
     @property
     def tdapi(self) -> TdAPI:
         return self._tdapi
@@ -79,18 +115,26 @@ class SimpleCtpClient(object):
         return self._mdapi
     
     def log(self, *args, **kwargs) -> None:
-        print(*args, **kwargs)
+        """deprecated, the arguments are logged at info level by the logger of this module"""
+        deprecated_log(logger, *args, **kwargs)
     
     def on_ctp_event(self, method: CtpMethod, callback: Callable) -> Callable:
-        self._ctp_callback[method] = callback
+        """callback replaces the handling of the responses of method, including the events fired by them"""
+        with self._callback_lock:
+            self._ctp_callback[method] = callback
+            self._compile_dispatch_table()
     
     def on_event(self, event: SimpleCtpClientEvent, callback: Callable) -> Callable:
-        if callback not in self._event_callback[event]:
-            self._event_callback[event].append(callback)
+        with self._callback_lock:
+            if callback not in self._event_callback[event]:
+                self._event_callback[event] = self._event_callback[event] + (callback,)
+                self._compile_dispatch_table()
     
     def off_event(self, event: SimpleCtpClientEvent, callback: Callable) -> Callable:
-        if callback in self._event_callback[event]:
-            self._event_callback[event].remove(callback)
+        with self._callback_lock:
+            if callback in self._event_callback[event]:
+                self._event_callback[event] = tuple(c for c in self._event_callback[event] if c != callback)
+                self._compile_dispatch_table()
     
     def connect(self) -> None:
         self._start_process()
@@ -111,27 +155,35 @@ class SimpleCtpClient(object):
         return self.mdapi.SubscribeMarketData(instruments)
     
     def order_insert(self, exchange: str, instrument: str, price: float, volume: int, direction: Direction, offset: Offset) -> int:
-        req = InputOrderField(
-            BrokerID=self._config.broker_id,
-            InvestorID=self._config.investor_id,
-            ExchangeID=exchange,
-            InstrumentID=instrument,
-            CombOffsetFlag=offset.value,
-            CombHedgeFlag='1',
-            Direction=direction.value,
-            VolumeTotalOriginal=volume,
-            IsAutoSuspend=0,
-            IsSwapOrder=0,
-            OrderPriceType='2',
-            TimeCondition='3',
-            VolumeCondition='1',
-            ContingentCondition='1',
-            ForceCloseReason='0',
-            LimitPrice=price,
-            StopPrice=0
-        )
-        return self.tdapi.ReqOrderInsert(req)
+        req_id = self.tdapi.request_id
+        req = self._order_templates.fill(exchange, instrument, direction, offset, price, volume, self.tdapi.order_ref, req_id)
+        return self.tdapi.ReqOrderInsert(req, req_id)
        
+    def enable_latency(self, recorder: LatencyRecorder | None = None) -> LatencyRecorder:
+        """
+        time the responses from the spi callbacks to the user callbacks into the recorder, a new one if it is None.
+        The ticks are timed from the spi entry by MdAPI, the other responses from the enqueue.
+        The responses dropped or conflated by a queue having on_drop are forgotten by it, the previous on_drop is still called.
+        """
+        if hasattr(self._queue, "on_drop") and self._queue.on_drop != self._forget_rsp:
+            self._queue_on_drop = self._queue.on_drop
+            self._queue.on_drop = self._forget_rsp
+        self._latency_recorder = recorder if recorder is not None else LatencyRecorder()
+        self._mdapi.latency_recorder = self._latency_recorder
+        self._mdapi.callback = self._produce_md_timed_rsp
+        self._tdapi.callback = self._produce_timed_rsp
+        return self._latency_recorder
+    
+    def disable_latency(self) -> None:
+        self._mdapi.latency_recorder = None
+        self._mdapi.callback = self._produce_rsp
+        self._tdapi.callback = self._produce_rsp
+        self._latency_recorder = None
+        self._enqueued = {}
+        if hasattr(self._queue, "on_drop") and self._queue.on_drop == self._forget_rsp:
+            self._queue.on_drop = self._queue_on_drop
+            self._queue_on_drop = None
+    
     def _wait_connect(self) -> None:
         self._connected_event.wait()
         self._connected_event.clear()
@@ -145,48 +197,106 @@ class SimpleCtpClient(object):
         self._queue.put(None)
 
     def _produce_rsp(self, rsp: CtpResponse) -> None:
-        self.log(f"Produce rsp: {rsp.method}")
+        logger.debug("Produce rsp: %s", rsp.method)
+        self._queue.put(rsp)
+    
+    def _produce_timed_rsp(self, rsp: CtpResponse, spi_ns: int = 0) -> None:
+        """
+        spi_ns is the spi entry of a tick given by MdAPI, it is 0 for the other responses,
+        which have no spi entry stage, so their total latency starts at the enqueue.
+        """
+        enqueued = self._enqueued
+        # the responses lost by a queue without on_drop are never dequeued, the oldest one is evicted rather than growing forever
+        if len(enqueued) >= _MAX_ENQUEUED:
+            try:
+                del enqueued[next(iter(enqueued))]
+            except (RuntimeError, KeyError, StopIteration):
+                # changed by the consumer or another spi thread meanwhile, the next response evicts
+                pass
+        enqueued[id(rsp)] = (spi_ns, time.perf_counter_ns(), rsp)
         self._queue.put(rsp)
+
+    def _forget_rsp(self, rsp: Any) -> None:
+        """on_drop of the queue while timing, the dropped response is never dequeued"""
+        self._enqueued.pop(id(rsp), None)
+        if self._queue_on_drop is not None:
+            self._queue_on_drop(rsp)
+    
+    def _produce_md_timed_rsp(self, rsp: CtpResponse) -> None:
+        self._produce_timed_rsp(rsp, self._mdapi.spi_ns if rsp.method is CtpMethod.OnRtnDepthMarketData else 0)
     
     def _consume_rsp(self) -> None:
-        while True:
-            rsp = self._queue.get()
-            if rsp:
-                self._process_rsp(rsp)
-            else:
-                break
+        running = True
+        while running:
+            batch = self._queue.get_batch(self._batch_size)
+            recorder = self._latency_recorder
+            for index, rsp in enumerate(batch):
+                if rsp is None:
+                    running = False
+                    batch = batch[:index]
+                    break
+                if recorder is None:
+                    self._process_rsp(rsp)
+                else:
+                    self._process_timed_rsp(rsp, recorder)
+            if self._event_callback[SimpleCtpClientEvent.on_tick_batch]:
+                self._process_tick_batch(batch)
+    
+    def _process_tick_batch(self, batch: list[CtpResponse]) -> None:
+        ticks = [rsp.DepthMarketData for rsp in batch if rsp.method is CtpMethod.OnRtnDepthMarketData]
+        if ticks:
+            for callback in self._event_callback[SimpleCtpClientEvent.on_tick_batch]:
+                callback(ticks)
+    
+    def _compile_dispatch_table(self) -> None:
+        """called with _callback_lock held, a ctp callback is the only handler of its method"""
+        table: dict[CtpMethod, list[Callable[[CtpResponse], None]]] = {}
+        for method, callback in self._ctp_callback.items():
+            table[method] = [callback]
+        for event, (method, field) in _EVENT_SOURCES.items():
+            if method in self._ctp_callback:
+                continue
+            get_field = attrgetter(field)
+            for callback in self._event_callback[event]:
+                table.setdefault(method, []).append(_event_handler(callback, get_field))
+        self._dispatch_table = {method: tuple(handlers) for method, handlers in table.items()}
     
     def _process_rsp(self, rsp: CtpResponse) -> None:
-        if rsp.method in self._ctp_callback:
-            self._ctp_callback[rsp.method](rsp)
-        else:
-            self.log(f"Method {rsp.method} not support, skipped.")
+        for handler in self._dispatch_table.get(rsp.method, ()):
+            handler(rsp)
+    
+    def _process_timed_rsp(self, rsp: CtpResponse, recorder: LatencyRecorder) -> None:
+        dequeued = time.perf_counter_ns()
+        self._process_rsp(rsp)
+        handled = time.perf_counter_ns()
+        recorder.record(rsp.method, HANDLER, handled - dequeued)
+        stamps = self._enqueued.pop(id(rsp), None)
+        if stamps is not None:
+            spi_ns, enqueued, _ = stamps
+            recorder.record(rsp.method, QUEUEING, dequeued - enqueued)
+            recorder.record(rsp.method, TOTAL, handled - (spi_ns or enqueued))
     
     def _authenticate(self, rsp: RspAuthenticate) -> None:
-        self.log(f"Td authenticate failed.")
+        logger.error("Td authenticate failed.")
         self._login_failed(rsp.RspInfo, Api.Td)
     
     def _login(self, rsp: RspUserLogin) -> None:
-        self.log(f"Login to {rsp.source.name}.")
+        logger.info("Login to %s.", rsp.source.name)
         if rsp.ok:
             self._login_success(rsp.RspUserLogin, rsp.source)
         else:
             self._login_failed(rsp.RspInfo, rsp.source)
     
     def _login_success(self, login_field: RspUserLoginField, source: Api) -> None:
-        self.log(f"Connect to {source.name} success.")
+        logger.info("Connect to %s success.", source.name)
         with self._connected_lock:
             self._connected = True
         self._connected_event.set()
        
     
     def _login_failed(self, rsp_info: RspInfoField, source: Api) -> None:
-        self.log(f"Connect to {source.name} failed.")
+        logger.error("Connect to %s failed.", source.name)
         with self._connected_lock:
             self._connected = False
             self._connect_error = rsp_info
         self._connected_event.set()
-    
-    def _on_tick(self, rsp: RtnDepthMarketData) -> None:
-        for callback in self._event_callback[SimpleCtpClientEvent.on_tick]:
-            callback(rsp.DepthMarketData)
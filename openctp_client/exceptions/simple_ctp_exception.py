@@ -14,3 +14,13 @@ class CtpException(Exception):
 
     def __str__(self):
         return "ErrorID: %s, ErrorMsg: %s" % (self.error_id, self.error_msg)
+
+
+class RiskException(Exception):
+    def __init__(self, check, reason):
+        super().__init__()
+        self.check = check
+        self.reason = reason
+
+    def __str__(self):
+        return "Check: %s, Reason: %s" % (self.check, self.reason)
@@ -1,3 +1,4 @@
 from .config import CtpConfig
 from .fields import *
 from .enums import *
+from .snapshots import DepthMarketDataSnapshot
@@ -1,6 +1,6 @@
 class CtpConfig(object):
 
-    def __init__(self, td_addr="", md_addr="", broker_id="", auth_code="", app_id="", user_id="", password="") -> None:
+    def __init__(self, td_addr="", md_addr="", broker_id="", auth_code="", app_id="", user_id="", password="", trusted_inbound=False, investor_id="", query_rate=1.0) -> None:
         self.td_addr = td_addr
         self.md_addr = md_addr
         self.broker_id = broker_id
@@ -8,3 +8,9 @@ class CtpConfig(object):
         self.app_id = app_id
         self.user_id = user_id
         self.password = password
+        # the investor id is the same as the user id for most of the accounts
+        self.investor_id = investor_id or user_id
+        # build the inbound fields without pydantic validation, the data from ctp is trusted
+        self.trusted_inbound = trusted_inbound
+        # queries per second sent by the query scheduler of TdAPI, ctp allows one per second by default
+        self.query_rate = query_rate
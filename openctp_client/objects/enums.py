@@ -6,6 +6,18 @@ class Api(Enum):
     Md = auto()
 
 
+class Direction(Enum):
+    Buy = '0'
+    Sell = '1'
+
+
+class Offset(Enum):
+    Open = '0'
+    Close = '1'
+    CloseToday = '3'
+    CloseYesterday = '4'
+
+
 class CtpMethod(Enum):
     # Used by td and md
     Connect = auto()
@@ -1,22 +1,73 @@
-from typing import ClassVar, Optional, TypeVar
+from typing import Any, ClassVar, Optional, TypeVar
 from pydantic import BaseModel, Field, constr, ConfigDict
 from openctp_ctp import tdapi
 
 
+def _compile(name: str, source: str, namespace: dict[str, Any]) -> callable:
+    exec(source, namespace)
+    return namespace[name]
+
+
+def _compile_construct(cls: type) -> callable:
+    """Generate a straight-line function copying every field of cls from a ctp object without validation"""
+    private = {
+        name: attr.get_default() for name, attr in cls.__private_attributes__.items()
+    }
+    values = ", ".join(f"{name!r}: obj.{name}" for name in cls.model_fields)
+    source = (
+        "def construct(obj):\n"
+        "    inst = new(cls)\n"
+        f"    setattr(inst, '__dict__', {{{values}}})\n"
+        "    setattr(inst, '__pydantic_fields_set__', fields_set)\n"
+        "    setattr(inst, '__pydantic_extra__', None)\n"
+        f"    setattr(inst, '__pydantic_private__', {'dict(private)' if private else 'None'})\n"
+        "    return inst\n"
+    )
+    namespace = {
+        "new": object.__new__,
+        "cls": cls,
+        "setattr": object.__setattr__,
+        # every field is set, so the set is never changed by assignment and can be shared
+        "fields_set": set(cls.model_fields),
+        "private": private,
+    }
+    return _compile("construct", source, namespace)
+
+
+def _compile_copy_to(cls: type) -> callable:
+    """Generate a straight-line function copying the set fields of a cls instance into a ctp object"""
+    lines = ["def copy_to(self, obj):", "    values = self.__dict__"]
+    for name in cls.model_fields:
+        lines.append(f"    value = values[{name!r}]")
+        lines.append("    if value is not None:")
+        lines.append(f"        obj.{name} = value")
+    lines.append("    return obj")
+    return _compile("copy_to", "\n".join(lines) + "\n", {})
+
+
 class CtpField(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     _ctp_type_: ClassVar[callable] = None
+    _construct_: ClassVar[callable] = None
+    _copy_to_: ClassVar[callable] = None
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls._construct_ = staticmethod(_compile_construct(cls))
+        cls._copy_to_ = _compile_copy_to(cls)
 
     def ctp_object(self) -> any:
-        obj = self._ctp_type_()
-        for key, value in self.model_dump().items():
-            if value is not None:
-                setattr(obj, key, value)
-        return obj
+        return self._copy_to_(self._ctp_type_())
     
     @classmethod
     def from_ctp_object(cls: 'CtpField', obj: any) -> 'CtpField':
         return cls.model_validate(obj) if obj else None
+    
+    @classmethod
+    def construct_from_ctp_object(cls: 'CtpField', obj: any) -> 'CtpField':
+        """Trusted version of from_ctp_object, the values are copied from the ctp object without validation"""
+        return cls._construct_(obj) if obj else None
 
 
 class ReqUserLoginField(CtpField):
@@ -115,6 +166,10 @@ class RspInfoField(CtpField):
     def from_ctp_object(cls: CtpField, obj: any) -> CtpField:
         return cls.model_validate(obj) if obj else cls()
     
+    @classmethod
+    def construct_from_ctp_object(cls: CtpField, obj: any) -> CtpField:
+        return cls._construct_(obj) if obj else cls()
+    
     @property
     def ok(self) -> bool:
         return self.ErrorID == 0
@@ -0,0 +1,21 @@
+from collections import namedtuple
+from operator import attrgetter
+from typing import Any
+
+from .fields import DepthMarketDataField
+
+
+class DepthMarketDataSnapshot(namedtuple("DepthMarketDataSnapshot", DepthMarketDataField.model_fields)):
+    """
+    Lightweight copy of CThostFtdcDepthMarketDataField, ctp reuses the struct so the values must be copied.
+    The field names are the same as DepthMarketDataField, and the model is only built when to_field is called.
+    """
+    __slots__ = ()
+    _copy_ = attrgetter(*DepthMarketDataField.model_fields)
+
+    @classmethod
+    def from_ctp_object(cls, obj: Any) -> 'DepthMarketDataSnapshot':
+        return tuple.__new__(cls, cls._copy_(obj)) if obj else None
+
+    def to_field(self) -> DepthMarketDataField:
+        return DepthMarketDataField.construct_from_ctp_object(self)
@@ -0,0 +1,2 @@
+from .pipeline import RiskPipeline, RiskCheck
+from .checks import MaxOrderSize, MaxPosition, Quotes, PriceBand, FatFinger, SelfTrade
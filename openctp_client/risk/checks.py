@@ -0,0 +1,135 @@
+from typing import Any, Mapping
+
+from ..objects.enums import Direction, Offset
+
+
+# ctp fills the missing prices with DBL_MAX
+_INVALID_PRICE = 1e300
+# the enum values are looked up once, Enum.value is slow on the order path
+_BUY = Direction.Buy.value
+_OPEN = Offset.Open.value
+
+
+class MaxOrderSize(object):
+    """reject the orders of more than max_volume, per_instrument overrides it for some instruments"""
+    name = "max_order_size"
+
+    def __init__(self, max_volume: int, per_instrument: Mapping[str, int] | None = None) -> None:
+        self._max_volume = max_volume
+        self._per_instrument = dict(per_instrument or {})
+
+    def __call__(self, req: Any) -> str | None:
+        max_volume = self._per_instrument.get(req.InstrumentID, self._max_volume)
+        if req.VolumeTotalOriginal > max_volume:
+            return "volume %s exceeds %s" % (req.VolumeTotalOriginal, max_volume)
+        return None
+
+
+class MaxPosition(object):
+    """
+    reject the open orders making the position of the direction more than max_position.
+    position_keeper is a PositionKeeper, the close orders are always passed.
+    order_tracker is an OrderTracker, the remaining volume of the working open orders it knows is counted as position,
+    the orders not yet returned by OnRtnOrder are not counted.
+    """
+    name = "max_position"
+
+    def __init__(self, position_keeper: Any, max_position: int, per_instrument: Mapping[str, int] | None = None, order_tracker: Any = None) -> None:
+        self._position_keeper = position_keeper
+        self._max_position = max_position
+        self._per_instrument = dict(per_instrument or {})
+        self._order_tracker = order_tracker
+
+    def __call__(self, req: Any) -> str | None:
+        if req.CombOffsetFlag[:1] != _OPEN:
+            return None
+        # THOST_FTDC_PD_Long or THOST_FTDC_PD_Short
+        position = self._position_keeper.get(req.InstrumentID, '2' if req.Direction == _BUY else '3')
+        volume = (position.volume if position is not None else 0) + req.VolumeTotalOriginal
+        if self._order_tracker is not None:
+            direction = req.Direction
+            for state in self._order_tracker.working_orders(req.InstrumentID):
+                order = state.order
+                if order.Direction == direction and order.CombOffsetFlag[:1] == _OPEN:
+                    volume += order.VolumeTotal or 0
+        max_position = self._per_instrument.get(req.InstrumentID, self._max_position)
+        if volume > max_position:
+            return "position %s exceeds %s" % (volume, max_position)
+        return None
+
+
+class Quotes(object):
+    """the last price and the limit prices of each instrument, fed by the tick listener of MdAPI"""
+    __slots__ = ("_quotes",)
+
+    def __init__(self) -> None:
+        # InstrumentID to (LastPrice, LowerLimitPrice, UpperLimitPrice)
+        self._quotes: dict[str, tuple[float, float, float]] = {}
+
+    def on_tick(self, tick: Any) -> None:
+        self._quotes[tick.InstrumentID] = (tick.LastPrice, tick.LowerLimitPrice, tick.UpperLimitPrice)
+
+    def get(self, instrument_id: str) -> tuple[float, float, float] | None:
+        return self._quotes.get(instrument_id)
+
+
+class PriceBand(object):
+    """reject the orders priced out of [LowerLimitPrice, UpperLimitPrice], the instruments without ticks are passed"""
+    name = "price_band"
+
+    def __init__(self, quotes: Quotes) -> None:
+        self._quotes = quotes
+        self.on_tick = quotes.on_tick
+
+    def __call__(self, req: Any) -> str | None:
+        quote = self._quotes.get(req.InstrumentID)
+        if quote is None:
+            return None
+        _, lower, upper = quote
+        price = req.LimitPrice
+        if (upper < _INVALID_PRICE and price > upper) or (lower < _INVALID_PRICE and price < lower):
+            return "price %s is out of [%s, %s]" % (price, lower, upper)
+        return None
+
+
+class FatFinger(object):
+    """reject the orders priced more than max_deviation, a ratio, away from the last price"""
+    name = "fat_finger"
+
+    def __init__(self, quotes: Quotes, max_deviation: float) -> None:
+        self._quotes = quotes
+        self._max_deviation = max_deviation
+        self.on_tick = quotes.on_tick
+
+    def __call__(self, req: Any) -> str | None:
+        quote = self._quotes.get(req.InstrumentID)
+        if quote is None:
+            return None
+        last_price = quote[0]
+        if not last_price or last_price >= _INVALID_PRICE:
+            return None
+        deviation = abs(req.LimitPrice - last_price) / last_price
+        if deviation > self._max_deviation:
+            return "price %s deviates %.2f%% from the last price %s" % (req.LimitPrice, deviation * 100, last_price)
+        return None
+
+
+class SelfTrade(object):
+    """reject the orders crossing a working order of the opposite direction, order_tracker is an OrderTracker"""
+    name = "self_trade"
+
+    def __init__(self, order_tracker: Any) -> None:
+        self._order_tracker = order_tracker
+
+    def __call__(self, req: Any) -> str | None:
+        buy = req.Direction == _BUY
+        price = req.LimitPrice
+        for state in self._order_tracker.working_orders(req.InstrumentID):
+            order = state.order
+            if buy:
+                crossing = order.Direction != _BUY and price >= order.LimitPrice
+            else:
+                crossing = order.Direction == _BUY and price <= order.LimitPrice
+            if crossing:
+                return "crossing the working order %s at %s" % (order.OrderSysID or order.OrderRef, order.LimitPrice)
+        return None
@@ -0,0 +1,92 @@
+import time
+from typing import Any, Callable
+
+from ..apis import MdAPI, TdAPI
+from ..exceptions import RiskException
+
+
+# a check returns the reason of rejecting the order, or None to pass it
+RiskCheck = Callable[[Any], str | None]
+
+
+class _CheckStats(object):
+    __slots__ = ("calls", "rejected", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.rejected = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+
+class RiskPipeline(object):
+    """
+    Ordered pre-trade checks run by TdAPI.ReqOrderInsert before sending, the first rejecting check raises RiskException.
+    The checks read the attributes of InputOrderField or the ctp object, and only work on the state kept in memory.
+    The time of each check is measured by perf_counter_ns when timing is True.
+    """
+
+    def __init__(self, checks: tuple[RiskCheck, ...] = (), timing: bool = False) -> None:
+        self._checks: tuple[RiskCheck, ...] = tuple(checks)
+        self._timing = timing
+        self._stats: dict[str, _CheckStats] = {}
+
+    @property
+    def checks(self) -> tuple[RiskCheck, ...]:
+        return self._checks
+
+    @property
+    def stats(self) -> dict[str, dict[str, int]]:
+        """calls, rejected, total_ns and max_ns of each check, the times are only measured when timing"""
+        return {name: {slot: getattr(stats, slot) for slot in _CheckStats.__slots__} for name, stats in self._stats.items()}
+
+    def add_check(self, check: RiskCheck) -> None:
+        self._checks = self._checks + (check,)
+
+    def remove_check(self, check: RiskCheck) -> None:
+        self._checks = tuple(c for c in self._checks if c is not check)
+
+    def attach(self, td_api: TdAPI, md_api: MdAPI | None = None) -> None:
+        """check the orders of td_api, and feed the ticks of md_api to the checks having on_tick"""
+        td_api.risk_pipeline = self
+        if md_api is not None:
+            for check in self._checks:
+                if hasattr(check, "on_tick"):
+                    md_api.add_tick_listener(check.on_tick)
+
+    def check(self, req: Any) -> None:
+        if self._timing:
+            self._timed_check(req)
+            return
+        for check in self._checks:
+            reason = check(req)
+            if reason is not None:
+                self._reject(check, reason)
+
+    def _timed_check(self, req: Any) -> None:
+        for check in self._checks:
+            start = time.perf_counter_ns()
+            reason = check(req)
+            elapsed = time.perf_counter_ns() - start
+            stats = self._check_stats(check)
+            stats.calls += 1
+            stats.total_ns += elapsed
+            if elapsed > stats.max_ns:
+                stats.max_ns = elapsed
+            if reason is not None:
+                self._reject(check, reason)
+
+    def _reject(self, check: RiskCheck, reason: str) -> None:
+        self._check_stats(check).rejected += 1
+        raise RiskException(_name(check), reason)
+
+    def _check_stats(self, check: RiskCheck) -> _CheckStats:
+        name = _name(check)
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _CheckStats()
+        return stats
+
+
+def _name(check: RiskCheck) -> str:
+    return getattr(check, "name", None) or getattr(check, "__name__", None) or type(check).__name__
@@ -0,0 +1,6 @@
+from .tick_store import TickStore, TICK_DTYPE
+from .instrument_cache import InstrumentCache
+from .order_tracker import OrderTracker, OrderState
+from .position_keeper import PositionKeeper, Position
+from .tick_journal import TickJournal
+from .tick_journal_reader import TickJournalReader, JOURNAL_DTYPE
@@ -0,0 +1,142 @@
+import bisect
+import glob
+import logging
+import os
+import pickle
+import tempfile
+from collections import namedtuple
+from operator import attrgetter
+from typing import Iterable, Iterator
+
+from ..apis import TdAPI
+from ..apis.query_scheduler import DEFAULT_QUERY_TIMEOUT
+from ..objects.fields import InstrumentField, QryInstrumentField
+
+
+logger = logging.getLogger(__name__)
+
+FILE_VERSION = 1
+_FIELD_NAMES = tuple(InstrumentField.model_fields)
+# the rows are loaded into this namedtuple, so the compiled construct of InstrumentField can read them by attribute
+_InstrumentRow = namedtuple("_InstrumentRow", _FIELD_NAMES)
+
+
+class InstrumentCache(object):
+    """
+    Instrument master cached in a pickle file of plain tuples for each trading day, the file of the other days is removed when saving.
+    The instruments are indexed by InstrumentID, ExchangeID, ProductID and ExpireDate, the lists returned should not be changed.
+    Loading builds every InstrumentField without validation, so its time grows with the number of the instruments,
+    benchmarks/bench_instrument_cache.py measures it.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self._cache_dir = cache_dir
+        self._trading_day: str | None = None
+        self._instruments: dict[str, InstrumentField] = {}
+        self._by_exchange: dict[str, list[InstrumentField]] = {}
+        self._by_product: dict[str, list[InstrumentField]] = {}
+        # sorted by (ExpireDate, InstrumentID)
+        self._expire_dates: list[tuple[str, str]] = []
+        self._values = attrgetter(*_FIELD_NAMES)
+
+    @property
+    def trading_day(self) -> str | None:
+        return self._trading_day
+
+    def __len__(self) -> int:
+        return len(self._instruments)
+
+    def __contains__(self, instrument_id: str) -> bool:
+        return instrument_id in self._instruments
+
+    def __iter__(self) -> Iterator[InstrumentField]:
+        return iter(self._instruments.values())
+
+    def path(self, trading_day: str) -> str:
+        return os.path.join(self._cache_dir, f"instruments_{trading_day}.pkl")
+
+    def get(self, instrument_id: str) -> InstrumentField | None:
+        return self._instruments.get(instrument_id)
+
+    def by_exchange(self, exchange_id: str) -> list[InstrumentField]:
+        return self._by_exchange.get(exchange_id, [])
+
+    def by_product(self, product_id: str) -> list[InstrumentField]:
+        return self._by_product.get(product_id, [])
+
+    def expiring(self, start: str, end: str) -> list[InstrumentField]:
+        """instruments whose ExpireDate is in [start, end], the dates are formatted as YYYYMMDD"""
+        lo = bisect.bisect_left(self._expire_dates, (start, ""))
+        hi = bisect.bisect_right(self._expire_dates, (end, chr(0x10FFFF)))
+        return [self._instruments[instrument_id] for _, instrument_id in self._expire_dates[lo:hi]]
+
+    def load(self, trading_day: str) -> bool:
+        """load the file of trading_day, return False if it does not exist, is written by another version or is broken"""
+        path = self.path(trading_day)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != FILE_VERSION or data.get("fields") != _FIELD_NAMES:
+                return False
+            construct = InstrumentField.construct_from_ctp_object
+            instruments = [construct(_InstrumentRow._make(row)) for row in data["rows"]]
+        except Exception:
+            # a truncated or corrupt pickle raises almost anything, the instruments are queried again instead
+            logger.warning("failed to load the instrument cache %s", path, exc_info=True)
+            return False
+        self._index(trading_day, instruments)
+        return True
+
+    def update(self, trading_day: str, instruments: Iterable[InstrumentField]) -> None:
+        """replace the instruments and save them to the file of trading_day"""
+        self._index(trading_day, list(instruments))
+        self.save()
+
+    def save(self) -> None:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        data = {
+            "version": FILE_VERSION,
+            "fields": _FIELD_NAMES,
+            "rows": [self._values(instrument) for instrument in self._instruments.values()],
+        }
+        path = self.path(self._trading_day)
+        # write to a temporary file first so that a crash never leaves a broken cache
+        fd, temp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        finally:
+            # only left when the dump or the replace failed
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        for old_path in glob.glob(os.path.join(self._cache_dir, "instruments_*.pkl")):
+            if old_path != path:
+                os.remove(old_path)
+
+    def refresh(self, td_api: TdAPI, trading_day: str, timeout: float | None = DEFAULT_QUERY_TIMEOUT) -> bool:
+        """
+        load the cache of trading_day, query all the instruments by td_api only if there is no such cache.
+        Return True if the instruments are queried.
+        """
+        if self._trading_day == trading_day or self.load(trading_day):
+            return False
+        instruments = td_api.schedule_query(td_api.ReqQryInstrument, QryInstrumentField(), timeout=timeout).result()
+        self.update(trading_day, instruments)
+        return True
+
+    def _index(self, trading_day: str, instruments: list[InstrumentField]) -> None:
+        by_id = {}
+        by_exchange = {}
+        by_product = {}
+        for instrument in instruments:
+            by_id[instrument.InstrumentID] = instrument
+            by_exchange.setdefault(instrument.ExchangeID, []).append(instrument)
+            by_product.setdefault(instrument.ProductID, []).append(instrument)
+        self._trading_day = trading_day
+        self._instruments = by_id
+        self._by_exchange = by_exchange
+        self._by_product = by_product
+        self._expire_dates = sorted((instrument.ExpireDate or "", instrument_id) for instrument_id, instrument in by_id.items())
@@ -0,0 +1,146 @@
+import threading
+from typing import Tuple
+
+from ..apis import TdAPI
+from ..objects.enums import CtpMethod
+from ..objects.fields import OrderField, TradeField
+
+
+OrderKey = Tuple[int, int, str]
+OrderSysKey = Tuple[str, str]
+
+# THOST_FTDC_OST_*, the orders in these status may still be traded
+WORKING_STATUS = frozenset((
+    '1',  # PartTradedQueueing
+    '3',  # NoTradeQueueing
+    'a',  # Unknown, not answered by the exchange yet
+    'b',  # NotTouched
+    'c',  # Touched
+))
+
+
+class OrderState(object):
+    """the latest OrderField of an order and the trades of it"""
+    __slots__ = ("order", "trades", "volume_traded", "amount_traded", "transitions")
+
+    def __init__(self, order: OrderField) -> None:
+        self.order = order
+        self.trades: list[TradeField] = []
+        self.volume_traded = 0
+        self.amount_traded = 0.0
+        # the OrderStatus in the order they are seen, repeated status are kept once
+        self.transitions: list[str] = [order.OrderStatus]
+
+    @property
+    def key(self) -> OrderKey:
+        return (self.order.FrontID, self.order.SessionID, self.order.OrderRef)
+
+    @property
+    def working(self) -> bool:
+        return self.order.OrderStatus in WORKING_STATUS
+
+    @property
+    def average_price(self) -> float:
+        return self.amount_traded / self.volume_traded if self.volume_traded else 0.0
+
+
+class OrderTracker(object):
+    """
+    State of the orders fed by OnRtnOrder and OnRtnTrade, indexed by (FrontID, SessionID, OrderRef) and (ExchangeID, OrderSysID).
+    A trade arriving before its order is kept until the order with the same OrderSysID arrives, the repeated trades are ignored.
+    The feeding methods are called in the spi thread, the queries can be called from any thread.
+    """
+
+    def __init__(self) -> None:
+        self._orders: dict[OrderKey, OrderState] = {}
+        self._by_sys_id: dict[OrderSysKey, OrderState] = {}
+        self._working: dict[str, dict[OrderKey, OrderState]] = {}
+        self._early_trades: dict[OrderSysKey, list[TradeField]] = {}
+        self._trade_ids: set[Tuple[str, str, str]] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    @property
+    def early_trades(self) -> int:
+        """number of the trades waiting for their orders"""
+        with self._lock:
+            return sum(len(trades) for trades in self._early_trades.values())
+
+    def attach(self, td_api: TdAPI) -> None:
+        td_api.add_listener(CtpMethod.OnRtnOrder, self.on_order)
+        td_api.add_listener(CtpMethod.OnRtnTrade, self.on_trade)
+
+    def detach(self, td_api: TdAPI) -> None:
+        td_api.remove_listener(CtpMethod.OnRtnOrder, self.on_order)
+        td_api.remove_listener(CtpMethod.OnRtnTrade, self.on_trade)
+
+    def get(self, front_id: int, session_id: int, order_ref: str) -> OrderState | None:
+        return self._orders.get((front_id, session_id, order_ref))
+
+    def get_by_sys_id(self, exchange_id: str, order_sys_id: str) -> OrderState | None:
+        return self._by_sys_id.get((exchange_id, order_sys_id))
+
+    def orders(self) -> list[OrderState]:
+        with self._lock:
+            return list(self._orders.values())
+
+    def working_orders(self, instrument_id: str | None = None) -> list[OrderState]:
+        """the working orders of instrument_id, or of all the instruments if not given"""
+        with self._lock:
+            if instrument_id is not None:
+                return list(self._working.get(instrument_id, {}).values())
+            return [state for working in self._working.values() for state in working.values()]
+
+    def on_order(self, order: OrderField) -> None:
+        key = (order.FrontID, order.SessionID, order.OrderRef)
+        with self._lock:
+            state = self._orders.get(key)
+            if state is None:
+                state = self._orders[key] = OrderState(order)
+            else:
+                self._update(state, order)
+            if order.OrderSysID:
+                sys_key = (order.ExchangeID, order.OrderSysID)
+                self._by_sys_id[sys_key] = state
+                for trade in self._early_trades.pop(sys_key, ()):
+                    self._apply_trade(state, trade)
+            working = self._working.setdefault(order.InstrumentID, {})
+            if state.working:
+                working[key] = state
+            else:
+                working.pop(key, None)
+
+    def on_trade(self, trade: TradeField) -> None:
+        trade_key = (trade.ExchangeID, trade.TradeID, trade.Direction)
+        sys_key = (trade.ExchangeID, trade.OrderSysID)
+        with self._lock:
+            if trade_key in self._trade_ids:
+                return
+            self._trade_ids.add(trade_key)
+            state = self._by_sys_id.get(sys_key)
+            if state is None:
+                self._early_trades.setdefault(sys_key, []).append(trade)
+            else:
+                self._apply_trade(state, trade)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._orders.clear()
+            self._by_sys_id.clear()
+            self._working.clear()
+            self._early_trades.clear()
+            self._trade_ids.clear()
+
+    @staticmethod
+    def _update(state: OrderState, order: OrderField) -> None:
+        if order.OrderStatus != state.order.OrderStatus:
+            state.transitions.append(order.OrderStatus)
+        state.order = order
+
+    @staticmethod
+    def _apply_trade(state: OrderState, trade: TradeField) -> None:
+        state.trades.append(trade)
+        state.volume_traded += trade.Volume
+        state.amount_traded += trade.Price * trade.Volume
@@ -0,0 +1,222 @@
+import logging
+from typing import Any, Iterable, Mapping, Tuple
+
+from ..apis import MdAPI, TdAPI
+from ..apis.query_scheduler import DEFAULT_QUERY_TIMEOUT
+from ..objects.enums import CtpMethod, Direction, Offset
+from ..objects.fields import InstrumentField, InvestorPositionField, OrderField, QryInvestorPositionField, QryOrderField, TradeField
+from .order_tracker import WORKING_STATUS
+
+
+logger = logging.getLogger(__name__)
+
+# THOST_FTDC_PD_*
+LONG = '2'
+SHORT = '3'
+
+
+class Position(object):
+    """
+    Position of one instrument in one direction, the costs are in money, which is price * volume * multiplier.
+    The open cost and the realized pnl are by trade, the same as OpenCost and CloseProfitByTrade of ctp.
+    """
+    __slots__ = ("instrument_id", "direction", "multiplier", "today", "yesterday", "frozen", "open_cost", "realized_pnl", "last_price")
+
+    def __init__(self, instrument_id: str, direction: str, multiplier: int) -> None:
+        self.instrument_id = instrument_id
+        self.direction = direction
+        self.multiplier = multiplier
+        self.today = 0
+        self.yesterday = 0
+        # volume frozen by the working close orders
+        self.frozen = 0
+        self.open_cost = 0.0
+        self.realized_pnl = 0.0
+        self.last_price = 0.0
+
+    @property
+    def volume(self) -> int:
+        return self.today + self.yesterday
+
+    @property
+    def available(self) -> int:
+        """volume which can be closed"""
+        return self.today + self.yesterday - self.frozen
+
+    @property
+    def average_price(self) -> float:
+        volume = self.today + self.yesterday
+        return self.open_cost / (volume * self.multiplier) if volume else 0.0
+
+    @property
+    def unrealized_pnl(self) -> float:
+        volume = self.today + self.yesterday
+        if not volume or not self.last_price:
+            return 0.0
+        pnl = self.last_price * volume * self.multiplier - self.open_cost
+        return pnl if self.direction == LONG else -pnl
+
+    def open(self, price: float, volume: int) -> None:
+        self.today += volume
+        self.open_cost += price * volume * self.multiplier
+
+    def close(self, price: float, volume: int, offset: str) -> None:
+        """close today first for CloseToday, yesterday first otherwise, never more than the volume held"""
+        total = self.today + self.yesterday
+        if volume > total:
+            logger.warning("closing %s of %s %s with %s held, the volume not held is ignored", volume, self.instrument_id, self.direction, total)
+            volume = total
+        if offset == Offset.CloseToday.value:
+            today = min(volume, self.today)
+            yesterday = volume - today
+        else:
+            yesterday = min(volume, self.yesterday)
+            today = volume - yesterday
+        self.today -= today
+        self.yesterday -= yesterday
+        released = self.open_cost * volume / total if total else 0.0
+        self.open_cost -= released
+        pnl = price * volume * self.multiplier - released
+        self.realized_pnl += pnl if self.direction == LONG else -pnl
+
+
+class PositionKeeper(object):
+    """
+    Positions seeded from the InvestorPositionField rows, then updated by OnRtnTrade, OnRtnOrder and the depth market data.
+    The trades change the volumes and the pnl, the working close orders freeze the volumes and the ticks mark the unrealized pnl.
+    instruments maps the InstrumentID to InstrumentField for the VolumeMultiple, a dict or an InstrumentCache.
+    The positions are updated in the spi threads without a lock, reading them is only an attribute access.
+    """
+
+    def __init__(self, instruments: Mapping[str, InstrumentField] | Any) -> None:
+        self._instruments = instruments
+        self._positions: dict[Tuple[str, str], Position] = {}
+        self._by_instrument: dict[str, Tuple[Position, ...]] = {}
+        # frozen volume of each working close order, keyed by (FrontID, SessionID, OrderRef)
+        self._frozen_orders: dict[Tuple[int, int, str], int] = {}
+        self._trade_ids: set[Tuple[str, str, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def get(self, instrument_id: str, direction: str) -> Position | None:
+        """direction is LONG or SHORT"""
+        return self._positions.get((instrument_id, direction))
+
+    def positions(self) -> list[Position]:
+        return list(self._positions.values())
+
+    @property
+    def realized_pnl(self) -> float:
+        return sum(position.realized_pnl for position in self.positions())
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return sum(position.unrealized_pnl for position in self.positions())
+
+    def attach(self, td_api: TdAPI, md_api: MdAPI | None = None) -> None:
+        td_api.add_listener(CtpMethod.OnRtnOrder, self.on_order)
+        td_api.add_listener(CtpMethod.OnRtnTrade, self.on_trade)
+        if md_api is not None:
+            md_api.add_tick_listener(self.on_tick)
+
+    def detach(self, td_api: TdAPI, md_api: MdAPI | None = None) -> None:
+        td_api.remove_listener(CtpMethod.OnRtnOrder, self.on_order)
+        td_api.remove_listener(CtpMethod.OnRtnTrade, self.on_trade)
+        if md_api is not None:
+            md_api.remove_tick_listener(self.on_tick)
+
+    def seed(self, rows: Iterable[InvestorPositionField], orders: Iterable[OrderField] = ()) -> None:
+        """
+        replace the positions by the rows of ReqQryInvestorPosition, the rows of today and history are added up.
+        orders are the rows of ReqQryOrder, the frozen volumes of the rows already count their working close orders,
+        so these orders are only remembered, and their later updates change the frozen volumes by the difference.
+        Without them the working close orders sent before the seed are frozen twice by their updates.
+        The new state is built aside and then swapped in, the trades seen before are forgotten as the rows count them.
+        The trades and the order updates arriving between the answer of the query and the seed are lost,
+        so seed when there is no trading, like after login and before sending any order.
+        """
+        positions: dict[Tuple[str, str], Position] = {}
+        by_instrument: dict[str, Tuple[Position, ...]] = {}
+        frozen_orders: dict[Tuple[int, int, str], int] = {}
+        for order in orders:
+            key, frozen = self._order_frozen(order)
+            if frozen:
+                frozen_orders[key] = frozen
+        for row in rows:
+            if row.PosiDirection not in (LONG, SHORT):
+                continue
+            position = self._position(row.InstrumentID, row.PosiDirection, positions, by_instrument)
+            today = row.TodayPosition or 0
+            position.today += today
+            position.yesterday += (row.Position or 0) - today
+            # the close orders of the long positions are frozen in ShortFrozen, and vice versa
+            position.frozen += (row.ShortFrozen if row.PosiDirection == LONG else row.LongFrozen) or 0
+            position.open_cost += row.OpenCost or 0.0
+            position.realized_pnl += row.CloseProfitByTrade or 0.0
+        self._positions, self._by_instrument, self._frozen_orders, self._trade_ids = positions, by_instrument, frozen_orders, set()
+
+    def load(self, td_api: TdAPI, timeout: float | None = DEFAULT_QUERY_TIMEOUT) -> None:
+        """seed from ReqQryInvestorPosition and ReqQryOrder sent by the query scheduler of td_api"""
+        broker_id, investor_id = td_api.config.broker_id, td_api.config.investor_id
+        positions = td_api.schedule_query(td_api.ReqQryInvestorPosition, QryInvestorPositionField(BrokerID=broker_id, InvestorID=investor_id), timeout=timeout)
+        orders = td_api.schedule_query(td_api.ReqQryOrder, QryOrderField(BrokerID=broker_id, InvestorID=investor_id), timeout=timeout)
+        self.seed(positions.result(), orders.result())
+
+    def on_trade(self, trade: TradeField) -> None:
+        trade_key = (trade.ExchangeID, trade.TradeID, trade.Direction)
+        if trade_key in self._trade_ids:
+            return
+        self._trade_ids.add(trade_key)
+        buy = trade.Direction == Direction.Buy.value
+        if trade.OffsetFlag == Offset.Open.value:
+            self._position(trade.InstrumentID, LONG if buy else SHORT).open(trade.Price, trade.Volume)
+        else:
+            self._position(trade.InstrumentID, SHORT if buy else LONG).close(trade.Price, trade.Volume, trade.OffsetFlag)
+
+    def on_order(self, order: OrderField) -> None:
+        key, frozen = self._order_frozen(order)
+        if key is None:
+            return
+        delta = frozen - self._frozen_orders.get(key, 0)
+        if not delta:
+            return
+        if frozen:
+            self._frozen_orders[key] = frozen
+        else:
+            self._frozen_orders.pop(key, None)
+        buy = order.Direction == Direction.Buy.value
+        self._position(order.InstrumentID, SHORT if buy else LONG).frozen += delta
+
+    def on_tick(self, tick: Any) -> None:
+        """tick can be the ctp object, DepthMarketDataSnapshot or DepthMarketDataField"""
+        positions = self._by_instrument.get(tick.InstrumentID)
+        if positions is not None:
+            for position in positions:
+                position.last_price = tick.LastPrice
+
+    @staticmethod
+    def _order_frozen(order: OrderField) -> Tuple[Tuple[int, int, str] | None, int]:
+        """the key and the volume frozen by the order, the key is None for an open order"""
+        offset = order.CombOffsetFlag[:1] if order.CombOffsetFlag else Offset.Open.value
+        if offset == Offset.Open.value:
+            return None, 0
+        frozen = (order.VolumeTotal or 0) if order.OrderStatus in WORKING_STATUS else 0
+        return (order.FrontID, order.SessionID, order.OrderRef), frozen
+
+    def _position(self, instrument_id: str, direction: str, positions: dict | None = None, by_instrument: dict | None = None) -> Position:
+        """the position in positions and by_instrument, which are the current ones if not given"""
+        if positions is None:
+            positions, by_instrument = self._positions, self._by_instrument
+        position = positions.get((instrument_id, direction))
+        if position is None:
+            position = positions[(instrument_id, direction)] = Position(instrument_id, direction, self._multiplier(instrument_id))
+            by_instrument[instrument_id] = by_instrument.get(instrument_id, ()) + (position,)
+        return position
+
+    def _multiplier(self, instrument_id: str) -> int:
+        instrument = self._instruments.get(instrument_id)
+        if instrument is None or not instrument.VolumeMultiple:
+            logger.warning("VolumeMultiple of %s is unknown, 1 is used", instrument_id)
+            return 1
+        return instrument.VolumeMultiple
@@ -0,0 +1,322 @@
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import typing
+from collections import deque
+from operator import attrgetter
+from typing import Any
+
+from ..apis import MdAPI
+from ..objects.fields import DepthMarketDataField
+from .tick_store import day_timestamp, time_offset
+
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+JOURNAL_MAGIC = b"CTPJ"
+# magic, version, record size, padded to 16 bytes
+HEADER = struct.Struct("<4sHH8x")
+
+_STRUCT_CODES = {float: "d", int: "q"}
+# the numeric fields of DepthMarketDataField are kept as they are, the strings are folded into the leading fields
+NUMERIC_FIELDS = [
+    (name, _STRUCT_CODES[typing.get_args(field.annotation)[0]])
+    for name, field in DepthMarketDataField.model_fields.items()
+    if typing.get_args(field.annotation)[0] in _STRUCT_CODES
+]
+JOURNAL_FIELDS = [
+    # index of the InstrumentID in the instruments of the index file
+    ("Instrument", "I"),
+    # TradingDay as YYYYMMDD
+    ("TradingDay", "I"),
+    # milliseconds since epoch built from ActionDay (or TradingDay), UpdateTime and UpdateMillisec
+    ("Timestamp", "q"),
+    *NUMERIC_FIELDS,
+]
+RECORD = struct.Struct("<" + "".join(code for _, code in JOURNAL_FIELDS))
+_MILLISEC = [name for name, _ in NUMERIC_FIELDS].index("UpdateMillisec")
+
+
+def journal_path(root: str, trading_day: str) -> str:
+    return os.path.join(root, f"{trading_day}.ticks")
+
+
+def index_path(root: str, trading_day: str) -> str:
+    return os.path.join(root, f"{trading_day}.index.json")
+
+
+def index_log_path(root: str, trading_day: str) -> str:
+    return os.path.join(root, f"{trading_day}.index.log")
+
+
+class TickJournal(object):
+    """
+    Append-only journal of depth market data, one file of fixed-width records for each TradingDay and an index file beside it.
+    The index file has the interned instruments and, for each block of block_size records, its time range and instruments,
+    so that the reader can seek to the blocks of an instrument or a time range.
+    The index file is only written on rotation and close, each flush appends what changed since the last one to an index log,
+    one JSON line of the new instruments and the new or grown blocks, so a flush costs the same late in the day as early.
+    on_tick only copies the values into a deque, the records are packed and written by a background thread every flush_interval.
+    """
+
+    def __init__(self, root: str, flush_interval: float = 0.1, block_size: int = 4096) -> None:
+        self._root = root
+        self._flush_interval = flush_interval
+        self._block_size = block_size
+        self._pending: deque = deque()
+        self._values = attrgetter("InstrumentID", "ExchangeID", "TradingDay", "ActionDay", "UpdateTime", *[name for name, _ in NUMERIC_FIELDS])
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._trading_day: str | None = None
+        self._file = None
+        self._index_log = None
+        self._records = 0
+        self._indexed_records = 0
+        self._dropped = 0
+        self._instruments: list[tuple[str, str]] = []
+        self._instrument_index: dict[str, int] = {}
+        # [first timestamp, last timestamp, instrument indexes] of each block
+        self._blocks: list[list] = []
+        # instruments in the index, and the number and the instruments of the last block, when the index log was last appended
+        self._indexed_instruments = 0
+        self._indexed_block: tuple[int, set] = (-1, set())
+        self._day_timestamps: dict[str, int] = {}
+        self._time_offsets: dict[str, int] = {}
+
+    @property
+    def trading_day(self) -> str | None:
+        return self._trading_day
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"records": self._records, "pending": len(self._pending), "instruments": len(self._instruments), "dropped": self._dropped}
+
+    def attach(self, md_api: MdAPI) -> None:
+        self.start()
+        md_api.add_tick_listener(self.on_tick)
+
+    def detach(self, md_api: MdAPI) -> None:
+        md_api.remove_tick_listener(self.on_tick)
+
+    def start(self) -> None:
+        if self._thread is None:
+            os.makedirs(self._root, exist_ok=True)
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="TickJournal", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """write the pending ticks and the index, then close the file"""
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        with self._write_lock:
+            self._write_pending()
+            self._close_file()
+
+    def on_tick(self, tick: Any) -> None:
+        """tick can be the ctp object, DepthMarketDataSnapshot or DepthMarketDataField, it is called in the spi thread"""
+        self._pending.append(self._values(tick))
+
+    def flush(self) -> None:
+        """write the pending ticks and the index in the calling thread"""
+        with self._write_lock:
+            self._write_pending()
+            if self._file is not None and self._records != self._indexed_records:
+                self._file.flush()
+                self._append_index()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("failed to write the tick journal")
+
+    def _write_pending(self) -> None:
+        pending = self._pending
+        buffer = bytearray()
+        try:
+            while pending:
+                values = pending.popleft()
+                trading_day = values[2]
+                if None in values:
+                    values = tuple(0 if value is None else value for value in values)
+                try:
+                    # values[5:] are the numeric fields, UpdateMillisec is one of them
+                    timestamp = self._timestamp(values[3] or trading_day, values[4]) + values[5 + _MILLISEC]
+                    day = int(trading_day)
+                except (TypeError, ValueError):
+                    # an empty TradingDay or UpdateTime
+                    self._dropped += 1
+                    continue
+                # a late tick of the last trading day is written to the current journal, the journals are never reopened backwards
+                if self._trading_day is None or trading_day > self._trading_day:
+                    if buffer:
+                        self._file.write(buffer)
+                        buffer = bytearray()
+                    self._rotate(trading_day)
+                record = self._pack(values, day, timestamp)
+                if record is None:
+                    self._dropped += 1
+                    continue
+                buffer += record
+        finally:
+            # the records packed are counted in the index, so they are written even if a later tick fails
+            if buffer:
+                self._file.write(buffer)
+
+    def _pack(self, values: tuple, day: int, timestamp: int) -> bytes | None:
+        """the record of the tick, None if a value does not fit, the index is only updated after the record is packed"""
+        instrument_id = values[0]
+        index = self._instrument_index.get(instrument_id)
+        try:
+            record = RECORD.pack(len(self._instruments) if index is None else index, day, timestamp, *values[5:])
+        except struct.error:
+            return None
+        if index is None:
+            index = self._instrument_index[instrument_id] = len(self._instruments)
+            self._instruments.append((instrument_id, values[1] or ""))
+        block_number = self._records // self._block_size
+        if block_number == len(self._blocks):
+            self._blocks.append([timestamp, timestamp, set()])
+        block = self._blocks[block_number]
+        if timestamp < block[0]:
+            block[0] = timestamp
+        if timestamp > block[1]:
+            block[1] = timestamp
+        block[2].add(index)
+        self._records += 1
+        return record
+
+    def _timestamp(self, day: str, update_time: str) -> int:
+        day_timestamp_ = self._day_timestamps.get(day)
+        if day_timestamp_ is None:
+            day_timestamp_ = self._day_timestamps[day] = day_timestamp(day)
+        time_offset_ = self._time_offsets.get(update_time)
+        if time_offset_ is None:
+            time_offset_ = self._time_offsets[update_time] = time_offset(update_time)
+        return day_timestamp_ + time_offset_
+
+    def _rotate(self, trading_day: str) -> None:
+        """close the journal of the last trading day, and open or continue the one of trading_day"""
+        self._close_file()
+        self._trading_day = trading_day
+        self._instruments, self._instrument_index, self._blocks, self._records, self._indexed_records = [], {}, [], 0, 0
+        path = journal_path(self._root, trading_day)
+        index = _read_index(self._root, trading_day)
+        if index is not None and os.path.exists(path):
+            self._instruments = [tuple(instrument) for instrument in index["instruments"]]
+            self._instrument_index = {instrument_id: i for i, (instrument_id, _) in enumerate(self._instruments)}
+            self._blocks = [[first, last, set(instruments)] for first, last, instruments in index["blocks"]]
+            self._records = self._indexed_records = index["records"]
+            self._block_size = index["block_size"]
+            self._file = open(path, "r+b")
+            # the records written after the last index are dropped, they are not indexed
+            self._file.truncate(HEADER.size + self._records * RECORD.size)
+            self._file.seek(0, 2)
+        else:
+            self._file = open(path, "wb")
+            self._file.write(HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, RECORD.size))
+            self._file.flush()
+        # the index log replayed above is folded into a new index file
+        self._write_index()
+        self._index_log = open(index_log_path(self._root, trading_day), "w")
+        self._day_timestamps.clear()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            self._write_index()
+            self._file.close()
+            self._file = None
+            self._index_log.close()
+            self._index_log = None
+            # the index file covers the log now, a log left by a crash before this is ignored by its records
+            os.remove(index_log_path(self._root, self._trading_day))
+            # the next tick opens the journal of its trading day again
+            self._trading_day = None
+
+    def _write_index(self) -> None:
+        index = {
+            "version": JOURNAL_VERSION,
+            "trading_day": self._trading_day,
+            "fields": JOURNAL_FIELDS,
+            "record_size": RECORD.size,
+            "header_size": HEADER.size,
+            "records": self._records,
+            "block_size": self._block_size,
+            "instruments": self._instruments,
+            "blocks": [[first, last, sorted(instruments)] for first, last, instruments in self._blocks],
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self._root, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_path, index_path(self._root, self._trading_day))
+        self._mark_indexed()
+
+    def _append_index(self) -> None:
+        """append the instruments and the blocks changed since the last index to the index log"""
+        number, indexed = self._indexed_block
+        blocks = []
+        for n in range(self._indexed_records // self._block_size, len(self._blocks)):
+            first, last, instruments = self._blocks[n]
+            blocks.append([n, first, last, sorted(instruments - indexed if n == number else instruments)])
+        entry = {
+            "records": self._records,
+            "instruments": [self._indexed_instruments, self._instruments[self._indexed_instruments:]],
+            "blocks": blocks,
+        }
+        self._index_log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._index_log.flush()
+        self._mark_indexed()
+
+    def _mark_indexed(self) -> None:
+        self._indexed_records = self._records
+        self._indexed_instruments = len(self._instruments)
+        self._indexed_block = (len(self._blocks) - 1, set(self._blocks[-1][2])) if self._blocks else (-1, set())
+
+
+
+def _read_index(root: str, trading_day: str) -> dict | None:
+    """the index file with the index log appended after it replayed"""
+    try:
+        with open(index_path(root, trading_day)) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != JOURNAL_VERSION or index.get("record_size") != RECORD.size:
+        return None
+    try:
+        with open(index_log_path(root, trading_day)) as f:
+            lines = f.readlines()
+    except OSError:
+        return index
+    instruments = index["instruments"]
+    blocks = [[first, last, set(block_instruments)] for first, last, block_instruments in index["blocks"]]
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # the last line is torn by a crash while it was written
+            break
+        # the entries already covered by the index file, left by a crash before the log was removed
+        if entry["records"] <= index["records"]:
+            continue
+        index["records"] = entry["records"]
+        start, new_instruments = entry["instruments"]
+        instruments[start:start + len(new_instruments)] = new_instruments
+        for number, first, last, block_instruments in entry["blocks"]:
+            if number == len(blocks):
+                blocks.append([first, last, set()])
+            block = blocks[number]
+            block[0], block[1] = first, last
+            block[2].update(block_instruments)
+    index["blocks"] = [[first, last, sorted(block_instruments)] for first, last, block_instruments in blocks]
+    return index
@@ -0,0 +1,158 @@
+import glob
+import os
+from datetime import datetime
+from operator import itemgetter
+from typing import Iterator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ..objects.fields import DepthMarketDataField
+from ..objects.snapshots import DepthMarketDataSnapshot
+from .tick_journal import HEADER, JOURNAL_MAGIC, JOURNAL_VERSION, JOURNAL_FIELDS, RECORD, journal_path, _read_index
+from .tick_store import CST
+
+
+_DTYPE_CODES = {"I": "<u4", "q": "<i8", "d": "<f8"}
+# the records are packed without padding, so the dtype has the same layout as RECORD
+JOURNAL_DTYPE = np.dtype([(name, _DTYPE_CODES[code]) for name, code in JOURNAL_FIELDS]) if np is not None else None
+# a record is extended by these strings, then arranged in the order of DepthMarketDataField, the missing strings are the last ""
+_EXTENDED_NAMES = [name for name, _ in JOURNAL_FIELDS] + ["InstrumentID", "ExchangeID", "TradingDay", "ActionDay", "UpdateTime", ""]
+# the string TradingDay overrides the YYYYMMDD number of the record
+_EXTENDED_COLUMNS = {name: i for i, name in enumerate(_EXTENDED_NAMES)}
+_arrange_snapshot = itemgetter(*[_EXTENDED_COLUMNS.get(name, _EXTENDED_COLUMNS[""]) for name in DepthMarketDataField.model_fields])
+_MILLISEC_COLUMN = _EXTENDED_COLUMNS["UpdateMillisec"]
+
+
+class TickJournalReader(object):
+    """
+    Reader of the journal of one TradingDay written by TickJournal, the records file is memory-mapped as a structured array of JOURNAL_DTYPE.
+    records and blocks are views of the mapped file, nothing is parsed or copied until the values are used.
+    The selections of an instrument or a time range only read the blocks found by the index, and copy the selected records out of them.
+    Only the records covered by the index are mapped, the records written after the last flush are not visible.
+    """
+
+    def __init__(self, root: str, trading_day: str) -> None:
+        if np is None:
+            raise ImportError("numpy is required by TickJournalReader, install it by pip install openctp-client[numpy]")
+        self._trading_day = trading_day
+        index = _read_index(root, trading_day)
+        if index is None:
+            raise ValueError(f"no valid index of the tick journal of {trading_day} in {root}")
+        path = journal_path(root, trading_day)
+        with open(path, "rb") as f:
+            magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a tick journal of version {JOURNAL_VERSION}")
+        self._block_size: int = index["block_size"]
+        self._instruments: list[tuple[str, str]] = [tuple(instrument) for instrument in index["instruments"]]
+        self._instrument_index = {instrument_id: i for i, (instrument_id, _) in enumerate(self._instruments)}
+        self._blocks: list[list] = index["blocks"]
+        # the first and last timestamp of each block, to find the blocks of a time range without looking at the records
+        self._block_firsts = np.array([block[0] for block in self._blocks], dtype=np.int64)
+        self._block_lasts = np.array([block[1] for block in self._blocks], dtype=np.int64)
+        records = index["records"]
+        if records:
+            self._records = np.memmap(path, dtype=JOURNAL_DTYPE, mode="r", offset=HEADER.size, shape=(records,))
+        else:
+            # an empty file can not be mapped
+            self._records = np.empty(0, dtype=JOURNAL_DTYPE)
+
+    @staticmethod
+    def trading_days(root: str) -> list[str]:
+        """the trading days having a journal in root"""
+        suffix = ".index.json"
+        return sorted(os.path.basename(path)[:-len(suffix)] for path in glob.glob(os.path.join(root, "*" + suffix)))
+
+    @property
+    def trading_day(self) -> str:
+        return self._trading_day
+
+    @property
+    def instruments(self) -> list[str]:
+        return [instrument_id for instrument_id, _ in self._instruments]
+
+    @property
+    def records(self) -> 'np.ndarray':
+        """zero copy view of all the records in the order they are written"""
+        return self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def block(self, number: int) -> 'np.ndarray':
+        """zero copy view of the records of the block"""
+        return self._records[number * self._block_size:(number + 1) * self._block_size]
+
+    def blocks(self, instrument_id: str | None = None, start: int | None = None, end: int | None = None) -> list[int]:
+        """numbers of the blocks which may have the records of instrument_id in [start, end], the timestamps are milliseconds since epoch"""
+        numbers = np.arange(len(self._blocks))
+        if start is not None:
+            numbers = numbers[self._block_lasts >= start]
+        if end is not None:
+            numbers = numbers[self._block_firsts[numbers] <= end]
+        numbers = numbers.tolist()
+        if instrument_id is None:
+            return numbers
+        index = self._instrument_index.get(instrument_id)
+        if index is None:
+            return []
+        return [number for number in numbers if index in self._blocks[number][2]]
+
+    def select(self, instrument_id: str | None = None, start: int | None = None, end: int | None = None) -> 'np.ndarray':
+        """copy of the records of instrument_id (all if None) whose Timestamp is in [start, end], in the order they are written"""
+        if instrument_id is None and start is None and end is None:
+            return self._records
+        numbers = self.blocks(instrument_id, start, end)
+        index = self._instrument_index.get(instrument_id) if instrument_id is not None else None
+        parts = []
+        for number in numbers:
+            block = self.block(number)
+            mask = None
+            if index is not None:
+                mask = block["Instrument"] == index
+            if start is not None:
+                mask = block["Timestamp"] >= start if mask is None else mask & (block["Timestamp"] >= start)
+            if end is not None:
+                mask = block["Timestamp"] <= end if mask is None else mask & (block["Timestamp"] <= end)
+            parts.append(block if mask is None else block[mask])
+        if not parts:
+            return np.empty(0, dtype=JOURNAL_DTYPE)
+        return np.concatenate(parts)
+
+    def instrument(self, instrument_id: str) -> 'np.ndarray':
+        return self.select(instrument_id)
+
+    def between(self, start: int, end: int) -> 'np.ndarray':
+        return self.select(start=start, end=end)
+
+    def snapshots(self, records: 'np.ndarray | None' = None) -> Iterator[DepthMarketDataSnapshot]:
+        """
+        DepthMarketDataSnapshot of each record of records (all the records if None), built lazily one by one.
+        The strings which are not recorded, like ExchangeInstID, are empty.
+        """
+        if records is None:
+            records = self._records
+        new = tuple.__new__
+        arrange = _arrange_snapshot
+        trading_day = self._trading_day
+        instruments = self._instruments
+        # ActionDay and UpdateTime of each second since epoch
+        times: dict[int, tuple[str, str]] = {}
+        for start in range(0, len(records), self._block_size):
+            # tolist converts a chunk to python values at once, which is much faster than reading the fields of each record
+            for row in records[start:start + self._block_size].tolist():
+                # UpdateMillisec is included in the Timestamp
+                second = (row[2] - row[_MILLISEC_COLUMN]) // 1000
+                action_time = times.get(second)
+                if action_time is None:
+                    moment = datetime.fromtimestamp(second, CST)
+                    action_time = times[second] = (moment.strftime("%Y%m%d"), moment.strftime("%H:%M:%S"))
+                yield new(DepthMarketDataSnapshot, arrange(row + instruments[row[0]] + (trading_day, *action_time, "")))
+
+    def fields(self, records: 'np.ndarray | None' = None) -> Iterator[DepthMarketDataField]:
+        """DepthMarketDataField of each record of records (all the records if None), built lazily one by one"""
+        for snapshot in self.snapshots(records):
+            yield snapshot.to_field()
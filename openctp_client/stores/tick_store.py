@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ..apis import MdAPI
+
+
+LEVELS = 5
+# the time of the ctp market data is Beijing time
+CST = timezone(timedelta(hours=8))
+
+TICK_FIELDS = [
+    ("LastPrice", "f8"),
+    ("Volume", "i8"),
+    ("Turnover", "f8"),
+    ("OpenInterest", "f8"),
+    *[(f"BidPrice{i}", "f8") for i in range(1, LEVELS + 1)],
+    *[(f"BidVolume{i}", "i8") for i in range(1, LEVELS + 1)],
+    *[(f"AskPrice{i}", "f8") for i in range(1, LEVELS + 1)],
+    *[(f"AskVolume{i}", "i8") for i in range(1, LEVELS + 1)],
+]
+TICK_DTYPE = np.dtype([("Timestamp", "i8"), *TICK_FIELDS]) if np is not None else None
+
+
+def day_timestamp(day: str) -> int:
+    """milliseconds since epoch of the midnight of day, the day is formatted as YYYYMMDD"""
+    midnight = datetime(int(day[0:4]), int(day[4:6]), int(day[6:8]), tzinfo=CST)
+    return int(midnight.timestamp()) * 1000
+
+
+def time_offset(update_time: str) -> int:
+    """milliseconds since midnight of update_time, the time is formatted as HH:MM:SS"""
+    return (int(update_time[0:2]) * 3600 + int(update_time[3:5]) * 60 + int(update_time[6:8])) * 1000
+
+
+class _TickBuffer(object):
+    __slots__ = ("array", "size")
+
+    def __init__(self, capacity: int) -> None:
+        self.array = np.empty(capacity, dtype=TICK_DTYPE)
+        self.size = 0
+
+    def grow(self, chunk_size: int) -> None:
+        """double the capacity, by chunk_size at least, so that appending stays amortized O(1)"""
+        array = np.empty(len(self.array) + max(len(self.array), chunk_size), dtype=TICK_DTYPE)
+        array[:self.size] = self.array[:self.size]
+        self.array = array
+
+
+class TickStore(object):
+    """
+    Columnar store of depth market data, each instrument has a preallocated numpy structured array of TICK_DTYPE.
+    The arrays start with chunk_size ticks and double when full, a view returned before growing keeps referring to the old memory.
+    The Timestamp is milliseconds since epoch built from ActionDay (or TradingDay), UpdateTime and UpdateMillisec,
+    the ticks without a valid day or UpdateTime are dropped and counted by dropped.
+    """
+
+    def __init__(self, chunk_size: int = 4096) -> None:
+        if np is None:
+            raise ImportError("numpy is required by TickStore, install it by pip install openctp-client[numpy]")
+        self._chunk_size = chunk_size
+        self._buffers: dict[str, _TickBuffer] = {}
+        self._day_timestamps: dict[str, int] = {}
+        self._time_offsets: dict[str, int] = {}
+        self._values = attrgetter(*[name for name, _ in TICK_FIELDS])
+        self._dropped = 0
+
+    @property
+    def instruments(self) -> list[str]:
+        return list(self._buffers)
+
+    def __len__(self) -> int:
+        return sum(buffer.size for buffer in self._buffers.values())
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def attach(self, md_api: MdAPI) -> None:
+        md_api.add_tick_listener(self.on_tick)
+
+    def detach(self, md_api: MdAPI) -> None:
+        md_api.remove_tick_listener(self.on_tick)
+
+    def on_tick(self, tick: Any) -> None:
+        """tick can be the ctp object, DepthMarketDataSnapshot or DepthMarketDataField"""
+        timestamp = self._timestamp(tick)
+        if timestamp is None:
+            self._dropped += 1
+            return
+        buffer = self._buffers.get(tick.InstrumentID)
+        if buffer is None:
+            buffer = self._buffers[tick.InstrumentID] = _TickBuffer(self._chunk_size)
+        elif buffer.size == len(buffer.array):
+            buffer.grow(self._chunk_size)
+        values = self._values(tick)
+        if None in values:
+            values = tuple(0 if value is None else value for value in values)
+        buffer.array[buffer.size] = (timestamp, *values)
+        buffer.size += 1
+
+    def view(self, instrument: str) -> 'np.ndarray':
+        """zero copy view of the ticks of the instrument"""
+        buffer = self._buffers.get(instrument)
+        if buffer is None:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return buffer.array[:buffer.size]
+
+    def snapshot(self) -> dict[str, 'np.ndarray']:
+        """copies of the ticks of every instrument, they are not changed by the following ticks or clear"""
+        return {instrument: self.view(instrument).copy() for instrument in self._buffers}
+
+    def clear(self) -> None:
+        self._buffers = {}
+        self._time_offsets.clear()
+
+    def _timestamp(self, tick: Any) -> int | None:
+        """None if the day or UpdateTime is empty or malformed"""
+        day = tick.ActionDay or tick.TradingDay
+        day_timestamp_ = self._day_timestamps.get(day)
+        if day_timestamp_ is None:
+            try:
+                day_timestamp_ = self._day_timestamps[day] = day_timestamp(day)
+            except (TypeError, ValueError):
+                return None
+        time_offset_ = self._time_offsets.get(tick.UpdateTime)
+        if time_offset_ is None:
+            try:
+                time_offset_ = self._time_offsets[tick.UpdateTime] = time_offset(tick.UpdateTime)
+            except (TypeError, ValueError):
+                return None
+        return day_timestamp_ + time_offset_ + (tick.UpdateMillisec or 0)
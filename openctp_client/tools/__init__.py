@@ -0,0 +1,2 @@
+from .replay import Replayer, ReplayEvent, journal_events
+from .load_generator import LoadGenerator, LoadProfile
@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+from ..apis import MdAPI
+from ..openctp import mdapi
+
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99, 99.9)
+# the producer sends the ticks due in each slice of this many seconds at once
+_SLICE = 0.001
+
+
+class LoadProfile(object):
+    """
+    Tick rate of the load over the elapsed seconds, rate ticks per second plus the bursts.
+    Each burst is (start, duration, multiplier), the rate is multiplied by the multiplier during it.
+    """
+
+    def __init__(self, rate: float, bursts: Iterable[tuple[float, float, float]] = ()) -> None:
+        self._rate = rate
+        self._bursts = tuple(bursts)
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @classmethod
+    def session_opens(cls, rate: float, multiplier: float = 20, burst: float = 1, period: float = 10) -> 'LoadProfile':
+        """
+        the day and night sessions compressed into period seconds, starting with the burst of the 09:00 open
+        and having the burst of the 21:00 open in the middle
+        """
+        return cls(rate, [(0, burst, multiplier), (period / 2, burst, multiplier)])
+
+    def rate_at(self, elapsed: float) -> float:
+        for start, duration, multiplier in self._bursts:
+            if start <= elapsed < start + duration:
+                return self._rate * multiplier
+        return self._rate
+
+
+class LoadGenerator(object):
+    """
+    Pushes synthetic CThostFtdcDepthMarketDataField into MdAPI.OnRtnDepthMarketData from a producer thread,
+    which stands for the spi thread of the SDK, and reuses one struct for each instrument like the SDK does.
+    The Volume of each tick is its sequence number, so the callback wrapped by track can measure the latency
+    from sending to the user callback, wherever the tick is delivered: the raw callback, the callback of MdAPI,
+    or the on_tick event of SimpleCtpClient after its queue.
+    The sequence keeps growing across the runs, a tick of an earlier run delivered late is ignored by record.
+    """
+
+    def __init__(
+        self,
+        md_api: MdAPI,
+        instruments: int = 100,
+        profile: LoadProfile | float = 1000.0,
+        trading_day: str | None = None,
+        clock: Callable[[], int] = time.perf_counter_ns,
+    ) -> None:
+        self._md_api = md_api
+        self._profile = profile if isinstance(profile, LoadProfile) else LoadProfile(profile)
+        self._clock = clock
+        trading_day = trading_day or datetime.now().strftime("%Y%m%d")
+        self._ticks = [self._make_tick(f"sim{i:04d}", trading_day) for i in range(instruments)]
+        # the first sequence of the run, and the send times and the latencies of its ticks, replaced together by start
+        self._window: tuple[int, list[int], list[int]] = (0, [], [])
+        self._elapsed = 0.0
+        # seconds the producer spent in OnRtnDepthMarketData
+        self._busy = 0.0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def profile(self) -> LoadProfile:
+        return self._profile
+
+    @profile.setter
+    def profile(self, profile: LoadProfile | float) -> None:
+        self._profile = profile if isinstance(profile, LoadProfile) else LoadProfile(profile)
+
+    @property
+    def sent(self) -> int:
+        return len(self._window[1])
+
+    @property
+    def received(self) -> int:
+        return len(self._window[2])
+
+    def record(self, tick: Any) -> None:
+        """record the latency of the tick, it should be called by the user callback"""
+        base, sent, latencies = self._window
+        index = tick.Volume - base
+        if index >= 0:
+            latencies.append(self._clock() - sent[index])
+
+    def track(self, callback: Callable[[Any], None] | None = None) -> Callable[[Any], None]:
+        """callback wrapped to record the latency of each tick before calling it"""
+        record = self.record
+        if callback is None:
+            return record
+
+        def tracked(tick: Any) -> None:
+            record(tick)
+            callback(tick)
+        return tracked
+
+    def start(self, duration: float) -> None:
+        """start sending the ticks in the producer thread for duration seconds"""
+        base, sent, _ = self._window
+        self._window = (base + len(sent), [], [])
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._produce, args=(duration,), name="LoadGenerator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def join(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self, duration: float, drain_timeout: float = 1.0) -> dict[str, float]:
+        """send the ticks for duration seconds, wait up to drain_timeout for the consumer to catch up, then report"""
+        self.start(duration)
+        self.join()
+        self._drain(drain_timeout)
+        return self.report()
+
+    def report(self) -> dict[str, float]:
+        """
+        the rate sent, the ticks received, the latency percentiles in microseconds, and the utilization,
+        which is the part of the time the producer spent in OnRtnDepthMarketData
+        """
+        latencies = sorted(self._window[2])
+        report = {
+            "sent": self.sent,
+            "received": len(latencies),
+            "backlog": self.sent - len(latencies),
+            "rate": self.sent / self._elapsed if self._elapsed else 0.0,
+            "utilization": self._busy / self._elapsed if self._elapsed else 0.0,
+        }
+        for percentile in PERCENTILES:
+            report[f"p{percentile:g}_us"] = _percentile(latencies, percentile) / 1000
+        report["max_us"] = latencies[-1] / 1000 if latencies else 0.0
+        return report
+
+    def find_max_rate(
+        self,
+        start: float = 1000,
+        factor: float = 2,
+        step: float = 1.0,
+        max_rate: float | None = None,
+        max_backlog: float = 0.01,
+        max_utilization: float = 0.9,
+    ) -> tuple[float, list[dict[str, float]]]:
+        """
+        the highest rate, multiplied by factor from start, which is sustainable for step seconds.
+        A rate is sustainable if the backlog at the end of the step is at most max_backlog of the ticks sent, a growing backlog
+        means a queue between the producer and the callback grows, and the utilization is at most max_utilization,
+        the spi thread of the SDK should never be kept busy.
+        Return the rate, 0 if start is not sustainable, and the report of each step.
+        """
+        sustainable = 0.0
+        reports = []
+        rate = start
+        while max_rate is None or rate <= max_rate:
+            self._profile = LoadProfile(rate)
+            self.start(step)
+            self.join()
+            report = self.report()
+            reports.append(report)
+            # the consumer may still be taking the last ticks, they are not counted in the next step
+            self._drain(step)
+            if report["utilization"] > max_utilization or report["backlog"] > report["sent"] * max_backlog:
+                break
+            sustainable = rate
+            rate *= factor
+        return sustainable, reports
+
+    def _drain(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while self.received < self.sent and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def _produce(self, duration: float) -> None:
+        on_tick = self._md_api.OnRtnDepthMarketData
+        ticks = self._ticks
+        instruments = len(ticks)
+        base, sent, _ = self._window
+        clock = self._clock
+        rate_at = self._profile.rate_at
+        begin = time.perf_counter()
+        # number of the ticks due since begin
+        due = 0.0
+        elapsed = last = busy = 0.0
+        while elapsed < duration and not self._stopped.is_set():
+            due += rate_at(elapsed) * (elapsed - last)
+            last = elapsed
+            sending = time.perf_counter()
+            for _ in range(int(due) - len(sent)):
+                sequence = base + len(sent)
+                tick = ticks[sequence % instruments]
+                tick.Volume = sequence
+                sent.append(clock())
+                on_tick(tick)
+            now = time.perf_counter()
+            busy += now - sending
+            delay = begin + elapsed + _SLICE - now
+            if delay > 0:
+                time.sleep(delay)
+            elapsed = time.perf_counter() - begin
+        self._elapsed = time.perf_counter() - begin
+        self._busy = busy
+
+    @staticmethod
+    def _make_tick(instrument_id: str, trading_day: str) -> mdapi.CThostFtdcDepthMarketDataField:
+        tick = mdapi.CThostFtdcDepthMarketDataField()
+        tick.InstrumentID = instrument_id
+        tick.ExchangeID = "SIM"
+        tick.TradingDay = trading_day
+        tick.ActionDay = trading_day
+        tick.UpdateTime = "09:00:00"
+        tick.UpdateMillisec = 0
+        tick.LastPrice = 100.0
+        tick.BidPrice1 = 99.0
+        tick.BidVolume1 = 1
+        tick.AskPrice1 = 101.0
+        tick.AskVolume1 = 1
+        tick.Volume = 0
+        return tick
+
+
+def _percentile(values: list[int], percentile: float) -> float:
+    """nearest rank percentile of the sorted values"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(percentile / 100 * len(values))) - 1))
+    return values[rank]
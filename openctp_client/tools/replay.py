@@ -0,0 +1,149 @@
+import heapq
+import logging
+import time
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator, Tuple
+
+from ..apis import MdAPI, TdAPI
+from ..objects.enums import CtpMethod
+from ..stores.tick_journal_reader import TickJournalReader
+
+
+logger = logging.getLogger(__name__)
+
+# (milliseconds since epoch, spi method, arguments of the spi method)
+ReplayEvent = Tuple[int, CtpMethod, tuple]
+
+# the spi methods called on the MdAPI, the others are called on the TdAPI
+_MD_METHODS = frozenset((CtpMethod.OnRtnDepthMarketData, CtpMethod.OnRspSubMarketData))
+
+
+def journal_events(reader: TickJournalReader, records: Any = None) -> Iterator[ReplayEvent]:
+    """OnRtnDepthMarketData events of the records (all the records if None) of the journal, the ticks are DepthMarketDataSnapshot"""
+    if records is None:
+        records = reader.records
+    method = CtpMethod.OnRtnDepthMarketData
+    for timestamp, snapshot in zip(records["Timestamp"].tolist(), reader.snapshots(records)):
+        yield (timestamp, method, (snapshot,))
+
+
+class Replayer(object):
+    """
+    Replays recorded events through the spi methods of MdAPI and TdAPI, so they take the same path as the live ones,
+    including the tick listeners, the raw callback and the callback of SimpleCtpClient.
+    speed is None to replay as fast as possible, 1 for real time and N for N times real time.
+    The events are replayed in the calling thread, stop can be called from another thread.
+    """
+
+    def __init__(
+        self,
+        md_api: MdAPI,
+        td_api: TdAPI | None = None,
+        speed: float | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._md_api = md_api
+        self._td_api = td_api
+        self._speed = speed
+        self._clock = clock
+        self._sleep = sleep
+        self._stopped = False
+        self._events = 0
+        self._elapsed = 0.0
+        # the most seconds an event is replayed later than its time
+        self._max_lag = 0.0
+
+    @classmethod
+    def for_client(cls, client: Any, speed: float | None = None) -> 'Replayer':
+        """replay through the apis of SimpleCtpClient or AsyncCtpClient"""
+        return cls(client.mdapi, client.tdapi, speed)
+
+    @property
+    def speed(self) -> float | None:
+        return self._speed
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "events": self._events,
+            "elapsed": self._elapsed,
+            "rate": self._events / self._elapsed if self._elapsed else 0.0,
+            "max_lag": self._max_lag,
+        }
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def replay_journal(
+        self,
+        reader: TickJournalReader,
+        instrument_id: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+        events: Iterable[ReplayEvent] = (),
+    ) -> dict[str, float]:
+        """replay the ticks of the journal selected by instrument_id and [start, end], merged with the events sorted by time"""
+        records = reader.select(instrument_id, start, end)
+        ticks = journal_events(reader, records)
+        if events:
+            return self.replay(heapq.merge(ticks, events, key=itemgetter(0)))
+        if self._speed is None:
+            # the ticks alone are replayed without building the events
+            return self._replay_ticks(reader.snapshots(records))
+        return self.replay(ticks)
+
+    def replay(self, events: Iterable[ReplayEvent]) -> dict[str, float]:
+        """replay the events sorted by time, return the stats"""
+        self._reset()
+        handlers: dict[CtpMethod, Callable] = {}
+        speed = self._speed
+        clock = self._clock
+        begin = clock()
+        first = None
+        count = 0
+        for timestamp, method, args in events:
+            if self._stopped:
+                break
+            handler = handlers.get(method)
+            if handler is None:
+                handler = handlers[method] = self._handler(method)
+            if speed is not None:
+                if first is None:
+                    first = timestamp
+                delay = (timestamp - first) / 1000 / speed - (clock() - begin)
+                if delay > 0:
+                    self._sleep(delay)
+                elif -delay > self._max_lag:
+                    self._max_lag = -delay
+            handler(*args)
+            count += 1
+        self._events = count
+        self._elapsed = clock() - begin
+        return self.stats
+
+    def _replay_ticks(self, ticks: Iterable[Any]) -> dict[str, float]:
+        self._reset()
+        on_tick = self._md_api.OnRtnDepthMarketData
+        begin = self._clock()
+        count = 0
+        for tick in ticks:
+            if self._stopped:
+                break
+            on_tick(tick)
+            count += 1
+        self._events = count
+        self._elapsed = self._clock() - begin
+        return self.stats
+
+    def _reset(self) -> None:
+        self._stopped = False
+        self._events = 0
+        self._elapsed = 0.0
+        self._max_lag = 0.0
+
+    def _handler(self, method: CtpMethod) -> Callable:
+        api = self._md_api if method in _MD_METHODS else self._td_api
+        if api is None:
+            raise ValueError(f"no api to replay {method.name}")
+        return getattr(api, method.name)
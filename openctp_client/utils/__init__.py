@@ -0,0 +1,3 @@
+from .log import enable_background_logging, disable_background_logging
+from .token_bucket import TokenBucket
+from .histogram import Histogram, LatencyRecorder
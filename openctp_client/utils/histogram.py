@@ -0,0 +1,201 @@
+import logging
+import threading
+from typing import Callable, Iterable
+
+from ..objects.enums import CtpMethod
+
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+# the stages of a message recorded by LatencyRecorder, the values are nanoseconds
+# spi entry to the tick listeners returned
+LISTENERS = "listeners"
+# the tick listeners returned, or spi entry, to the response built
+CONVERSION = "conversion"
+# time spent in the callback of the api, which is the enqueue for SimpleCtpClient
+CALLBACK = "callback"
+# enqueue to dequeue in SimpleCtpClient
+QUEUEING = "queueing"
+# dequeue to the user callbacks returned in SimpleCtpClient
+HANDLER = "handler"
+# spi entry, or enqueue if it is unknown, to the user callbacks returned
+TOTAL = "total"
+
+
+class Histogram(object):
+    """
+    HDR style histogram of non-negative integers, like the nanoseconds of latencies.
+    The values below 2 ** precision are counted exactly, the greater ones are counted in buckets of 2 ** (precision - 1) for each power of 2,
+    so the relative error is less than 2 ** (1 - precision). The values greater than highest are counted as highest.
+    record is not thread safe, each histogram should be recorded by one thread, the others can read a copy.
+    """
+
+    def __init__(self, highest: int = 2 ** 36, precision: int = 8) -> None:
+        self._precision = precision
+        self._sub_count = 1 << precision
+        self._half = 1 << (precision - 1)
+        self._highest = highest
+        self._counts = [0] * (self._index(highest) + 1)
+        self._count = 0
+        self._total = 0
+        self._min = 0
+        self._max = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def min(self) -> int:
+        return self._min
+
+    @property
+    def max(self) -> int:
+        return self._max
+
+    @property
+    def mean(self) -> float:
+        return self._total / self._count if self._count else 0.0
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+        elif value > self._highest:
+            value = self._highest
+        if value < self._sub_count:
+            self._counts[value] += 1
+        else:
+            shift = value.bit_length() - self._precision
+            self._counts[self._sub_count + (shift - 1) * self._half + (value >> shift) - self._half] += 1
+        if not self._count or value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+        self._count += 1
+        self._total += value
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """the highest value equivalent to the value at percentile, it is never greater than max"""
+        if not self._count:
+            return 0
+        target = max(1, int(percentile / 100 * self._count + 0.5))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self._max)
+        return self._max
+
+    def percentiles(self, percentiles: Iterable[float] = PERCENTILES) -> dict[float, int]:
+        return {percentile: self.value_at_percentile(percentile) for percentile in percentiles}
+
+    def merge(self, other: 'Histogram') -> None:
+        """add the counts of other, which must have the same highest and precision"""
+        if other._precision != self._precision or other._highest != self._highest:
+            raise ValueError("only the histograms of the same highest and precision can be merged")
+        if not other._count:
+            return
+        self._counts = [a + b for a, b in zip(self._counts, other._counts)]
+        self._min = min(self._min, other._min) if self._count else other._min
+        self._max = max(self._max, other._max)
+        self._count += other._count
+        self._total += other._total
+
+    def copy(self) -> 'Histogram':
+        histogram = Histogram(self._highest, self._precision)
+        histogram.merge(self)
+        return histogram
+
+    def reset(self) -> None:
+        self._counts = [0] * len(self._counts)
+        self._count = self._total = self._min = self._max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self._precision
+        return self._sub_count + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self._sub_count:
+            return index
+        shift, sub = divmod(index - self._sub_count, self._half)
+        shift += 1
+        return ((sub + self._half + 1) << shift) - 1
+
+
+class LatencyRecorder(object):
+    """
+    Histograms of the latency of each stage of the messages of each CtpMethod, see the stages above.
+    It is given to MdAPI.latency_recorder or SimpleCtpClient.enable_latency, the snapshot can be taken from any thread
+    and dumped periodically by start_dump.
+    """
+
+    def __init__(self, highest: int = 2 ** 36, precision: int = 8) -> None:
+        self._highest = highest
+        self._precision = precision
+        self._histograms: dict[tuple[CtpMethod, str], Histogram] = {}
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def histogram(self, method: CtpMethod, stage: str) -> Histogram:
+        histogram = self._histograms.get((method, stage))
+        if histogram is None:
+            histogram = self._histograms.setdefault((method, stage), Histogram(self._highest, self._precision))
+        return histogram
+
+    def record(self, method: CtpMethod, stage: str, value: int) -> None:
+        histogram = self._histograms.get((method, stage))
+        if histogram is None:
+            histogram = self.histogram(method, stage)
+        histogram.record(value)
+
+    def snapshot(self, percentiles: Iterable[float] = PERCENTILES) -> dict[str, dict[str, dict[str, float]]]:
+        """the count and the latencies in microseconds of each stage of each method, by the names of the methods"""
+        snapshot: dict[str, dict[str, dict[str, float]]] = {}
+        for (method, stage), histogram in list(self._histograms.items()):
+            histogram = histogram.copy()
+            stats = {"count": histogram.count, "min_us": histogram.min / 1000, "mean_us": histogram.mean / 1000}
+            for percentile, value in histogram.percentiles(percentiles).items():
+                stats[f"p{percentile:g}_us"] = value / 1000
+            stats["max_us"] = histogram.max / 1000
+            snapshot.setdefault(method.name, {})[stage] = stats
+        return snapshot
+
+    def reset(self) -> None:
+        """start over, the histograms being recorded are replaced rather than cleared"""
+        self._histograms = {}
+
+    def start_dump(self, interval: float, dump: Callable[[dict], None] | None = None, reset: bool = False) -> None:
+        """call dump with the snapshot every interval seconds in a background thread, the snapshot is logged if dump is None"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._dump, args=(interval, dump or _log_snapshot, reset), name="LatencyDump", daemon=True)
+        self._thread.start()
+
+    def stop_dump(self) -> None:
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def _dump(self, interval: float, dump: Callable[[dict], None], reset: bool) -> None:
+        while not self._stopped.wait(interval):
+            try:
+                dump(self.snapshot())
+                if reset:
+                    self.reset()
+            except Exception:
+                logger.exception("failed to dump the latency")
+
+
+def _log_snapshot(snapshot: dict[str, dict[str, dict[str, float]]]) -> None:
+    for method, stages in snapshot.items():
+        for stage, stats in stages.items():
+            logger.info(
+                "%s %s count %d p50 %.1fus p99 %.1fus p99.9 %.1fus max %.1fus",
+                method, stage, stats["count"], stats.get("p50_us", 0.0), stats.get("p99_us", 0.0), stats.get("p99.9_us", 0.0), stats["max_us"],
+            )
@@ -0,0 +1,59 @@
+import logging
+import queue
+import warnings
+from logging.handlers import QueueHandler, QueueListener
+
+
+LOGGER_NAME = "openctp_client"
+
+# the level, handlers and propagate of the openctp_client logger before each listener was enabled
+_previous: dict[QueueListener, tuple[int, list[logging.Handler], bool]] = {}
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler which leaves the formatting to the listener thread, the spi thread only puts the record into the queue.
+    The arguments of the log records must not be changed after logging, do not log the ctp objects which are reused by ctp.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def enable_background_logging(*handlers: logging.Handler, level: int = logging.INFO) -> QueueListener:
+    """
+    Write the logs of openctp_client by handlers in a background thread, stderr is used if no handler is given.
+    The returned listener should be stopped by disable_background_logging when exiting to flush the logs,
+    which restores the level and the handlers of the openctp_client logger replaced here.
+    """
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger(LOGGER_NAME)
+    previous = (logger.level, list(logger.handlers), logger.propagate)
+    for handler in previous[1]:
+        logger.removeHandler(handler)
+    logger.setLevel(level)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    logger.propagate = False
+    listener = QueueListener(log_queue, *(handlers or (logging.StreamHandler(),)), respect_handler_level=True)
+    _previous[listener] = previous
+    listener.start()
+    return listener
+
+
+def disable_background_logging(listener: QueueListener) -> None:
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if isinstance(handler, DeferredQueueHandler) and handler.queue is listener.queue:
+            logger.removeHandler(handler)
+    level, handlers, propagate = _previous.pop(listener, (logging.NOTSET, [], True))
+    logger.setLevel(level)
+    for handler in handlers:
+        logger.addHandler(handler)
+    logger.propagate = propagate
+    listener.stop()
+
+
+def deprecated_log(logger: logging.Logger, *args, sep: str = " ", **kwargs) -> None:
+    """the log methods printing their arguments are kept for compatibility, they log at info level now"""
+    warnings.warn("log is deprecated, use the logging module instead", DeprecationWarning, stacklevel=3)
+    logger.info(sep.join(str(arg) for arg in args))
@@ -0,0 +1,55 @@
+import time
+from typing import Callable
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled with rate tokens per second, holding at most capacity tokens.
+    It is not thread safe, the callers should hold their own lock.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1, clock: Callable[[], float] = time.monotonic) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1, now: float | None = None) -> bool:
+        """now can be given to share one clock reading between buckets"""
+        self._refill(now)
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+    def wait_time(self, tokens: float = 1, now: float | None = None) -> float:
+        """seconds until the tokens are available, 0 if they are available now"""
+        self._refill(now)
+        if self._tokens >= tokens:
+            return 0.0
+        return (tokens - self._tokens) / self._rate
+
+    def drain(self) -> None:
+        """take all the tokens, used when the server says the limit is exceeded"""
+        self._refill()
+        self._tokens = 0
+
+    def _refill(self, now: float | None = None) -> None:
+        if now is None:
+            now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
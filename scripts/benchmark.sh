@@ -0,0 +1,4 @@
+# bash scripts/benchmark.sh save records the JSON baseline of this machine in tests/benchmarks/baselines
+# bash scripts/benchmark.sh fails if the min of a benchmark is slower than the latest baseline by more than BENCHMARK_THRESHOLD percent
+# (35 by default) after BENCHMARK_RETRIES reruns (3 by default), it is skipped if no baseline has been saved on this machine
+PYTHONPATH=. python -m benchmarks.compare "$@"
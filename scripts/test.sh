@@ -1 +1 @@
-PYTHONPATH=. pytest --cov=openctp_client --cov-report xml:coverage/cov.xml tests/
\ No newline at end of file
+PYTHONPATH=. pytest --benchmark-disable --cov=openctp_client --cov-report xml:coverage/cov.xml tests/
\ No newline at end of file
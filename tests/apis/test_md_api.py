@@ -4,6 +4,7 @@ from openctp_client.openctp import mdapi
 from openctp_client.apis.md_api import MdAPI
 from openctp_client.objects import *
 from openctp_client.objects import CtpConfig
+from openctp_client.utils import LatencyRecorder
 
 
 def test_should_get_spi_callback_when_set_spi_callback_to_md_api(config: CtpConfig, spi_callback):
@@ -67,4 +68,64 @@ def test_should_call_callback_when_OnRtnDepthMarketData(md_client, spi_callback)
     md_client.OnRtnDepthMarketData(pDepthMarketData)
     # should
     spi_callback.assert_called_once()
-   
\ No newline at end of file
+   
+
+def test_should_call_callback_with_field_when_OnRtnDepthMarketData_given_trusted_inbound(md_client, spi_callback):
+    # given
+    md_client.config.trusted_inbound = True
+    md_client.set_spi_callback(CtpMethod.OnRtnDepthMarketData, spi_callback)
+    pDepthMarketData = mdapi.CThostFtdcDepthMarketDataField()
+    pDepthMarketData.InstrumentID = "ag2308"
+    pDepthMarketData.LastPrice = 5000.0
+    # when
+    md_client.OnRtnDepthMarketData(pDepthMarketData)
+    # should
+    spi_callback.assert_called_once_with(DepthMarketDataField(InstrumentID="ag2308", LastPrice=5000.0))
+
+
+def test_should_call_raw_callback_with_snapshot_when_OnRtnDepthMarketData_given_raw_callback(md_client, spi_callback, mocker):
+    # given
+    raw_callback = mocker.stub(name="raw_callback")
+    md_client.set_spi_callback(CtpMethod.OnRtnDepthMarketData, spi_callback)
+    md_client.raw_callback = raw_callback
+    pDepthMarketData = mdapi.CThostFtdcDepthMarketDataField()
+    pDepthMarketData.InstrumentID = "ag2308"
+    pDepthMarketData.LastPrice = 5000.0
+    # when
+    md_client.OnRtnDepthMarketData(pDepthMarketData)
+    pDepthMarketData.LastPrice = 5001.0
+    # should
+    spi_callback.assert_not_called()
+    snapshot = raw_callback.call_args.args[0]
+    assert isinstance(snapshot, DepthMarketDataSnapshot) is True
+    assert snapshot.LastPrice == 5000.0
+    assert snapshot.to_field() == DepthMarketDataField(InstrumentID="ag2308", LastPrice=5000.0)
+
+
+def test_should_pass_snapshot_to_raw_callback_when_OnRtnDepthMarketData_given_snapshot(md_client, mocker):
+    # given
+    raw_callback = mocker.stub(name="raw_callback")
+    md_client.raw_callback = raw_callback
+    pDepthMarketData = mdapi.CThostFtdcDepthMarketDataField()
+    pDepthMarketData.InstrumentID = "ag2308"
+    snapshot = DepthMarketDataSnapshot.from_ctp_object(pDepthMarketData)
+    # when
+    md_client.OnRtnDepthMarketData(snapshot)
+    # should
+    assert raw_callback.call_args.args[0] is snapshot
+
+
+def test_should_record_latency_when_OnRtnDepthMarketData_given_latency_recorder(md_client, spi_callback):
+    # given
+    recorder = LatencyRecorder()
+    md_client.latency_recorder = recorder
+    md_client.set_spi_callback(CtpMethod.OnRtnDepthMarketData, spi_callback)
+    # when
+    md_client.OnRtnDepthMarketData(mdapi.CThostFtdcDepthMarketDataField())
+    md_client.raw_callback = lambda snapshot: None
+    md_client.OnRtnDepthMarketData(mdapi.CThostFtdcDepthMarketDataField())
+    # should
+    spi_callback.assert_called_once()
+    assert md_client.spi_ns > 0
+    stages = recorder.snapshot()["OnRtnDepthMarketData"]
+    assert {stage: stats["count"] for stage, stats in stages.items()} == {"listeners": 2, "conversion": 2, "callback": 2}
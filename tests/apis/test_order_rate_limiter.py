@@ -0,0 +1,142 @@
+import time
+
+from pytest_mock import MockerFixture
+
+from openctp_client.apis import OrderRateLimiter, RateLimitMode, TdAPI
+from openctp_client.apis.order_rate_limiter import RATE_LIMITED
+from openctp_client.objects import *
+from openctp_client.openctp import tdapi
+
+
+class FakeClock(object):
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def input_order(instrument: str = "rb2401", exchange: str = "SHFE", order_ref: str = "1"):
+    return InputOrderField(InstrumentID=instrument, ExchangeID=exchange, OrderRef=order_ref, LimitPrice=3800.0, VolumeTotalOriginal=1).ctp_object()
+
+
+def cancel_order(instrument: str = "rb2401", exchange: str = "SHFE", order_ref: str = "1", session: tuple[int, int] = (1, 100), order_sys_id: str = ""):
+    front_id, session_id = session
+    return InputOrderActionField(
+        InstrumentID=instrument, ExchangeID=exchange, OrderRef=order_ref, FrontID=front_id, SessionID=session_id, OrderSysID=order_sys_id, ActionFlag="0"
+    ).ctp_object()
+
+
+def test_should_send_when_order_insert_given_under_limit(mocker: MockerFixture):
+    send = mocker.Mock(return_value=0)
+    limiter = OrderRateLimiter(account_rate=2, clock=FakeClock())
+    assert limiter.order_insert(send, input_order(), 1) == 0
+    assert limiter.order_insert(send, input_order(), 2) == 0
+    assert send.call_count == 2
+    assert limiter.stats["sent"] == 2
+
+
+def test_should_reject_when_order_insert_given_instrument_limit_exceeded(mocker: MockerFixture):
+    send = mocker.Mock(return_value=0)
+    clock = FakeClock()
+    limiter = OrderRateLimiter(instrument_rate=1, clock=clock)
+    assert limiter.order_insert(send, input_order("rb2401"), 1) == 0
+    assert limiter.order_insert(send, input_order("rb2401"), 2) == RATE_LIMITED
+    assert limiter.order_insert(send, input_order("rb2405"), 3) == 0
+    clock.now = 1
+    assert limiter.order_insert(send, input_order("rb2401"), 4) == 0
+    assert send.call_count == 3
+    assert limiter.stats["rejected"] == 1
+
+
+def test_should_reject_when_order_action_given_exchange_limit_exceeded(mocker: MockerFixture):
+    send = mocker.Mock(return_value=0)
+    limiter = OrderRateLimiter(exchange_rate=1, clock=FakeClock())
+    assert limiter.order_insert(send, input_order(exchange="SHFE"), 1) == 0
+    assert limiter.order_action(send, cancel_order(exchange="SHFE"), 2) == RATE_LIMITED
+    assert limiter.order_action(send, cancel_order(exchange="DCE"), 3) == 0
+
+
+def test_should_send_later_when_order_insert_given_delay_mode():
+    sent = []
+    limiter = OrderRateLimiter(account_rate=20, mode=RateLimitMode.Delay)
+    for req_id in range(1, 22):
+        limiter.order_insert(lambda req, req_id: sent.append(req_id) or 0, input_order(order_ref=str(req_id)), req_id)
+    assert limiter.stats["delayed"] == 1
+    deadline = time.monotonic() + 5
+    while len(sent) < 21 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    limiter.close()
+    assert sent == list(range(1, 22))
+
+
+def test_should_coalesce_when_order_action_given_insert_queued(mocker: MockerFixture):
+    send = mocker.Mock(return_value=0)
+    errors = []
+    limiter = OrderRateLimiter(account_rate=1, mode=RateLimitMode.Delay, clock=FakeClock())
+    limiter.session = (1, 100)
+    limiter.on_error = lambda req, req_id, error_id: errors.append((req.OrderRef, req_id, error_id))
+    limiter.order_insert(send, input_order(order_ref="1"), 1)
+    limiter.order_insert(send, input_order(order_ref="2"), 2)
+    assert limiter.order_action(send, cancel_order(order_ref="2"), 3) == 0
+    stats = limiter.stats
+    limiter.close()
+    assert send.call_count == 1
+    assert stats["coalesced"] == 1
+    assert stats["queued"] == 0
+    assert errors == [("2", 2, RATE_LIMITED)]
+
+
+def test_should_not_coalesce_when_order_action_given_other_session_or_empty_order_ref(mocker: MockerFixture):
+    send = mocker.Mock(return_value=0)
+    limiter = OrderRateLimiter(account_rate=1, mode=RateLimitMode.Delay, clock=FakeClock())
+    limiter.session = (1, 100)
+    limiter.order_insert(send, input_order(order_ref="1"), 1)
+    limiter.order_insert(send, input_order(order_ref=""), 2)
+    limiter.order_insert(send, input_order(order_ref="3"), 3)
+    limiter.order_action(send, cancel_order(order_ref="", order_sys_id="123"), 4)
+    limiter.order_action(send, cancel_order(order_ref="3", session=(2, 200)), 5)
+    stats = limiter.stats
+    limiter.close()
+    assert stats["coalesced"] == 0
+    assert stats["queued"] == 4
+
+
+def test_should_send_once_per_two_seconds_when_order_insert_given_rate_below_one(mocker: MockerFixture):
+    send = mocker.Mock(return_value=0)
+    clock = FakeClock()
+    limiter = OrderRateLimiter(instrument_rate=0.5, clock=clock)
+    assert limiter.order_insert(send, input_order(), 1) == 0
+    assert limiter.order_insert(send, input_order(), 2) == RATE_LIMITED
+    clock.now = 1
+    assert limiter.order_insert(send, input_order(), 3) == RATE_LIMITED
+    clock.now = 2
+    assert limiter.order_insert(send, input_order(), 4) == 0
+    assert send.call_count == 2
+
+
+def test_should_pass_through_limiter_when_ReqOrderInsert_given_limiter(td_client: TdAPI):
+    td_client.api.ReqOrderInsert.return_value = 0
+    td_client.order_rate_limiter = OrderRateLimiter(account_rate=1, clock=FakeClock())
+    order = InputOrderField(InstrumentID="rb2401", ExchangeID="SHFE", OrderRef="1")
+    assert td_client.ReqOrderInsert(order) == 0
+    assert td_client.ReqOrderInsert(order) == RATE_LIMITED
+    td_client.api.ReqOrderInsert.assert_called_once()
+
+
+def test_should_call_OnRspOrderInsert_when_queued_insert_cancelled_given_delay_mode(td_client: TdAPI, spi_callback):
+    td_client.callback = spi_callback
+    td_client.api.ReqOrderInsert.return_value = 0
+    login = tdapi.CThostFtdcRspUserLoginField()
+    login.FrontID = 1
+    login.SessionID = 100
+    td_client.OnRspUserLogin(login, None, 1, True)
+    spi_callback.reset_mock()
+    td_client.order_rate_limiter = OrderRateLimiter(account_rate=1, mode=RateLimitMode.Delay, clock=FakeClock())
+    td_client.ReqOrderInsert(InputOrderField(InstrumentID="rb2401", ExchangeID="SHFE", OrderRef="1"), 1)
+    td_client.ReqOrderInsert(InputOrderField(InstrumentID="rb2401", ExchangeID="SHFE", OrderRef="2"), 2)
+    td_client.ReqOrderAction(InputOrderActionField(InstrumentID="rb2401", ExchangeID="SHFE", OrderRef="2", FrontID=1, SessionID=100, ActionFlag="0"), 3)
+    td_client.order_rate_limiter.close()
+    rsp = spi_callback.call_args.args[0]
+    assert rsp.method is CtpMethod.OnRspOrderInsert
+    assert (rsp.InputOrder.OrderRef, rsp.RequestID, rsp.RspInfo.ErrorID) == ("2", 2, RATE_LIMITED)
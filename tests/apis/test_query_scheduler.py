@@ -0,0 +1,185 @@
+import itertools
+import threading
+
+import pytest
+
+from openctp_client.apis import RequestRegistry
+from openctp_client.apis.query_scheduler import QueryScheduler
+from openctp_client.exceptions import CallException
+from openctp_client.objects import *
+from openctp_client.objects.responses import *
+
+
+class FakeTdAPI(object):
+    """answers the queries in order, the return codes are taken from codes before 0 is returned"""
+
+    def __init__(self, registry: RequestRegistry, codes: list[int] = ()) -> None:
+        self.registry = registry
+        self.codes = list(codes)
+        self.sent: list[str] = []
+        # the names of the queries whose responses are lost
+        self.lost: set[str] = set()
+        self.lock = threading.Lock()
+        self.blocked = threading.Event()
+        self.blocked.set()
+
+    def ReqQryInvestorPosition(self, qry, req_id):
+        return self._answer("position", req_id)
+
+    def ReqQrySettlementInfo(self, qry, req_id):
+        return self._answer("settlement", req_id)
+
+    def ReqQryInstrument(self, qry, req_id):
+        return self._answer(qry.InstrumentID, req_id)
+
+    def _answer(self, name, req_id):
+        self.blocked.wait()
+        with self.lock:
+            self.sent.append(name)
+            if self.codes:
+                return self.codes.pop(0)
+        if name in self.lost:
+            return 0
+        self.registry.feed(RspQryInstrument(Instrument=InstrumentField(InstrumentID=name), RequestID=req_id, IsLast=True))
+        return 0
+
+
+@pytest.fixture
+def registry():
+    return RequestRegistry()
+
+
+def new_scheduler(registry: RequestRegistry, **kwargs) -> QueryScheduler:
+    counter = itertools.count(1)
+    return QueryScheduler(lambda: next(counter), registry, rate=1000, **kwargs)
+
+
+def test_should_complete_future_when_submit(registry: RequestRegistry):
+    td = FakeTdAPI(registry)
+    scheduler = new_scheduler(registry)
+    future = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    assert future.result(timeout=5)[0].InstrumentID == "ag2406"
+    scheduler.close()
+
+
+def test_should_retry_when_submit_given_throttled(registry: RequestRegistry):
+    td = FakeTdAPI(registry, codes=[-3, -2])
+    scheduler = new_scheduler(registry)
+    future = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    assert future.result(timeout=5)[0].InstrumentID == "ag2406"
+    assert td.sent == ["ag2406"] * 3
+    scheduler.close()
+
+
+def test_should_throw_call_exception_when_submit_given_retries_exceeded(registry: RequestRegistry):
+    td = FakeTdAPI(registry, codes=[-3, -3])
+    scheduler = new_scheduler(registry, max_retries=1)
+    future = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    with pytest.raises(CallException):
+        future.result(timeout=5)
+    scheduler.close()
+
+
+def test_should_throw_call_exception_when_submit_given_call_failed(registry: RequestRegistry):
+    td = FakeTdAPI(registry, codes=[-1])
+    scheduler = new_scheduler(registry)
+    future = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    with pytest.raises(CallException):
+        future.result(timeout=5)
+    assert td.sent == ["ag2406"]
+    scheduler.close()
+
+
+def test_should_share_future_when_submit_given_identical_pending_query(registry: RequestRegistry):
+    td = FakeTdAPI(registry)
+    td.blocked.clear()
+    scheduler = new_scheduler(registry)
+    first = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    second = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    other = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="au2406"))
+    td.blocked.set()
+    assert first is second
+    assert other is not first
+    other.result(timeout=5)
+    assert td.sent == ["ag2406", "au2406"]
+    scheduler.close()
+
+
+def test_should_send_by_priority_when_submit(registry: RequestRegistry):
+    td = FakeTdAPI(registry)
+    td.blocked.clear()
+    scheduler = new_scheduler(registry)
+    # the first query is blocked in flight, the others are queued behind it
+    scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    while scheduler.in_flight == 0:
+        pass
+    settlement = scheduler.submit(td.ReqQrySettlementInfo, QrySettlementInfoField())
+    scheduler.submit(td.ReqQryInvestorPosition, QryInvestorPositionField())
+    td.blocked.set()
+    settlement.result(timeout=5)
+    assert td.sent == ["ag2406", "position", "settlement"]
+    scheduler.close()
+
+
+def test_should_cancel_queued_queries_when_close(registry: RequestRegistry):
+    td = FakeTdAPI(registry)
+    td.blocked.clear()
+    scheduler = new_scheduler(registry)
+    scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    while scheduler.in_flight == 0:
+        pass
+    queued = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="au2406"))
+    closing = threading.Thread(target=scheduler.close)
+    closing.start()
+    td.blocked.set()
+    closing.join(timeout=5)
+    assert queued.cancelled() is True
+    with pytest.raises(RuntimeError):
+        scheduler.submit(td.ReqQryInstrument, QryInstrumentField())
+
+
+def test_should_send_next_query_when_timed_out_given_response_lost(registry: RequestRegistry):
+    td = FakeTdAPI(registry)
+    td.lost.add("ag2406")
+    scheduler = new_scheduler(registry)
+    lost = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"), timeout=0.2)
+    answered = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="au2406"), timeout=0.2)
+    assert answered.result(timeout=5)[0].InstrumentID == "au2406"
+    with pytest.raises(TimeoutError):
+        lost.result(timeout=0)
+    assert td.sent == ["ag2406", "au2406"]
+    assert scheduler.in_flight == 0
+    scheduler.close()
+
+
+def test_should_not_send_when_submit_given_queued_query_cancelled(registry: RequestRegistry):
+    td = FakeTdAPI(registry)
+    td.blocked.clear()
+    scheduler = new_scheduler(registry)
+    scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    while scheduler.in_flight == 0:
+        pass
+    cancelled = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="au2406"))
+    assert cancelled.cancel() is True
+    assert len(scheduler) == 0
+    again = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="au2406"))
+    td.blocked.set()
+    assert again is not cancelled
+    assert again.result(timeout=5)[0].InstrumentID == "au2406"
+    assert td.sent == ["ag2406", "au2406"]
+    scheduler.close()
+
+
+def test_should_cancel_in_flight_query_when_close_given_response_lost(registry: RequestRegistry):
+    td = FakeTdAPI(registry)
+    td.lost.add("ag2406")
+    scheduler = new_scheduler(registry)
+    lost = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="ag2406"))
+    queued = scheduler.submit(td.ReqQryInstrument, QryInstrumentField(InstrumentID="au2406"))
+    while not td.sent:
+        pass
+    scheduler.close()
+    assert lost.cancelled() is True
+    assert queued.cancelled() is True
+    assert scheduler.in_flight == 0
+    assert len(registry) == 0
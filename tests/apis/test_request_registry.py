@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from openctp_client.apis import RequestRegistry
+from openctp_client.exceptions import CtpException
+from openctp_client.objects import *
+from openctp_client.objects.responses import *
+
+
+def instrument_rsp(req_id: int, instrument: str | None, is_last: bool, error_id: int = 0) -> RspQryInstrument:
+    return RspQryInstrument(
+        Instrument=InstrumentField(InstrumentID=instrument) if instrument else None,
+        RspInfo=RspInfoField(ErrorID=error_id),
+        RequestID=req_id,
+        IsLast=is_last
+    )
+
+
+def test_should_complete_with_all_rows_when_feed_given_is_last():
+    registry = RequestRegistry()
+    future = registry.register(1)
+    assert registry.feed(instrument_rsp(1, "ag2406", False)) is True
+    assert future.done() is False
+    assert registry.feed(instrument_rsp(1, "au2406", True)) is True
+    assert [row.InstrumentID for row in future.result()] == ["ag2406", "au2406"]
+    assert len(registry) == 0
+
+
+def test_should_complete_with_empty_list_when_feed_given_no_row():
+    registry = RequestRegistry()
+    future = registry.register(1)
+    registry.feed(instrument_rsp(1, None, True))
+    assert future.result() == []
+
+
+def test_should_return_False_when_feed_given_unknown_request():
+    registry = RequestRegistry()
+    registry.register(1)
+    assert registry.feed(instrument_rsp(2, "ag2406", True)) is False
+    assert 1 in registry
+
+
+def test_should_throw_ctp_exception_when_feed_given_rsp_error():
+    registry = RequestRegistry()
+    future = registry.register(1)
+    registry.feed(instrument_rsp(1, None, True, error_id=90))
+    with pytest.raises(CtpException):
+        future.result()
+    assert len(registry) == 0
+
+
+def test_should_throw_exception_when_fail():
+    registry = RequestRegistry()
+    future = registry.register(1)
+    registry.fail(1, ValueError())
+    with pytest.raises(ValueError):
+        future.result()
+
+
+def test_should_time_out_when_sweep_given_expired_request():
+    registry = RequestRegistry()
+    alive = registry.register(2, timeout=60)
+    expired = registry.register(1, timeout=0)
+    time.sleep(0.01)
+    assert registry.sweep() == 1
+    with pytest.raises(TimeoutError):
+        expired.result()
+    assert alive.done() is False
+    assert 2 in registry
+
+
+def test_should_time_out_when_deadline_passed_given_no_more_traffic():
+    registry = RequestRegistry()
+    later = registry.register(1, timeout=0.2)
+    earlier = registry.register(2, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        earlier.result(timeout=1)
+    assert later.done() is False
+    with pytest.raises(TimeoutError):
+        later.result(timeout=1)
+    assert len(registry) == 0
+
+
+def test_should_wait_in_one_thread_when_register_given_earlier_deadlines():
+    registry = RequestRegistry()
+    futures = [registry.register(1, timeout=0.9)]
+    waiter = registry._waiter
+    futures.extend(registry.register(req_id, timeout=1.0 - req_id * 0.1) for req_id in range(2, 6))
+    assert registry._waiter is waiter
+    with pytest.raises(TimeoutError):
+        futures[-1].result(timeout=1)
+    assert futures[0].done() is False
+    for future in futures:
+        future.cancel()
+
+
+def test_should_time_out_lazily_when_register_given_expired_request():
+    registry = RequestRegistry()
+    expired = registry.register(1, timeout=0)
+    time.sleep(0.01)
+    registry.register(2)
+    assert expired.done() is True
+    assert 1 not in registry
+
+
+def test_should_remove_request_when_future_cancelled():
+    registry = RequestRegistry()
+    future = registry.register(1)
+    future.cancel()
+    assert len(registry) == 0
+    assert registry.feed(instrument_rsp(1, "ag2406", True)) is False
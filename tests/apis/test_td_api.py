@@ -1,9 +1,12 @@
+import threading
+
 import pytest
 from pytest_mock import MockerFixture
 
 from openctp_client.openctp import tdapi
 from openctp_client.apis.td_api import TdAPI
 from openctp_client.objects import *
+from openctp_client.exceptions import CallException
 
 
 def test_should_create_TdClient(config: CtpConfig):
@@ -332,3 +335,63 @@ def test_should_call_callback_when_OnRspQryTrade(td_client: TdAPI, spi_callback)
     trade = TradeField.from_ctp_object(pTrade)
     rsp_info = RspInfoField.from_ctp_object(pRspInfo)
     spi_callback.assert_called_once_with(trade, rsp_info, 2, True)
+
+
+def test_should_complete_future_when_query_given_is_last(td_client: TdAPI, spi_callback):
+    td_client.callback = spi_callback
+    def req_qry_instrument(req, req_id):
+        td_client.OnRspQryInstrument(tdapi.CThostFtdcInstrumentField(), None, req_id, False)
+        td_client.OnRspQryInstrument(tdapi.CThostFtdcInstrumentField(), None, req_id, True)
+        return 0
+    td_client.api.ReqQryInstrument.side_effect = req_qry_instrument
+    future = td_client.query(td_client.ReqQryInstrument, QryInstrumentField())
+    assert len(future.result(timeout=1)) == 2
+    spi_callback.assert_not_called()
+
+
+def test_should_throw_call_exception_when_query_given_call_failed(td_client: TdAPI):
+    td_client.api.ReqQryTrade.return_value = -2
+    future = td_client.query(td_client.ReqQryTrade, QryTradeField())
+    with pytest.raises(CallException):
+        future.result(timeout=1)
+    assert len(td_client.requests) == 0
+
+
+def test_should_call_callback_when_OnRspQryOrder_given_not_queried(td_client: TdAPI, spi_callback):
+    td_client.callback = spi_callback
+    td_client.query(td_client.ReqQryOrder, QryOrderField())
+    td_client.OnRspQryOrder(None, None, 100, True)
+    spi_callback.assert_called_once()
+    assert spi_callback.call_args.args[0].RequestID == 100
+
+
+def test_should_complete_future_when_schedule_query(td_client: TdAPI):
+    td_client.api.ReqQryInvestorPosition.side_effect = lambda req, req_id: td_client.OnRspQryInvestorPosition(None, None, req_id, True) or 0
+    future = td_client.schedule_query(td_client.ReqQryInvestorPosition, QryInvestorPositionField())
+    assert future.result(timeout=5) == []
+    td_client.query_scheduler.close()
+
+
+def test_should_return_unique_request_ids_when_request_id_from_threads(td_client: TdAPI):
+    request_ids = []
+    threads = [threading.Thread(target=lambda: request_ids.extend(td_client.request_id for _ in range(1000))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(request_ids) == list(range(1, 4001))
+
+
+def test_should_schedule_query_when_connect_again_after_disconnect(td_client: TdAPI):
+    td_client.api.ReqQryInvestorPosition.side_effect = lambda req, req_id: 0
+    lost = td_client.schedule_query(td_client.ReqQryInvestorPosition, QryInvestorPositionField())
+    while td_client.query_scheduler.in_flight == 0:
+        pass
+    td_client.Disconnect()
+    assert lost.cancelled() is True
+    
+    td_client.Connect()
+    td_client.api.ReqQryInvestorPosition.side_effect = lambda req, req_id: td_client.OnRspQryInvestorPosition(None, None, req_id, True) or 0
+    future = td_client.schedule_query(td_client.ReqQryInvestorPosition, QryInvestorPositionField())
+    assert future.result(timeout=5) == []
+    td_client.query_scheduler.close()
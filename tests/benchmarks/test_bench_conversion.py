@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.utils import sample_ctp_object, sample_field
+from openctp_client.objects import *
+from openctp_client.objects.fields import CtpField
+
+
+FIELD_TYPES = sorted((field_type for field_type in CtpField.__subclasses__() if field_type._ctp_type_ is not None), key=lambda t: t.__name__)
+# the fields sent to ctp by the Req* methods
+REQUEST_TYPES = [field_type for field_type in FIELD_TYPES if field_type.__name__.startswith(("Req", "Qry", "Input"))]
+
+
+@pytest.mark.parametrize("field_type", FIELD_TYPES, ids=lambda field_type: field_type.__name__)
+def test_bench_from_ctp_object(benchmark, field_type: type[CtpField]):
+    obj = sample_ctp_object(field_type)
+    field = benchmark(field_type.from_ctp_object, obj)
+    assert isinstance(field, field_type)
+
+
+@pytest.mark.parametrize("field_type", FIELD_TYPES, ids=lambda field_type: field_type.__name__)
+def test_bench_construct_from_ctp_object(benchmark, field_type: type[CtpField]):
+    obj = sample_ctp_object(field_type)
+    field = benchmark(field_type.construct_from_ctp_object, obj)
+    assert isinstance(field, field_type)
+
+
+@pytest.mark.parametrize("field_type", REQUEST_TYPES, ids=lambda field_type: field_type.__name__)
+def test_bench_ctp_object(benchmark, field_type: type[CtpField]):
+    field = sample_field(field_type)
+    obj = benchmark(field.ctp_object)
+    assert isinstance(obj, field_type._ctp_type_)
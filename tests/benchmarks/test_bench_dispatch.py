@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.utils import sample_ctp_object
+from openctp_client.apis import MdAPI
+from openctp_client.clients import SimpleCtpClient, SimpleCtpClientEvent
+from openctp_client.objects import *
+from openctp_client.objects.responses import *
+from openctp_client.utils import LatencyRecorder
+
+
+@pytest.fixture
+def tick():
+    return sample_ctp_object(DepthMarketDataField)
+
+
+@pytest.fixture
+def simple_client():
+    client = SimpleCtpClient(CtpConfig(broker_id="9999", investor_id="1", trusted_inbound=True))
+    yield client
+    if client._thread.is_alive():
+        client.disconnect()
+        client._thread.join()
+
+
+@pytest.mark.parametrize("trusted_inbound", [False, True], ids=["validated", "trusted"])
+def test_bench_md_api_tick_to_callback(benchmark, tick, trusted_inbound: bool):
+    md_api = MdAPI(CtpConfig(trusted_inbound=trusted_inbound))
+    received = []
+    md_api.callback = received.append
+    benchmark(md_api.OnRtnDepthMarketData, tick)
+    assert received[-1].DepthMarketData.LastPrice == tick.LastPrice
+
+
+def test_bench_md_api_tick_to_callback_given_latency_recorder(benchmark, tick):
+    md_api = MdAPI(CtpConfig(trusted_inbound=True))
+    md_api.latency_recorder = LatencyRecorder()
+    received = []
+    md_api.callback = received.append
+    benchmark(md_api.OnRtnDepthMarketData, tick)
+    assert md_api.latency_recorder.histogram(CtpMethod.OnRtnDepthMarketData, "callback").count > 0
+
+
+def test_bench_md_api_tick_to_raw_callback(benchmark, tick):
+    md_api = MdAPI(CtpConfig())
+    received = []
+    md_api.raw_callback = received.append
+    benchmark(md_api.OnRtnDepthMarketData, tick)
+    assert received[-1].LastPrice == tick.LastPrice
+
+
+def test_bench_simple_client_produce_to_consume(benchmark, simple_client: SimpleCtpClient, tick):
+    """one tick from the spi callback through the queue to the on_tick event in the consumer thread"""
+    consumed = threading.Event()
+    simple_client.on_event(SimpleCtpClientEvent.on_tick, lambda field: consumed.set())
+    simple_client._start_process()
+    on_tick = simple_client.mdapi.OnRtnDepthMarketData
+
+    def round_trip() -> None:
+        consumed.clear()
+        on_tick(tick)
+        consumed.wait()
+
+    benchmark(round_trip)
+
+
+def test_bench_simple_client_order_insert(benchmark, simple_client: SimpleCtpClient):
+    """from order_insert to the ReqOrderInsert of the mock sdk, which returns at once when not connected"""
+    benchmark(simple_client.order_insert, "SHFE", "rb2401", 3800.0, 1, Direction.Buy, Offset.Open)
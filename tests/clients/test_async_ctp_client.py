@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from openctp_client.clients import AsyncCtpClient
+from openctp_client.exceptions import CallException, CtpException
+from openctp_client.objects import *
+from openctp_client.objects.responses import *
+from openctp_client.openctp import tdapi
+
+
+@pytest.fixture
+def async_ctp_client(config: CtpConfig, mocker: MockerFixture):
+    td = mocker.patch("openctp_client.apis.td_api.tdapi")
+    td.CThostFtdcTraderApi.CreateFtdcTraderApi.return_value = mocker.Mock(name="tdapi")
+    md = mocker.patch("openctp_client.apis.md_api.mdapi")
+    md.CThostFtdcMdApi.CreateFtdcMdApi.return_value = mocker.Mock(name="mdapi")
+    client = AsyncCtpClient(config)
+    login_field = tdapi.CThostFtdcRspUserLoginField()
+    client.mdapi.api.Init.side_effect = client.mdapi.OnFrontConnected
+    client.mdapi.api.ReqUserLogin.side_effect = lambda *args: client.mdapi.OnRspUserLogin(login_field, None, 1, True)
+    client.tdapi.api.Init.side_effect = client.tdapi.OnFrontConnected
+    client.tdapi.api.ReqAuthenticate.side_effect = lambda *args: client.tdapi.OnRspAuthenticate(None, None, 1, True)
+    client.tdapi.api.ReqUserLogin.side_effect = lambda *args: client.tdapi.OnRspUserLogin(login_field, None, 2, True)
+    return client
+
+
+def test_should_resolve_when_connect(async_ctp_client: AsyncCtpClient):
+    asyncio.run(async_ctp_client.connect())
+    async_ctp_client.mdapi.api.Init.assert_called_once()
+    async_ctp_client.tdapi.api.Init.assert_called_once()
+
+
+def test_should_throw_exception_when_connect_given_td_login_failed(async_ctp_client: AsyncCtpClient):
+    rsp_info = tdapi.CThostFtdcRspInfoField()
+    rsp_info.ErrorID = 3
+    rsp_info.ErrorMsg = "invalid password"
+    async_ctp_client.tdapi.api.ReqUserLogin.side_effect = lambda *args: async_ctp_client.tdapi.OnRspUserLogin(None, rsp_info, 2, True)
+    with pytest.raises(CtpException):
+        asyncio.run(async_ctp_client.connect())
+
+
+def test_should_iterate_ticks_of_instrument_when_ticks(async_ctp_client: AsyncCtpClient):
+    async def run():
+        await async_ctp_client.connect()
+        ticks = async_ctp_client.ticks("ag2406")
+        next_tick = asyncio.ensure_future(ticks.__anext__())
+        await asyncio.sleep(0)
+        for instrument, price in (("au2406", 1.0), ("ag2406", 2.0), ("ag2406", 3.0)):
+            tick = tdapi.CThostFtdcDepthMarketDataField()
+            tick.InstrumentID = instrument
+            tick.LastPrice = price
+            async_ctp_client.mdapi.OnRtnDepthMarketData(tick)
+        first = await next_tick
+        second = await ticks.__anext__()
+        await ticks.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    async_ctp_client.mdapi.api.SubscribeMarketData.assert_called_once()
+    assert (first.LastPrice, second.LastPrice) == (2.0, 3.0)
+    assert async_ctp_client._tick_streams["ag2406"] == []
+
+
+def test_should_wake_up_once_when_produce_rsp_given_many_responses(async_ctp_client: AsyncCtpClient, mocker: MockerFixture):
+    async def run():
+        await async_ctp_client.connect()
+        async_ctp_client._loop = mocker.Mock(wraps=async_ctp_client._loop)
+        for _ in range(10):
+            async_ctp_client._produce_rsp(CtpResponse(method=CtpMethod.OnRtnOrder))
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    async_ctp_client._loop.call_soon_threadsafe.assert_called_once()
+    assert len(async_ctp_client._pending) == 0
+
+
+def test_should_return_all_rows_when_query_given_is_last(async_ctp_client: AsyncCtpClient):
+    def req_qry_instrument(qry, req_id):
+        for instrument, is_last in (("ag2406", False), ("au2406", True)):
+            field = tdapi.CThostFtdcInstrumentField()
+            field.InstrumentID = instrument
+            async_ctp_client.tdapi.OnRspQryInstrument(field, None, req_id, is_last)
+        return 0
+
+    async def run():
+        await async_ctp_client.connect()
+        async_ctp_client.tdapi.api.ReqQryInstrument.side_effect = req_qry_instrument
+        return await async_ctp_client.query_instruments()
+
+    instruments = asyncio.run(run())
+    assert [instrument.InstrumentID for instrument in instruments] == ["ag2406", "au2406"]
+    assert len(async_ctp_client.tdapi.requests) == 0
+
+
+def test_should_throw_exception_when_query_given_rsp_error(async_ctp_client: AsyncCtpClient):
+    rsp_info = tdapi.CThostFtdcRspInfoField()
+    rsp_info.ErrorID = 90
+
+    async def run():
+        await async_ctp_client.connect()
+        async_ctp_client.tdapi.api.ReqQryTradingAccount.side_effect = lambda qry, req_id: async_ctp_client.tdapi.OnRspQryTradingAccount(None, rsp_info, req_id, True) or 0
+        return await async_ctp_client.query_account()
+
+    with pytest.raises(CtpException):
+        asyncio.run(run())
+
+
+def test_should_throw_exception_when_query_given_call_failed(async_ctp_client: AsyncCtpClient):
+    async def run():
+        await async_ctp_client.connect()
+        async_ctp_client.tdapi.api.ReqQryInvestorPosition.return_value = -3
+        return await async_ctp_client.query_positions()
+
+    with pytest.raises(CallException):
+        asyncio.run(run())
+    assert len(async_ctp_client.tdapi.requests) == 0
+
+
+def test_should_drop_oldest_tick_when_ticks_given_full_stream(async_ctp_client: AsyncCtpClient):
+    async def run():
+        await async_ctp_client.connect()
+        ticks = async_ctp_client.ticks("ag2406", maxsize=2)
+        next_tick = asyncio.ensure_future(ticks.__anext__())
+        await asyncio.sleep(0)
+        for price in (1.0, 2.0, 3.0, 4.0):
+            tick = tdapi.CThostFtdcDepthMarketDataField()
+            tick.InstrumentID = "ag2406"
+            tick.LastPrice = price
+            async_ctp_client.mdapi.OnRtnDepthMarketData(tick)
+        received = [await next_tick, await ticks.__anext__()]
+        await ticks.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert [tick.LastPrice for tick in received] == [3.0, 4.0]
+    assert async_ctp_client.dropped == 2
+
+
+def test_should_drop_rsp_when_produce_rsp_given_not_connected(async_ctp_client: AsyncCtpClient):
+    async_ctp_client._produce_rsp(CtpResponse(method=CtpMethod.OnRtnOrder))
+    assert len(async_ctp_client._pending) == 0
@@ -0,0 +1,36 @@
+from openctp_client.clients import OrderTemplates
+from openctp_client.objects import *
+from openctp_client.openctp import tdapi
+
+
+def test_should_reuse_template_when_get_given_same_key():
+    templates = OrderTemplates("9999", "000001")
+    template = templates.get("SHFE", "rb2401", Direction.Buy, Offset.Open)
+    assert isinstance(template, tdapi.CThostFtdcInputOrderField) is True
+    assert templates.get("SHFE", "rb2401", Direction.Buy, Offset.Open) is template
+    assert templates.get("SHFE", "rb2401", Direction.Sell, Offset.Open) is not template
+    assert len(templates) == 2
+
+
+def test_should_fill_static_fields_when_get():
+    templates = OrderTemplates("9999", "000001")
+    template = templates.get("SHFE", "rb2401", Direction.Sell, Offset.CloseToday)
+    assert template.BrokerID == "9999"
+    assert template.InvestorID == "000001"
+    assert template.ExchangeID == "SHFE"
+    assert template.InstrumentID == "rb2401"
+    assert template.Direction == Direction.Sell.value
+    assert template.CombOffsetFlag == Offset.CloseToday.value
+
+
+def test_should_patch_dynamic_fields_when_fill():
+    templates = OrderTemplates("9999", "000001")
+    req = templates.fill("SHFE", "rb2401", Direction.Buy, Offset.Open, 3800.0, 2, "12", 7)
+    assert req.LimitPrice == 3800.0
+    assert req.VolumeTotalOriginal == 2
+    assert req.OrderRef == "12"
+    assert req.RequestID == 7
+    
+    req = templates.fill("SHFE", "rb2401", Direction.Buy, Offset.Open, 3801.0, 1, "13", 8)
+    assert req.LimitPrice == 3801.0
+    assert req.OrderRef == "13"
@@ -0,0 +1,235 @@
+import threading
+
+import pytest
+
+from openctp_client.clients import BatchQueue, SpscRingBuffer, RingBufferQueue, ConflatingQueue, BoundedQueue, OverflowPolicy
+from openctp_client.objects import *
+from openctp_client.objects.responses import *
+
+
+@pytest.mark.parametrize("queue_type", [BatchQueue, SpscRingBuffer, RingBufferQueue])
+def test_should_get_items_in_order_when_get_batch(queue_type):
+    rsp_queue = queue_type()
+    for i in range(5):
+        rsp_queue.put(i)
+    assert len(rsp_queue) == 5
+    assert rsp_queue.get_batch(3) == [0, 1, 2]
+    assert rsp_queue.get_batch(10) == [3, 4]
+    assert len(rsp_queue) == 0
+
+
+def test_should_round_capacity_up_to_power_of_two_when_create_ring_buffer():
+    assert SpscRingBuffer(1000).capacity == 1024
+    assert SpscRingBuffer(1024).capacity == 1024
+
+
+def test_should_keep_order_when_ring_buffer_wraps_around():
+    ring = SpscRingBuffer(4)
+    received = []
+    for i in range(10):
+        ring.put(i)
+        ring.put(-i)
+        received.extend(ring.get_batch(4))
+    assert received == [v for i in range(10) for v in (i, -i)]
+
+
+@pytest.mark.parametrize("queue_type", [BatchQueue, SpscRingBuffer, RingBufferQueue])
+def test_should_wake_consumer_when_put_from_producer_thread(queue_type):
+    rsp_queue = queue_type(8) if queue_type is not BatchQueue else queue_type()
+    count = 10000
+    
+    def produce():
+        for i in range(count):
+            rsp_queue.put(i)
+    
+    producer = threading.Thread(target=produce)
+    producer.start()
+    received = []
+    while len(received) < count:
+        received.extend(rsp_queue.get_batch(100))
+    producer.join()
+    assert received == list(range(count))
+
+
+def test_should_get_items_from_every_producer_when_get_batch_from_ring_buffer_queue():
+    rsp_queue = RingBufferQueue()
+    producers = [threading.Thread(target=lambda n=n: [rsp_queue.put((n, i)) for i in range(1000)]) for n in range(3)]
+    for producer in producers:
+        producer.start()
+    received = []
+    while len(received) < 3000:
+        received.extend(rsp_queue.get_batch(64))
+    for producer in producers:
+        producer.join()
+    for n in range(3):
+        assert [i for m, i in received if m == n] == list(range(1000))
+
+
+def test_should_keep_latest_tick_of_instrument_when_put_to_conflating_queue():
+    rsp_queue = ConflatingQueue()
+    rsp_queue.put(RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="rb2401", LastPrice=1.0)))
+    rsp_queue.put(RtnOrder(Order=OrderField(OrderRef="1")))
+    rsp_queue.put(RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="ag2312", LastPrice=2.0)))
+    rsp_queue.put(RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="rb2401", LastPrice=3.0)))
+    rsp_queue.put(RtnTrade(Trade=TradeField(TradeID="1")))
+    rsp_queue.put(RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="rb2401", LastPrice=4.0)))
+    
+    items = rsp_queue.get_batch(10)
+    
+    assert [item.method for item in items] == [
+        CtpMethod.OnRtnDepthMarketData, CtpMethod.OnRtnOrder, CtpMethod.OnRtnDepthMarketData, CtpMethod.OnRtnTrade
+    ]
+    assert items[0].DepthMarketData.LastPrice == 4.0
+    assert items[2].DepthMarketData.LastPrice == 2.0
+    assert rsp_queue.conflated == {"rb2401": 2}
+
+
+def test_should_append_tick_again_when_put_to_conflating_queue_after_get_batch():
+    rsp_queue = ConflatingQueue()
+    rsp_queue.put(RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="rb2401", LastPrice=1.0)))
+    assert rsp_queue.get_batch(10)[0].DepthMarketData.LastPrice == 1.0
+    rsp_queue.put(RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="rb2401", LastPrice=2.0)))
+    rsp_queue.put(None)
+    items = rsp_queue.get_batch(10)
+    assert items[0].DepthMarketData.LastPrice == 2.0
+    assert items[1] is None
+    assert rsp_queue.conflated == {}
+
+
+def tick(instrument: str, price: float) -> RtnDepthMarketData:
+    return RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID=instrument, LastPrice=price))
+
+
+def prices(items) -> list:
+    return [item.DepthMarketData.LastPrice for item in items if item.method is CtpMethod.OnRtnDepthMarketData]
+
+
+def test_should_drop_oldest_tick_but_keep_order_when_put_to_full_bounded_queue():
+    rsp_queue = BoundedQueue(capacity=2, policy=OverflowPolicy.DropOldest)
+    rsp_queue.put(RtnOrder(Order=OrderField(OrderRef="1")))
+    for price in (1.0, 2.0, 3.0):
+        rsp_queue.put(tick("rb2401", price))
+    rsp_queue.put(RtnTrade(Trade=TradeField(TradeID="1")))
+    
+    items = rsp_queue.get_batch(10)
+    
+    assert items[0].method is CtpMethod.OnRtnOrder
+    assert items[-1].method is CtpMethod.OnRtnTrade
+    assert prices(items) == [2.0, 3.0]
+    assert rsp_queue.stats["dropped"] == 1
+    assert rsp_queue.stats["high_water_mark"] == 4
+
+
+def test_should_drop_newest_tick_when_put_to_full_bounded_queue():
+    rsp_queue = BoundedQueue(capacity=2, policy=OverflowPolicy.DropNewest)
+    for price in (1.0, 2.0, 3.0):
+        rsp_queue.put(tick("rb2401", price))
+    assert prices(rsp_queue.get_batch(10)) == [1.0, 2.0]
+    assert rsp_queue.stats["dropped"] == 1
+
+
+def test_should_block_producer_until_get_batch_when_put_to_full_bounded_queue():
+    rsp_queue = BoundedQueue(capacity=1, policy=OverflowPolicy.Block)
+    rsp_queue.put(tick("rb2401", 1.0))
+    producer = threading.Thread(target=lambda: rsp_queue.put(tick("rb2401", 2.0)))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive() is True
+    
+    assert prices(rsp_queue.get_batch(10)) == [1.0]
+    producer.join()
+    assert prices(rsp_queue.get_batch(10)) == [2.0]
+
+
+def test_should_load_spilled_ticks_in_order_when_get_batch_from_bounded_queue(tmp_path):
+    rsp_queue = BoundedQueue(capacity=2, policy=OverflowPolicy.Spill, spill_dir=str(tmp_path))
+    for price in range(6):
+        rsp_queue.put(tick("rb2401", float(price)))
+    rsp_queue.put(RtnOrder(Order=OrderField(OrderRef="1")))
+    assert rsp_queue.stats["spilled"] == 4
+    assert len(rsp_queue) == 7
+    
+    received = []
+    while len(rsp_queue):
+        received.extend(rsp_queue.get_batch(3))
+    
+    assert prices(received) == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert sum(1 for item in received if item.method is CtpMethod.OnRtnOrder) == 1
+    assert rsp_queue.stats["spill_size"] == 0
+
+
+def test_should_return_sentinel_after_items_of_every_producer_when_get_batch_from_ring_buffer_queue():
+    rsp_queue = RingBufferQueue()
+    producer = threading.Thread(target=lambda: [rsp_queue.put(i) for i in range(3)])
+    producer.start()
+    producer.join()
+    rsp_queue.put(None)
+    assert rsp_queue.get_batch(2) == [0, 1]
+    assert rsp_queue.get_batch(10) == [2, None]
+
+
+def test_should_reclaim_empty_rings_of_exited_producers_when_put_to_ring_buffer_queue():
+    rsp_queue = RingBufferQueue()
+    for n in range(5):
+        producer = threading.Thread(target=rsp_queue.put, args=(n,))
+        producer.start()
+        producer.join()
+        assert rsp_queue.get_batch(10) == [n]
+    rsp_queue.put(5)
+    assert len(rsp_queue._ring_list) == 1
+    assert rsp_queue.get_batch(10) == [5]
+
+
+def test_should_conflate_ticks_when_put_to_conflating_queue_given_bounded_queue():
+    rsp_queue = ConflatingQueue(BoundedQueue(capacity=2))
+    rsp_queue.put(tick("rb2401", 1.0))
+    rsp_queue.put(RtnOrder(Order=OrderField(OrderRef="1")))
+    rsp_queue.put(tick("rb2401", 2.0))
+    rsp_queue.put(tick("ag2312", 3.0))
+    
+    items = rsp_queue.get_batch(10)
+    
+    assert [item.method for item in items] == [CtpMethod.OnRtnDepthMarketData, CtpMethod.OnRtnOrder, CtpMethod.OnRtnDepthMarketData]
+    assert prices(items) == [2.0, 3.0]
+    assert rsp_queue.conflated == {"rb2401": 1}
+
+
+def test_should_put_tick_again_when_conflating_queue_given_bounded_queue_dropped_oldest_placeholder():
+    rsp_queue = ConflatingQueue(BoundedQueue(capacity=1, policy=OverflowPolicy.DropOldest))
+    dropped = []
+    rsp_queue.on_drop = dropped.append
+    rsp_queue.put(tick("rb2401", 1.0))
+    rsp_queue.put(tick("ag2312", 2.0))
+    rsp_queue.put(tick("rb2401", 3.0))
+    
+    assert prices(rsp_queue.get_batch(10)) == [3.0]
+    assert prices(dropped) == [1.0, 2.0]
+    assert rsp_queue.conflated == {}
+
+
+def test_should_put_tick_again_when_conflating_queue_given_bounded_queue_dropped_newest_placeholder():
+    rsp_queue = ConflatingQueue(BoundedQueue(capacity=1, policy=OverflowPolicy.DropNewest))
+    dropped = []
+    rsp_queue.on_drop = dropped.append
+    rsp_queue.put(tick("rb2401", 1.0))
+    rsp_queue.put(tick("ag2312", 2.0))
+    rsp_queue.put(tick("rb2401", 3.0))
+    assert prices(dropped) == [2.0, 1.0]
+    
+    assert prices(rsp_queue.get_batch(10)) == [3.0]
+    rsp_queue.put(tick("ag2312", 4.0))
+    assert prices(rsp_queue.get_batch(10)) == [4.0]
+
+
+def test_should_load_spilled_placeholders_when_get_batch_from_conflating_queue_given_spilling_bounded_queue(tmp_path):
+    rsp_queue = ConflatingQueue(BoundedQueue(capacity=1, policy=OverflowPolicy.Spill, spill_dir=str(tmp_path)))
+    for instrument, price in (("rb2401", 1.0), ("ag2312", 2.0), ("cu2401", 3.0), ("ag2312", 4.0)):
+        rsp_queue.put(tick(instrument, price))
+    rsp_queue.put(RtnOrder(Order=OrderField(OrderRef="1")))
+    
+    received = []
+    while len(rsp_queue):
+        received.extend(rsp_queue.get_batch(10))
+    
+    assert prices(received) == [1.0, 4.0, 3.0]
+    assert rsp_queue.conflated == {"ag2312": 1}
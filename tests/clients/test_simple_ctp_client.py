@@ -1,11 +1,11 @@
 import pytest
 from pytest_mock import MockerFixture
 
-from openctp_client.clients import SimpleCtpClient, SimpleCtpClientEvent
+from openctp_client.clients import SimpleCtpClient, SimpleCtpClientEvent, RingBufferQueue, ConflatingQueue
 from openctp_client.exceptions import CtpException
 from openctp_client.objects import *
 from openctp_client.objects.responses import *
-from openctp_client.openctp import tdapi
+from openctp_client.openctp import mdapi, tdapi
 
 
 @pytest.fixture
@@ -136,3 +136,149 @@ def test_should_call_callback_when_OnRtnDepthMarketData(simple_ctp_client: Simpl
     simple_ctp_client._produce_rsp(rtn_depth_market_data)
     # then
     fn.assert_called_once_with(market_data)
+
+
+def test_should_call_api_ReqOrderInsert_with_template_when_order_insert(simple_ctp_client: SimpleCtpClient):
+    # when
+    simple_ctp_client.order_insert("SHFE", "rb2401", 3800.0, 1, Direction.Buy, Offset.Open)
+    simple_ctp_client.order_insert("SHFE", "rb2401", 3801.0, 2, Direction.Buy, Offset.Open)
+    # then
+    assert simple_ctp_client.tdapi.api.ReqOrderInsert.call_count == 2
+    req, req_id = simple_ctp_client.tdapi.api.ReqOrderInsert.call_args.args
+    assert req.InstrumentID == "rb2401"
+    assert req.LimitPrice == 3801.0
+    assert req.VolumeTotalOriginal == 2
+    assert req.OrderRef == "2"
+    assert req.RequestID == req_id
+
+
+def test_should_call_callback_when_OnRtnOrder_given_on_order(simple_ctp_client: SimpleCtpClient, mocker):
+    # given
+    order = OrderField(InstrumentID="rb2401", OrderStatus="3")
+    fn = mocker.Mock()
+    simple_ctp_client.on_event(SimpleCtpClientEvent.on_order, fn)
+    # when
+    simple_ctp_client._produce_rsp(RtnOrder(Order=order))
+    # then
+    fn.assert_called_once_with(order)
+
+
+def test_should_not_call_callback_when_OnRtnDepthMarketData_given_off_event(simple_ctp_client: SimpleCtpClient, mocker):
+    # given
+    fn = mocker.Mock()
+    simple_ctp_client.on_event(SimpleCtpClientEvent.on_tick, fn)
+    simple_ctp_client.off_event(SimpleCtpClientEvent.on_tick, fn)
+    # when
+    simple_ctp_client._produce_rsp(RtnDepthMarketData(DepthMarketData=DepthMarketDataField()))
+    # then
+    fn.assert_not_called()
+
+
+def test_should_call_ctp_callback_when_on_ctp_event(simple_ctp_client: SimpleCtpClient, mocker):
+    # given
+    fn = mocker.Mock()
+    simple_ctp_client.on_ctp_event(CtpMethod.OnRtnTrade, fn)
+    rsp = RtnTrade(Trade=TradeField(TradeID="1"))
+    # when
+    simple_ctp_client._produce_rsp(rsp)
+    # then
+    fn.assert_called_once_with(rsp)
+
+
+def test_should_replace_event_callbacks_when_on_ctp_event(simple_ctp_client: SimpleCtpClient, mocker):
+    # given
+    event_fn, ctp_fn, replacing_fn = mocker.Mock(), mocker.Mock(), mocker.Mock()
+    simple_ctp_client.on_event(SimpleCtpClientEvent.on_tick, event_fn)
+    simple_ctp_client.on_ctp_event(CtpMethod.OnRtnDepthMarketData, ctp_fn)
+    simple_ctp_client.on_ctp_event(CtpMethod.OnRtnDepthMarketData, replacing_fn)
+    rsp = RtnDepthMarketData(DepthMarketData=DepthMarketDataField())
+    # when
+    simple_ctp_client._produce_rsp(rsp)
+    # then
+    replacing_fn.assert_called_once_with(rsp)
+    ctp_fn.assert_not_called()
+    event_fn.assert_not_called()
+
+
+def test_should_not_call_callback_when_on_instrument_given_empty_query(simple_ctp_client: SimpleCtpClient, mocker):
+    # given
+    fn = mocker.Mock()
+    simple_ctp_client.on_event(SimpleCtpClientEvent.on_instrument, fn)
+    # when
+    simple_ctp_client._produce_rsp(RspQryInstrument(Instrument=None, RequestID=1, IsLast=True))
+    # then
+    fn.assert_not_called()
+
+
+def test_should_call_tick_batch_callback_with_ticks_when_consume_rsp(config: CtpConfig, mocker):
+    # given
+    client = SimpleCtpClient(config, rsp_queue=RingBufferQueue(), batch_size=16)
+    ticks = [DepthMarketDataField(InstrumentID="rb2401", LastPrice=3800.0 + i) for i in range(3)]
+    tick_fn = mocker.Mock()
+    batch_fn = mocker.Mock()
+    client.on_event(SimpleCtpClientEvent.on_tick, tick_fn)
+    client.on_event(SimpleCtpClientEvent.on_tick_batch, batch_fn)
+    for tick in ticks:
+        client._produce_rsp(RtnDepthMarketData(DepthMarketData=tick))
+    client._produce_rsp(RtnOrder(Order=OrderField()))
+    client._stop_process()
+    # when
+    client._consume_rsp()
+    # then
+    assert tick_fn.call_count == 3
+    batch_fn.assert_called_once_with(ticks)
+
+
+def test_should_record_latency_of_each_stage_when_consume_given_enable_latency(config: CtpConfig, mock_td_md, mocker):
+    # given
+    client = SimpleCtpClient(config)
+    recorder = client.enable_latency()
+    fn = mocker.Mock()
+    client.on_event(SimpleCtpClientEvent.on_tick, fn)
+    client.on_event(SimpleCtpClientEvent.on_order, fn)
+    # when
+    client.mdapi.OnRtnDepthMarketData(mdapi.CThostFtdcDepthMarketDataField())
+    client.tdapi.callback(RtnOrder(Order=OrderField(InstrumentID="rb2401")))
+    client._stop_process()
+    client._consume_rsp()
+    # then
+    assert fn.call_count == 2
+    snapshot = recorder.snapshot()
+    assert set(snapshot["OnRtnDepthMarketData"]) == {"listeners", "conversion", "callback", "queueing", "handler", "total"}
+    assert set(snapshot["OnRtnOrder"]) == {"queueing", "handler", "total"}
+    tick = snapshot["OnRtnDepthMarketData"]
+    assert tick["total"]["max_us"] >= tick["queueing"]["max_us"]
+    assert client._enqueued == {}
+
+
+def test_should_restore_callbacks_when_disable_latency(config: CtpConfig, mock_td_md):
+    client = SimpleCtpClient(config)
+    client.enable_latency()
+    client.disable_latency()
+    assert client.latency_recorder is None
+    assert client.mdapi.latency_recorder is None
+    assert client.mdapi.callback == client._produce_rsp
+    assert client.tdapi.callback == client._produce_rsp
+
+
+def test_should_forget_conflated_ticks_when_enable_latency_given_conflating_queue(config: CtpConfig, mock_td_md, mocker):
+    queue = ConflatingQueue()
+    on_drop = queue.on_drop = mocker.Mock()
+    client = SimpleCtpClient(config, rsp_queue=queue)
+    client.enable_latency()
+    for price in (1.0, 2.0, 3.0):
+        client.tdapi.callback(RtnDepthMarketData(DepthMarketData=DepthMarketDataField(InstrumentID="rb2401", LastPrice=price)))
+    assert len(client._enqueued) == 1
+    assert on_drop.call_count == 2
+    client.disable_latency()
+    assert queue.on_drop is on_drop
+
+
+def test_should_evict_oldest_when_produce_timed_rsp_given_max_enqueued(config: CtpConfig, mock_td_md, mocker):
+    mocker.patch("openctp_client.clients.simple_ctp_client._MAX_ENQUEUED", 2)
+    client = SimpleCtpClient(config)
+    client.enable_latency()
+    rsps = [RtnOrder(Order=OrderField(OrderRef=str(i))) for i in range(3)]
+    for rsp in rsps:
+        client.tdapi.callback(rsp)
+    assert list(client._enqueued) == [id(rsps[1]), id(rsps[2])]
@@ -28,3 +28,44 @@ def test_should_return_RspUserLoginField_when_from_ctp_object():
 def test_should_return_None_when_from_ctp_object_given_None():
     login_field = ReqUserLoginField.from_ctp_object(None)
     assert login_field is None
+
+
+def test_should_equal_to_from_ctp_object_when_construct_from_ctp_object():
+    ctp_trade = tdapi.CThostFtdcTradeField()
+    ctp_trade.InstrumentID = "rb2401"
+    ctp_trade.Price = 3800.0
+    ctp_trade.Volume = 2
+    
+    trade_field = TradeField.construct_from_ctp_object(ctp_trade)
+    assert isinstance(trade_field, TradeField) is True
+    assert trade_field == TradeField.from_ctp_object(ctp_trade)
+    assert trade_field.model_dump() == TradeField.from_ctp_object(ctp_trade).model_dump()
+
+
+def test_should_return_None_when_construct_from_ctp_object_given_None():
+    assert TradeField.construct_from_ctp_object(None) is None
+
+
+def test_should_return_empty_rsp_info_when_construct_from_ctp_object_given_None():
+    rsp_info = RspInfoField.construct_from_ctp_object(None)
+    assert rsp_info.ok is True
+
+
+def test_should_only_copy_set_fields_when_ctp_object():
+    input_order = InputOrderField(InstrumentID="rb2401", LimitPrice=3800.0, VolumeTotalOriginal=1)
+    
+    ctp_input_order = input_order.ctp_object()
+    assert isinstance(ctp_input_order, tdapi.CThostFtdcInputOrderField) is True
+    assert ctp_input_order.InstrumentID == "rb2401"
+    assert ctp_input_order.LimitPrice == 3800.0
+    assert ctp_input_order.VolumeTotalOriginal == 1
+    assert ctp_input_order.ExchangeID == tdapi.CThostFtdcInputOrderField().ExchangeID
+
+
+def test_should_copy_every_field_when_ctp_object_given_all_fields_set():
+    trade = TradeField(InstrumentID="rb2401", OrderRef="1", TradeID="T1", Price=3800.0, Volume=2)
+    ctp_trade = trade.ctp_object()
+    # the swig structs have no __eq__, they are compared field by field
+    for name in TradeField.model_fields:
+        value = getattr(trade, name)
+        assert getattr(ctp_trade, name) == (value if value is not None else getattr(tdapi.CThostFtdcTradeField(), name))
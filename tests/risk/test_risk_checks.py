@@ -0,0 +1,70 @@
+from openctp_client.objects import *
+from openctp_client.risk import MaxOrderSize, MaxPosition, Quotes, PriceBand, FatFinger, SelfTrade
+from openctp_client.stores import OrderTracker, PositionKeeper
+
+
+def order(direction: str = "0", offset: str = "0", price: float = 3800.0, volume: int = 1, instrument: str = "rb2401"):
+    return InputOrderField(InstrumentID=instrument, ExchangeID="SHFE", Direction=direction, CombOffsetFlag=offset, LimitPrice=price, VolumeTotalOriginal=volume).ctp_object()
+
+
+def quotes(last: float = 3800.0, lower: float = 3500.0, upper: float = 4100.0) -> Quotes:
+    quotes = Quotes()
+    quotes.on_tick(DepthMarketDataField(InstrumentID="rb2401", LastPrice=last, LowerLimitPrice=lower, UpperLimitPrice=upper))
+    return quotes
+
+
+def test_should_reject_large_order_when_max_order_size():
+    check = MaxOrderSize(10, per_instrument={"rb2401": 5})
+    assert check(order(volume=5)) is None
+    assert check(order(volume=6)) is not None
+    assert check(order(volume=6, instrument="rb2405")) is None
+
+
+def test_should_reject_open_order_when_max_position_exceeded():
+    keeper = PositionKeeper({"rb2401": InstrumentField(InstrumentID="rb2401", VolumeMultiple=10)})
+    keeper.on_trade(TradeField(ExchangeID="SHFE", TradeID="T1", InstrumentID="rb2401", Direction="0", OffsetFlag="0", Price=3800.0, Volume=3))
+    check = MaxPosition(keeper, 4)
+    assert check(order(volume=1)) is None
+    assert check(order(volume=2)) is not None
+    assert check(order(direction="1", volume=4)) is None
+    assert check(order(direction="1", offset="1", volume=10)) is None
+
+
+def test_should_count_working_open_orders_when_max_position_given_order_tracker():
+    keeper = PositionKeeper({"rb2401": InstrumentField(InstrumentID="rb2401", VolumeMultiple=10)})
+    tracker = OrderTracker()
+    tracker.on_order(OrderField(FrontID=1, SessionID=1, OrderRef="1", InstrumentID="rb2401", Direction="0", CombOffsetFlag="0", VolumeTotal=3, OrderStatus="3"))
+    tracker.on_order(OrderField(FrontID=1, SessionID=1, OrderRef="2", InstrumentID="rb2401", Direction="0", CombOffsetFlag="1", VolumeTotal=5, OrderStatus="3"))
+    tracker.on_order(OrderField(FrontID=1, SessionID=1, OrderRef="3", InstrumentID="rb2401", Direction="0", CombOffsetFlag="0", VolumeTotal=5, OrderStatus="5"))
+    check = MaxPosition(keeper, 4, order_tracker=tracker)
+    assert check(order(volume=1)) is None
+    assert check(order(volume=2)) is not None
+    assert check(order(direction="1", volume=4)) is None
+
+
+def test_should_reject_price_out_of_limits_when_price_band():
+    check = PriceBand(quotes())
+    assert check(order(price=4100.0)) is None
+    assert check(order(price=4101.0)) is not None
+    assert check(order(price=3499.0)) is not None
+    assert check(order(instrument="rb2405", price=1.0)) is None
+
+
+def test_should_ignore_invalid_limits_when_price_band():
+    check = PriceBand(quotes(lower=1.7976931348623157e308, upper=1.7976931348623157e308))
+    assert check(order(price=99999.0)) is None
+
+
+def test_should_reject_far_price_when_fat_finger():
+    check = FatFinger(quotes(last=4000.0), 0.05)
+    assert check(order(price=4200.0)) is None
+    assert check(order(price=4201.0)) is not None
+
+
+def test_should_reject_crossing_order_when_self_trade():
+    tracker = OrderTracker()
+    tracker.on_order(OrderField(FrontID=1, SessionID=1, OrderRef="1", ExchangeID="SHFE", OrderSysID="S1", InstrumentID="rb2401", Direction="1", LimitPrice=3800.0, OrderStatus="3"))
+    check = SelfTrade(tracker)
+    assert check(order(direction="0", price=3799.0)) is None
+    assert check(order(direction="0", price=3800.0)) is not None
+    assert check(order(direction="1", price=3700.0)) is None
@@ -0,0 +1,56 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from openctp_client.apis import TdAPI
+from openctp_client.exceptions import RiskException
+from openctp_client.objects import *
+from openctp_client.risk import RiskPipeline, MaxOrderSize
+
+
+def order(volume: int = 1, price: float = 3800.0) -> InputOrderField:
+    return InputOrderField(InstrumentID="rb2401", ExchangeID="SHFE", Direction="0", CombOffsetFlag="0", LimitPrice=price, VolumeTotalOriginal=volume)
+
+
+def test_should_pass_when_check_given_all_checks_passed(mocker: MockerFixture):
+    first = mocker.Mock(return_value=None)
+    second = mocker.Mock(return_value=None)
+    RiskPipeline((first, second)).check(order())
+    first.assert_called_once()
+    second.assert_called_once()
+
+
+def test_should_stop_at_first_rejection_when_check(mocker: MockerFixture):
+    second = mocker.Mock(return_value=None)
+    pipeline = RiskPipeline((MaxOrderSize(5), second))
+    with pytest.raises(RiskException) as e:
+        pipeline.check(order(volume=10))
+    assert e.value.check == "max_order_size"
+    second.assert_not_called()
+    assert pipeline.stats["max_order_size"]["rejected"] == 1
+
+
+def test_should_measure_each_check_when_check_given_timing():
+    def always_pass(req):
+        return None
+    pipeline = RiskPipeline((always_pass, MaxOrderSize(5)), timing=True)
+    pipeline.check(order())
+    pipeline.check(order())
+    stats = pipeline.stats
+    assert stats["always_pass"]["calls"] == 2
+    assert stats["max_order_size"]["calls"] == 2
+    assert stats["max_order_size"]["max_ns"] <= stats["max_order_size"]["total_ns"]
+
+
+def test_should_not_send_when_ReqOrderInsert_given_rejected(td_client: TdAPI):
+    RiskPipeline((MaxOrderSize(5),)).attach(td_client)
+    with pytest.raises(RiskException):
+        td_client.ReqOrderInsert(order(volume=10))
+    td_client.api.ReqOrderInsert.assert_not_called()
+    td_client.ReqOrderInsert(order(volume=1))
+    td_client.api.ReqOrderInsert.assert_called_once()
+
+
+def test_should_feed_ticks_to_checks_when_attach_given_md_api(td_client: TdAPI, md_client, mocker: MockerFixture):
+    check = mocker.Mock(return_value=None)
+    RiskPipeline((check,)).attach(td_client, md_client)
+    assert check.on_tick in md_client._tick_listeners
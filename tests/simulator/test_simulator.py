@@ -0,0 +1,205 @@
+import threading
+
+import pytest
+
+from openctp_ctp import mdapi, tdapi
+from openctp_ctp.simulator import Simulator, SimulatedInstrument, set_simulator
+from openctp_client.clients import SimpleCtpClient, SimpleCtpClientEvent
+from openctp_client.objects import *
+
+
+class RecordingSpi(object):
+    """records the spi calls made by the simulator thread"""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, tuple]] = []
+        self._condition = threading.Condition()
+
+    def __getattr__(self, name: str):
+        if not name.startswith("On"):
+            raise AttributeError(name)
+
+        def record(*args) -> None:
+            with self._condition:
+                self.calls.append((name, args))
+                self._condition.notify_all()
+        return record
+
+    def wait(self, name: str, count: int = 1, timeout: float = 5) -> list[tuple]:
+        """the arguments of the first count calls of name"""
+        with self._condition:
+            assert self._condition.wait_for(lambda: len(self.called(name)) >= count, timeout), f"{name} is not called {count} times"
+            return self.called(name)[:count]
+
+    def called(self, name: str) -> list[tuple]:
+        return [args for method, args in self.calls if method == name]
+
+
+@pytest.fixture
+def simulator():
+    simulator = Simulator(instruments=[SimulatedInstrument("rb2401", "SHFE", 3800.0)], tick_interval=None, depth=0, trading_day="20231212", seed=1)
+    last = set_simulator(simulator)
+    yield simulator
+    simulator.stop()
+    set_simulator(last)
+
+
+def connect_trader() -> tuple[tdapi.CThostFtdcTraderApi, RecordingSpi]:
+    spi = RecordingSpi()
+    api = tdapi.CThostFtdcTraderApi.CreateFtdcTraderApi()
+    api.RegisterSpi(spi)
+    api.Init()
+    spi.wait("OnFrontConnected")
+    api.ReqUserLogin(tdapi.CThostFtdcReqUserLoginField(BrokerID="9999", UserID="1"), 1)
+    spi.wait("OnRspUserLogin")
+    return api, spi
+
+
+def input_order(order_ref: str, direction: str, price: float, volume: int, **fields) -> tdapi.CThostFtdcInputOrderField:
+    values = dict(
+        InstrumentID="rb2401", OrderRef=order_ref, Direction=direction, OrderPriceType="2", LimitPrice=price,
+        VolumeTotalOriginal=volume, CombOffsetFlag="0", CombHedgeFlag="1", TimeCondition="3", VolumeCondition="1",
+    )
+    return tdapi.CThostFtdcInputOrderField(**{**values, **fields})
+
+
+def test_should_return_not_connected_when_request_given_no_init():
+    api = tdapi.CThostFtdcTraderApi.CreateFtdcTraderApi()
+    assert api.ReqOrderInsert(input_order("1", "0", 3800.0, 1), 1) == -1
+
+
+def test_should_login_with_session_when_ReqUserLogin(simulator: Simulator):
+    api, spi = connect_trader()
+    login, rsp_info, _, is_last = spi.wait("OnRspUserLogin")[0]
+    assert login.TradingDay == "20231212"
+    assert login.FrontID == 1
+    assert login.SessionID >= 1
+    assert rsp_info.ErrorID == 0
+    api.Release()
+    api.Join()
+
+
+def test_should_fail_login_when_ReqUserLogin_given_wrong_password(simulator: Simulator):
+    simulator.password = "secret"
+    spi = RecordingSpi()
+    api = tdapi.CThostFtdcTraderApi.CreateFtdcTraderApi()
+    api.RegisterSpi(spi)
+    api.Init()
+    api.ReqUserLogin(tdapi.CThostFtdcReqUserLoginField(Password="wrong"), 1)
+    login, rsp_info, _, _ = spi.wait("OnRspUserLogin")[0]
+    assert login is None
+    assert rsp_info.ErrorID == 3
+
+
+def test_should_match_in_price_time_priority_when_ReqOrderInsert(simulator: Simulator):
+    seller, seller_spi = connect_trader()
+    buyer, buyer_spi = connect_trader()
+    seller.ReqOrderInsert(input_order("1", "1", 3801.0, 2), 1)
+    seller.ReqOrderInsert(input_order("2", "1", 3800.0, 1), 2)
+    seller.ReqOrderInsert(input_order("3", "1", 3800.0, 1), 3)
+    buyer.ReqOrderInsert(input_order("1", "0", 3801.0, 3), 1)
+    trades = [args[0] for args in buyer_spi.wait("OnRtnTrade", 3)]
+    assert [(trade.Price, trade.Volume) for trade in trades] == [(3800.0, 1), (3800.0, 1), (3801.0, 1)]
+    seller_trades = [args[0] for args in seller_spi.wait("OnRtnTrade", 3)]
+    assert [trade.OrderRef for trade in seller_trades] == ["2", "3", "1"]
+    orders = [args[0] for args in buyer_spi.wait("OnRtnOrder", 4)]
+    assert [order.OrderStatus for order in orders] == ["a", "1", "1", "0"]
+    assert simulator.order_book("rb2401").depth(buy=False) == [(3801.0, 1)]
+
+
+def test_should_cancel_when_ReqOrderAction(simulator: Simulator):
+    api, spi = connect_trader()
+    api.ReqOrderInsert(input_order("1", "0", 3790.0, 1), 1)
+    order = spi.wait("OnRtnOrder", 2)[1][0]
+    assert order.OrderStatus == "3"
+    action = tdapi.CThostFtdcInputOrderActionField(ActionFlag="0", FrontID=order.FrontID, SessionID=order.SessionID, OrderRef="1")
+    api.ReqOrderAction(action, 2)
+    assert spi.wait("OnRtnOrder", 3)[2][0].OrderStatus == "5"
+    assert simulator.order_book("rb2401").best(buy=True) is None
+    api.ReqOrderAction(action, 3)
+    assert spi.wait("OnRspOrderAction")[0][1].ErrorID == 26
+
+
+def test_should_cancel_rest_when_ReqOrderInsert_given_ioc(simulator: Simulator):
+    api, spi = connect_trader()
+    api.ReqOrderInsert(input_order("1", "1", 3800.0, 1), 1)
+    api.ReqOrderInsert(input_order("2", "0", 3800.0, 2, TimeCondition="1"), 2)
+    orders = [args[0] for args in spi.wait("OnRtnOrder", 6) if args[0].OrderRef == "2"]
+    assert orders[-1].OrderStatus == "2"
+    assert orders[-1].VolumeTraded == 1
+
+
+def test_should_fill_by_quote_when_ReqOrderInsert_given_depth(simulator: Simulator):
+    simulator.publish_ticks(move=False)
+    market = simulator._markets["rb2401"]
+    market.depth = market.quote_volumes[1] = 5
+    api, spi = connect_trader()
+    api.ReqOrderInsert(input_order("1", "0", 3810.0, 2), 1)
+    trade = spi.wait("OnRtnTrade")[0][0]
+    assert trade.Price == 3801.0
+    assert simulator.last_price("rb2401") == 3801.0
+
+
+def test_should_reject_when_ReqOrderInsert_given_unknown_instrument(simulator: Simulator):
+    api, spi = connect_trader()
+    api.ReqOrderInsert(input_order("1", "0", 3800.0, 1, InstrumentID="xx"), 1)
+    assert spi.wait("OnRspOrderInsert")[0][1].ErrorID == 16
+
+
+def test_should_stream_ticks_of_subscribed_when_SubscribeMarketData(simulator: Simulator):
+    spi = RecordingSpi()
+    api = mdapi.CThostFtdcMdApi.CreateFtdcMdApi()
+    api.RegisterSpi(spi)
+    api.Init()
+    api.ReqUserLogin(mdapi.CThostFtdcReqUserLoginField(), 1)
+    api.SubscribeMarketData([b"rb2401"], 2)
+    spi.wait("OnRspSubMarketData")
+    simulator.publish_ticks()
+    tick = spi.wait("OnRtnDepthMarketData")[0][0]
+    assert tick.InstrumentID == "rb2401"
+    assert tick.TradingDay == "20231212"
+    assert tick.BidPrice1 is None
+
+
+def test_should_trade_end_to_end_when_simple_ctp_client(simulator: Simulator):
+    market = simulator._markets["rb2401"]
+    market.depth = market.quote_volumes[1] = 10
+    client = SimpleCtpClient(CtpConfig(broker_id="9999", user_id="1", investor_id="1"))
+    trades = []
+    traded = threading.Event()
+    client.on_event(SimpleCtpClientEvent.on_trade, lambda trade: (trades.append(trade), traded.set()))
+    client.connect()
+    try:
+        client.order_insert("SHFE", "rb2401", 3810.0, 1, Direction.Buy, Offset.Open)
+        assert traded.wait(5)
+        assert trades[0].Price == 3801.0
+        assert trades[0].InstrumentID == "rb2401"
+    finally:
+        client.disconnect()
+        client.mdapi.Disconnect()
+        client.tdapi.Disconnect()
+
+
+def test_should_report_request_values_when_ReqOrderInsert_rejected_given_reused_request(simulator: Simulator):
+    api, spi = connect_trader()
+    req = input_order("1", "0", 3800.0, 1, InstrumentID="xx")
+    api.ReqOrderInsert(req, 1)
+    req.InstrumentID = "rb2401"
+    assert spi.wait("OnRspOrderInsert")[0][0].InstrumentID == "xx"
+
+
+def test_should_answer_orders_and_trades_when_ReqQryOrder_and_ReqQryTrade(simulator: Simulator):
+    api, spi = connect_trader()
+    api.ReqOrderInsert(input_order("1", "1", 3800.0, 1), 1)
+    api.ReqOrderInsert(input_order("2", "0", 3800.0, 1), 2)
+    api.ReqOrderInsert(input_order("3", "0", 3790.0, 1), 3)
+    spi.wait("OnRtnTrade", 2)
+    api.ReqQryOrder(tdapi.CThostFtdcQryOrderField(InstrumentID="rb2401"), 4)
+    api.ReqQryTrade(tdapi.CThostFtdcQryTradeField(), 5)
+    orders = spi.wait("OnRspQryOrder", 3)
+    trades = spi.wait("OnRspQryTrade", 2)
+    assert [(order.OrderRef, order.OrderStatus) for order, *_ in orders] == [("1", "0"), ("2", "0"), ("3", "3")]
+    assert [is_last for *_, is_last in orders] == [False, False, True]
+    assert sorted(trade.OrderRef for trade, *_ in trades) == ["1", "2"]
+    api.ReqQryOrder(tdapi.CThostFtdcQryOrderField(InstrumentID="xx"), 6)
+    assert spi.wait("OnRspQryOrder", 4)[3][0] is None
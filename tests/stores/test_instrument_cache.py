@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from pytest_mock import MockerFixture
+
+from openctp_client.objects import *
+from openctp_client.stores import InstrumentCache
+
+
+def make_instruments() -> list[InstrumentField]:
+    return [
+        InstrumentField(InstrumentID="rb2401", ExchangeID="SHFE", ProductID="rb", ExpireDate="20240115", VolumeMultiple=10, PriceTick=1.0),
+        InstrumentField(InstrumentID="rb2405", ExchangeID="SHFE", ProductID="rb", ExpireDate="20240515", VolumeMultiple=10, PriceTick=1.0),
+        InstrumentField(InstrumentID="m2405", ExchangeID="DCE", ProductID="m", ExpireDate="20240515", VolumeMultiple=10, PriceTick=1.0),
+    ]
+
+
+def test_should_lookup_by_indexes_when_update(tmp_path):
+    cache = InstrumentCache(str(tmp_path))
+    cache.update("20231212", make_instruments())
+    assert len(cache) == 3
+    assert cache.get("rb2401").VolumeMultiple == 10
+    assert "m2405" in cache
+    assert [i.InstrumentID for i in cache.by_exchange("SHFE")] == ["rb2401", "rb2405"]
+    assert [i.InstrumentID for i in cache.by_product("m")] == ["m2405"]
+    assert [i.InstrumentID for i in cache.expiring("20240501", "20240515")] == ["m2405", "rb2405"]
+    assert cache.by_exchange("CZCE") == []
+
+
+def test_should_load_same_instruments_when_load_given_saved(tmp_path):
+    InstrumentCache(str(tmp_path)).update("20231212", make_instruments())
+    cache = InstrumentCache(str(tmp_path))
+    assert cache.load("20231212") is True
+    assert cache.trading_day == "20231212"
+    assert list(cache) == make_instruments()
+
+
+def test_should_return_False_when_load_given_other_trading_day(tmp_path):
+    InstrumentCache(str(tmp_path)).update("20231212", make_instruments())
+    assert InstrumentCache(str(tmp_path)).load("20231213") is False
+
+
+def test_should_remove_old_file_when_update_given_new_trading_day(tmp_path):
+    cache = InstrumentCache(str(tmp_path))
+    cache.update("20231212", make_instruments())
+    cache.update("20231213", make_instruments())
+    assert os.listdir(tmp_path) == ["instruments_20231213.pkl"]
+
+
+def test_should_not_query_when_refresh_given_cached(tmp_path, mocker: MockerFixture):
+    InstrumentCache(str(tmp_path)).update("20231212", make_instruments())
+    td_api = mocker.Mock()
+    cache = InstrumentCache(str(tmp_path))
+    assert cache.refresh(td_api, "20231212") is False
+    td_api.schedule_query.assert_not_called()
+    assert len(cache) == 3
+
+
+def test_should_query_and_save_when_refresh_given_trading_day_changed(tmp_path, mocker: MockerFixture):
+    InstrumentCache(str(tmp_path)).update("20231212", make_instruments()[:1])
+    td_api = mocker.Mock()
+    td_api.schedule_query.return_value.result.return_value = make_instruments()
+    cache = InstrumentCache(str(tmp_path))
+    assert cache.refresh(td_api, "20231213") is True
+    assert len(cache) == 3
+    assert os.path.exists(cache.path("20231213"))
+
+
+def test_should_query_when_refresh_given_corrupt_cache(tmp_path, mocker: MockerFixture):
+    cache = InstrumentCache(str(tmp_path))
+    with open(cache.path("20231212"), "wb") as f:
+        f.write(b"\x80\x05truncated")
+    td_api = mocker.Mock()
+    td_api.schedule_query.return_value.result.return_value = make_instruments()
+    assert cache.refresh(td_api, "20231212") is True
+    assert len(cache) == 3
+    assert InstrumentCache(str(tmp_path)).load("20231212") is True
+
+
+def test_should_remove_temp_file_when_save_given_dump_failed(tmp_path, mocker: MockerFixture):
+    cache = InstrumentCache(str(tmp_path))
+    mocker.patch("openctp_client.stores.instrument_cache.pickle.dump", side_effect=OSError("disk full"))
+    with pytest.raises(OSError):
+        cache.update("20231212", make_instruments())
+    assert os.listdir(tmp_path) == []
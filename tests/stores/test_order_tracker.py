@@ -0,0 +1,81 @@
+from openctp_client.apis import TdAPI
+from openctp_client.objects import *
+from openctp_client.openctp import tdapi
+from openctp_client.stores import OrderTracker
+
+
+def make_order(status: str, order_ref: str = "1", order_sys_id: str = "", instrument: str = "rb2401") -> OrderField:
+    return OrderField(
+        FrontID=1, SessionID=100, OrderRef=order_ref, ExchangeID="SHFE", OrderSysID=order_sys_id,
+        InstrumentID=instrument, OrderStatus=status, Direction="0", LimitPrice=3800.0, VolumeTotalOriginal=2,
+    )
+
+
+def make_trade(trade_id: str, order_sys_id: str = "S1", price: float = 3800.0, volume: int = 1) -> TradeField:
+    return TradeField(ExchangeID="SHFE", TradeID=trade_id, Direction="0", OrderSysID=order_sys_id, OrderRef="1", Price=price, Volume=volume, InstrumentID="rb2401")
+
+
+def test_should_index_order_when_on_order():
+    tracker = OrderTracker()
+    tracker.on_order(make_order("a"))
+    tracker.on_order(make_order("3", order_sys_id="S1"))
+    state = tracker.get(1, 100, "1")
+    assert state is tracker.get_by_sys_id("SHFE", "S1")
+    assert state.transitions == ["a", "3"]
+    assert len(tracker) == 1
+
+
+def test_should_track_working_orders_when_on_order_given_status_changed():
+    tracker = OrderTracker()
+    tracker.on_order(make_order("3", order_ref="1", order_sys_id="S1"))
+    tracker.on_order(make_order("3", order_ref="2", order_sys_id="S2", instrument="ag2406"))
+    assert [state.order.OrderRef for state in tracker.working_orders("rb2401")] == ["1"]
+    assert len(tracker.working_orders()) == 2
+    tracker.on_order(make_order("5", order_ref="1", order_sys_id="S1"))
+    assert tracker.working_orders("rb2401") == []
+    assert tracker.get(1, 100, "1").working is False
+
+
+def test_should_aggregate_fills_when_on_trade():
+    tracker = OrderTracker()
+    tracker.on_order(make_order("3", order_sys_id="S1"))
+    tracker.on_trade(make_trade("T1", price=3800.0))
+    tracker.on_trade(make_trade("T2", price=3802.0))
+    state = tracker.get(1, 100, "1")
+    assert state.volume_traded == 2
+    assert state.average_price == 3801.0
+
+
+def test_should_apply_early_trade_when_on_order_given_trade_arrived_first():
+    tracker = OrderTracker()
+    tracker.on_trade(make_trade("T1"))
+    assert tracker.early_trades == 1
+    tracker.on_order(make_order("0", order_sys_id="S1"))
+    assert tracker.early_trades == 0
+    assert tracker.get(1, 100, "1").volume_traded == 1
+
+
+def test_should_ignore_repeated_trade_when_on_trade():
+    tracker = OrderTracker()
+    tracker.on_order(make_order("3", order_sys_id="S1"))
+    tracker.on_trade(make_trade("T1"))
+    tracker.on_trade(make_trade("T1"))
+    assert tracker.get(1, 100, "1").volume_traded == 1
+
+
+def test_should_feed_tracker_when_OnRtnOrder_given_attached(td_client: TdAPI, spi_callback):
+    td_client.callback = spi_callback
+    tracker = OrderTracker()
+    tracker.attach(td_client)
+    order = tdapi.CThostFtdcOrderField()
+    order.FrontID = 1
+    order.SessionID = 100
+    order.OrderRef = "1"
+    order.OrderStatus = "a"
+    td_client.OnRtnOrder(order)
+    assert tracker.get(1, 100, "1") is not None
+    spi_callback.assert_called_once()
+    tracker.detach(td_client)
+    order.OrderRef = "2"
+    td_client.OnRtnOrder(order)
+    assert len(tracker) == 1
@@ -0,0 +1,99 @@
+import pytest
+
+from openctp_client.objects import *
+from openctp_client.stores import PositionKeeper
+from openctp_client.stores.position_keeper import LONG, SHORT
+
+
+@pytest.fixture
+def keeper():
+    return PositionKeeper({"rb2401": InstrumentField(InstrumentID="rb2401", VolumeMultiple=10)})
+
+
+def make_trade(trade_id: str, direction: str, offset: str, price: float, volume: int) -> TradeField:
+    return TradeField(ExchangeID="SHFE", TradeID=trade_id, InstrumentID="rb2401", Direction=direction, OffsetFlag=offset, Price=price, Volume=volume)
+
+
+def test_should_add_up_rows_when_seed(keeper: PositionKeeper):
+    keeper.seed([
+        InvestorPositionField(InstrumentID="rb2401", PosiDirection=LONG, PositionDate="1", Position=2, TodayPosition=2, OpenCost=76000.0, ShortFrozen=1),
+        InvestorPositionField(InstrumentID="rb2401", PosiDirection=LONG, PositionDate="2", Position=3, TodayPosition=0, OpenCost=114000.0, CloseProfitByTrade=100.0),
+    ])
+    position = keeper.get("rb2401", LONG)
+    assert (position.today, position.yesterday, position.frozen, position.available) == (2, 3, 1, 4)
+    assert position.average_price == 3800.0
+    assert keeper.realized_pnl == 100.0
+
+
+def test_should_replace_positions_and_forget_trades_when_seed(keeper: PositionKeeper):
+    keeper.on_trade(make_trade("T1", "0", "0", 3800.0, 2))
+    before = keeper.get("rb2401", LONG)
+    keeper.seed([InvestorPositionField(InstrumentID="rb2401", PosiDirection=LONG, Position=1, TodayPosition=1, OpenCost=38000.0)])
+    assert before.volume == 2
+    assert keeper.get("rb2401", LONG) is not before
+    keeper.on_trade(make_trade("T1", "0", "0", 3800.0, 2))
+    assert keeper.get("rb2401", LONG).volume == 3
+
+
+def test_should_update_volumes_and_pnl_when_on_trade(keeper: PositionKeeper):
+    keeper.on_trade(make_trade("T1", "0", "0", 3800.0, 2))
+    keeper.on_trade(make_trade("T2", "1", "3", 3810.0, 1))
+    position = keeper.get("rb2401", LONG)
+    assert position.volume == 1
+    assert position.realized_pnl == 100.0
+    assert position.average_price == 3800.0
+    keeper.on_trade(make_trade("T2", "1", "3", 3810.0, 1))
+    assert position.volume == 1
+
+
+def test_should_realize_short_pnl_when_on_trade_given_buy_close(keeper: PositionKeeper):
+    keeper.on_trade(make_trade("T1", "1", "0", 3800.0, 1))
+    keeper.on_trade(make_trade("T2", "0", "1", 3790.0, 1))
+    assert keeper.get("rb2401", SHORT).realized_pnl == 100.0
+
+
+def test_should_mark_unrealized_pnl_when_on_tick(keeper: PositionKeeper):
+    keeper.on_trade(make_trade("T1", "1", "0", 3800.0, 2))
+    keeper.on_tick(DepthMarketDataField(InstrumentID="rb2401", LastPrice=3795.0))
+    assert keeper.get("rb2401", SHORT).unrealized_pnl == 100.0
+    assert keeper.unrealized_pnl == 100.0
+
+
+def test_should_freeze_and_release_when_on_order_given_close_order(keeper: PositionKeeper):
+    keeper.on_trade(make_trade("T1", "0", "0", 3800.0, 2))
+    order = dict(FrontID=1, SessionID=1, OrderRef="1", InstrumentID="rb2401", Direction="1", CombOffsetFlag="3")
+    keeper.on_order(OrderField(**order, OrderStatus="3", VolumeTotal=2))
+    assert keeper.get("rb2401", LONG).available == 0
+    keeper.on_order(OrderField(**order, OrderStatus="1", VolumeTotal=1))
+    assert keeper.get("rb2401", LONG).frozen == 1
+    keeper.on_order(OrderField(**order, OrderStatus="5", VolumeTotal=1))
+    assert keeper.get("rb2401", LONG).frozen == 0
+
+
+def test_should_freeze_by_difference_when_on_order_given_order_seeded(keeper: PositionKeeper):
+    order = dict(FrontID=1, SessionID=1, OrderRef="1", InstrumentID="rb2401", Direction="0", CombOffsetFlag="1")
+    keeper.seed(
+        [InvestorPositionField(InstrumentID="rb2401", PosiDirection=SHORT, Position=3, TodayPosition=0, LongFrozen=3)],
+        [OrderField(**order, OrderStatus="3", VolumeTotal=3), OrderField(**{**order, "OrderRef": "2"}, OrderStatus="0", VolumeTotal=0)],
+    )
+    position = keeper.get("rb2401", SHORT)
+    assert position.frozen == 3
+    keeper.on_order(OrderField(**order, OrderStatus="1", VolumeTotal=2))
+    assert position.frozen == 2
+    keeper.on_order(OrderField(**order, OrderStatus="5", VolumeTotal=2))
+    assert (position.frozen, position.available) == (0, 3)
+
+
+def test_should_close_only_volume_held_when_on_trade_given_close_more_than_held(keeper: PositionKeeper):
+    keeper.on_trade(make_trade("T1", "0", "0", 3800.0, 1))
+    keeper.on_trade(make_trade("T2", "1", "3", 3810.0, 2))
+    position = keeper.get("rb2401", LONG)
+    assert (position.today, position.yesterday, position.open_cost) == (0, 0, 0.0)
+    assert position.realized_pnl == 100.0
+    keeper.on_trade(make_trade("T3", "0", "1", 3800.0, 1))
+    assert keeper.get("rb2401", SHORT).volume == 0
+
+
+def test_should_use_multiplier_1_when_instrument_unknown(keeper: PositionKeeper):
+    keeper.on_trade(TradeField(ExchangeID="DCE", TradeID="T1", InstrumentID="m2405", Direction="0", OffsetFlag="0", Price=3000.0, Volume=1))
+    assert keeper.get("m2405", LONG).multiplier == 1
@@ -0,0 +1,158 @@
+import json
+import os
+
+from openctp_client.openctp import mdapi
+from openctp_client.objects import *
+from openctp_client.stores import TickJournal
+from openctp_client.stores.tick_journal import HEADER, RECORD, JOURNAL_FIELDS, journal_path, index_path, index_log_path, _read_index
+
+
+def make_tick(instrument: str, price: float, trading_day: str = "20231212", update_time: str = "09:00:00", millisec: int = 0):
+    tick = mdapi.CThostFtdcDepthMarketDataField()
+    tick.InstrumentID = instrument
+    tick.ExchangeID = "SHFE"
+    tick.TradingDay = trading_day
+    tick.ActionDay = trading_day
+    tick.UpdateTime = update_time
+    tick.UpdateMillisec = millisec
+    tick.LastPrice = price
+    tick.Volume = 10
+    return tick
+
+
+def read_records(root: str, trading_day: str) -> list[dict]:
+    with open(journal_path(root, trading_day), "rb") as f:
+        data = f.read()
+    names = [name for name, _ in JOURNAL_FIELDS]
+    return [dict(zip(names, values)) for values in RECORD.iter_unpack(data[HEADER.size:])]
+
+
+def test_should_write_fixed_width_records_when_close(tmp_path):
+    journal = TickJournal(str(tmp_path))
+    journal.on_tick(make_tick("rb2401", 3800.0))
+    journal.on_tick(make_tick("ag2406", 5800.0, millisec=500))
+    journal.on_tick(make_tick("rb2401", 3801.0))
+    journal.close()
+    assert os.path.getsize(journal_path(str(tmp_path), "20231212")) == HEADER.size + 3 * RECORD.size
+    records = read_records(str(tmp_path), "20231212")
+    assert [record["Instrument"] for record in records] == [0, 1, 0]
+    assert [record["LastPrice"] for record in records] == [3800.0, 5800.0, 3801.0]
+    assert records[1]["Timestamp"] - records[0]["Timestamp"] == 500
+    assert records[0]["TradingDay"] == 20231212
+
+
+def test_should_index_instruments_and_blocks_when_close(tmp_path):
+    journal = TickJournal(str(tmp_path), block_size=2)
+    journal.on_tick(make_tick("rb2401", 3800.0, update_time="09:00:00"))
+    journal.on_tick(make_tick("rb2401", 3800.0, update_time="09:00:01"))
+    journal.on_tick(make_tick("ag2406", 5800.0, update_time="09:00:02"))
+    journal.close()
+    with open(index_path(str(tmp_path), "20231212")) as f:
+        index = json.load(f)
+    assert index["records"] == 3
+    assert index["instruments"] == [["rb2401", "SHFE"], ["ag2406", "SHFE"]]
+    assert [block[2] for block in index["blocks"]] == [[0], [1]]
+    assert index["blocks"][0][1] - index["blocks"][0][0] == 1000
+
+
+def test_should_rotate_when_on_tick_given_new_trading_day(tmp_path):
+    journal = TickJournal(str(tmp_path))
+    journal.on_tick(make_tick("rb2401", 3800.0, trading_day="20231212"))
+    journal.on_tick(make_tick("rb2401", 3801.0, trading_day="20231213"))
+    journal.on_tick(make_tick("rb2401", 3802.0, trading_day="20231212"))
+    journal.close()
+    assert len(read_records(str(tmp_path), "20231212")) == 1
+    assert [record["TradingDay"] for record in read_records(str(tmp_path), "20231213")] == [20231213, 20231212]
+
+
+def test_should_append_when_restarted_given_same_trading_day(tmp_path):
+    journal = TickJournal(str(tmp_path))
+    journal.on_tick(make_tick("rb2401", 3800.0))
+    journal.close()
+    journal = TickJournal(str(tmp_path))
+    journal.on_tick(make_tick("ag2406", 5800.0))
+    journal.on_tick(make_tick("rb2401", 3801.0))
+    journal.close()
+    assert [record["Instrument"] for record in read_records(str(tmp_path), "20231212")] == [0, 1, 0]
+
+
+def test_should_append_index_log_when_flush_and_fold_it_when_close(tmp_path):
+    root = str(tmp_path)
+    journal = TickJournal(root, block_size=2)
+    journal.on_tick(make_tick("rb2401", 3800.0))
+    journal.flush()
+    journal.on_tick(make_tick("ag2406", 5800.0, millisec=500))
+    journal.on_tick(make_tick("rb2401", 3801.0, update_time="09:00:01"))
+    journal.flush()
+    # the index file is left as it was written on rotation, the flushes are only appended to the log
+    with open(index_path(root, "20231212")) as f:
+        assert json.load(f)["records"] == 0
+    with open(index_log_path(root, "20231212")) as f:
+        assert len(f.readlines()) == 2
+    index = _read_index(root, "20231212")
+    assert index["records"] == 3
+    assert index["instruments"] == [["rb2401", "SHFE"], ["ag2406", "SHFE"]]
+    assert [block[2] for block in index["blocks"]] == [[0, 1], [0]]
+    journal.close()
+    assert os.path.exists(index_log_path(root, "20231212")) is False
+    assert _read_index(root, "20231212") == index
+
+
+def test_should_continue_from_index_log_when_restarted_given_not_closed(tmp_path):
+    root = str(tmp_path)
+    journal = TickJournal(root)
+    journal.on_tick(make_tick("rb2401", 3800.0))
+    journal.flush()
+    # records written but not indexed when the process dies are dropped
+    journal.on_tick(make_tick("ag2406", 5800.0))
+    journal._write_pending()
+    journal._file.flush()
+    journal = TickJournal(root)
+    journal.on_tick(make_tick("au2406", 480.0))
+    journal.close()
+    assert [record["Instrument"] for record in read_records(root, "20231212")] == [0, 1]
+    assert _read_index(root, "20231212")["instruments"] == [["rb2401", "SHFE"], ["au2406", "SHFE"]]
+
+
+def test_should_write_in_background_when_attached(tmp_path, md_client):
+    journal = TickJournal(str(tmp_path), flush_interval=0.01)
+    journal.attach(md_client)
+    md_client.OnRtnDepthMarketData(make_tick("rb2401", 3800.0))
+    journal.detach(md_client)
+    journal.close()
+    assert journal.stats["records"] == 1
+    assert journal.stats["pending"] == 0
+
+
+def test_should_record_field_when_on_tick_given_depth_market_data_field(tmp_path):
+    journal = TickJournal(str(tmp_path))
+    journal.on_tick(DepthMarketDataField(InstrumentID="rb2401", TradingDay="20231212", UpdateTime="21:00:00", LastPrice=3800.0))
+    journal.on_tick(DepthMarketDataField(InstrumentID="rb2401", LastPrice=3800.0))
+    journal.close()
+    assert len(read_records(str(tmp_path), "20231212")) == 1
+    assert journal.stats["dropped"] == 1
+
+
+def test_should_drop_tick_and_keep_index_when_flush_given_empty_update_time(tmp_path):
+    journal = TickJournal(str(tmp_path))
+    journal.on_tick(make_tick("rb2401", 3800.0))
+    journal.on_tick(make_tick("ag2406", 5800.0, update_time=""))
+    journal.on_tick(make_tick("rb2401", 3801.0))
+    journal.flush()
+    assert journal.stats["dropped"] == 1
+    journal.close()
+    records = read_records(str(tmp_path), "20231212")
+    assert [record["LastPrice"] for record in records] == [3800.0, 3801.0]
+    assert _read_index(str(tmp_path), "20231212")["records"] == 2
+    assert _read_index(str(tmp_path), "20231212")["instruments"] == [["rb2401", "SHFE"]]
+
+
+def test_should_reopen_journal_when_on_tick_after_close(tmp_path):
+    journal = TickJournal(str(tmp_path))
+    journal.on_tick(make_tick("rb2401", 3800.0))
+    journal.close()
+    assert journal.trading_day is None
+    journal.on_tick(make_tick("rb2401", 3801.0))
+    journal.flush()
+    journal.close()
+    assert [record["LastPrice"] for record in read_records(str(tmp_path), "20231212")] == [3800.0, 3801.0]
@@ -0,0 +1,89 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from openctp_client.openctp import mdapi
+from openctp_client.objects import *
+from openctp_client.stores import TickJournal, TickJournalReader, JOURNAL_DTYPE
+from openctp_client.stores.tick_journal import HEADER, journal_path
+from openctp_client.stores.tick_store import day_timestamp
+
+
+def make_tick(instrument: str, price: float, trading_day: str = "20231212", update_time: str = "09:00:00", millisec: int = 0):
+    tick = mdapi.CThostFtdcDepthMarketDataField()
+    tick.InstrumentID = instrument
+    tick.ExchangeID = "SHFE"
+    tick.TradingDay = trading_day
+    tick.ActionDay = trading_day
+    tick.UpdateTime = update_time
+    tick.UpdateMillisec = millisec
+    tick.LastPrice = price
+    tick.Volume = 10
+    return tick
+
+
+def write_journal(root: str, block_size: int = 2) -> None:
+    journal = TickJournal(root, block_size=block_size)
+    journal.on_tick(make_tick("rb2401", 3800.0, update_time="09:00:00"))
+    journal.on_tick(make_tick("rb2401", 3801.0, update_time="09:00:01", millisec=500))
+    journal.on_tick(make_tick("ag2406", 5800.0, update_time="09:00:02"))
+    journal.on_tick(make_tick("ag2406", 5801.0, update_time="09:00:03"))
+    journal.on_tick(make_tick("rb2401", 3802.0, update_time="09:00:04"))
+    journal.close()
+
+
+def test_should_map_records_when_init(tmp_path):
+    write_journal(str(tmp_path))
+    reader = TickJournalReader(str(tmp_path), "20231212")
+    assert len(reader) == 5
+    assert isinstance(reader.records, np.memmap)
+    assert reader.records.dtype == JOURNAL_DTYPE
+    assert reader.records["LastPrice"].tolist() == [3800.0, 3801.0, 5800.0, 5801.0, 3802.0]
+    assert reader.instruments == ["rb2401", "ag2406"]
+    assert TickJournalReader.trading_days(str(tmp_path)) == ["20231212"]
+
+
+def test_should_select_records_of_instrument_when_instrument(tmp_path):
+    write_journal(str(tmp_path))
+    reader = TickJournalReader(str(tmp_path), "20231212")
+    assert reader.blocks("ag2406") == [1]
+    assert reader.blocks("rb2401") == [0, 2]
+    assert reader.instrument("rb2401")["LastPrice"].tolist() == [3800.0, 3801.0, 3802.0]
+    assert len(reader.instrument("unknown")) == 0
+
+
+def test_should_select_records_in_range_when_between(tmp_path):
+    write_journal(str(tmp_path))
+    reader = TickJournalReader(str(tmp_path), "20231212")
+    nine = day_timestamp("20231212") + 9 * 3600 * 1000
+    assert reader.blocks(start=nine + 2000, end=nine + 3000) == [1]
+    assert reader.between(nine + 1500, nine + 3000)["LastPrice"].tolist() == [3801.0, 5800.0, 5801.0]
+    assert reader.select("ag2406", start=nine + 3000)["LastPrice"].tolist() == [5801.0]
+
+
+def test_should_yield_fields_when_fields(tmp_path):
+    write_journal(str(tmp_path))
+    reader = TickJournalReader(str(tmp_path), "20231212")
+    fields = list(reader.fields(reader.instrument("rb2401")))
+    assert isinstance(fields[0], DepthMarketDataField)
+    assert [field.LastPrice for field in fields] == [3800.0, 3801.0, 3802.0]
+    assert fields[1].InstrumentID == "rb2401"
+    assert fields[1].ExchangeID == "SHFE"
+    assert fields[1].TradingDay == "20231212"
+    assert fields[1].ActionDay == "20231212"
+    assert fields[1].UpdateTime == "09:00:01"
+    assert fields[1].UpdateMillisec == 500
+    assert fields[1].Volume == 10
+
+
+def test_should_raise_value_error_when_init_given_no_index(tmp_path):
+    with pytest.raises(ValueError):
+        TickJournalReader(str(tmp_path), "20231212")
+
+
+def test_should_raise_value_error_when_init_given_bad_header(tmp_path):
+    write_journal(str(tmp_path))
+    with open(journal_path(str(tmp_path), "20231212"), "r+b") as f:
+        f.write(HEADER.pack(b"XXXX", 1, 0))
+    with pytest.raises(ValueError):
+        TickJournalReader(str(tmp_path), "20231212")
@@ -0,0 +1,94 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from openctp_client.openctp import mdapi
+from openctp_client.objects import *
+from openctp_client.stores import TickStore, TICK_DTYPE
+
+
+def make_tick(instrument: str, price: float, update_time: str = "09:00:00", millisec: int = 0):
+    tick = mdapi.CThostFtdcDepthMarketDataField()
+    tick.InstrumentID = instrument
+    tick.ActionDay = "20231212"
+    tick.UpdateTime = update_time
+    tick.UpdateMillisec = millisec
+    tick.LastPrice = price
+    tick.Volume = 10
+    tick.BidPrice1 = price - 1
+    tick.AskPrice1 = price + 1
+    return tick
+
+
+def test_should_append_ticks_per_instrument_when_on_tick():
+    store = TickStore()
+    store.on_tick(make_tick("rb2401", 3800.0))
+    store.on_tick(make_tick("rb2401", 3801.0, millisec=500))
+    store.on_tick(make_tick("ag2312", 5800.0))
+    
+    ticks = store.view("rb2401")
+    assert ticks.dtype == TICK_DTYPE
+    assert len(ticks) == 2
+    assert ticks["LastPrice"].tolist() == [3800.0, 3801.0]
+    assert ticks["AskPrice1"][1] == 3802.0
+    assert ticks["Timestamp"][1] - ticks["Timestamp"][0] == 500
+    assert sorted(store.instruments) == ["ag2312", "rb2401"]
+    assert len(store) == 3
+
+
+def test_should_build_timestamp_in_beijing_time_when_on_tick():
+    store = TickStore()
+    store.on_tick(make_tick("rb2401", 3800.0, "09:00:01", 250))
+    # 2023-12-12 09:00:01.250 +08:00
+    assert store.view("rb2401")["Timestamp"][0] == 1702342801250
+
+
+def test_should_keep_ticks_when_grow():
+    store = TickStore(chunk_size=2)
+    for i in range(5):
+        store.on_tick(make_tick("rb2401", 3800.0 + i))
+    assert store.view("rb2401")["LastPrice"].tolist() == [3800.0, 3801.0, 3802.0, 3803.0, 3804.0]
+
+
+def test_should_double_capacity_when_grow():
+    store = TickStore(chunk_size=2)
+    for i in range(9):
+        store.on_tick(make_tick("rb2401", 3800.0 + i))
+    assert len(store._buffers["rb2401"].array) == 16
+
+
+def test_should_drop_tick_when_on_tick_given_empty_update_time_or_day():
+    store = TickStore()
+    store.on_tick(make_tick("rb2401", 3800.0, update_time=""))
+    tick = make_tick("rb2401", 3801.0)
+    tick.ActionDay = ""
+    store.on_tick(tick)
+    store.on_tick(make_tick("rb2401", 3802.0))
+    assert store.view("rb2401")["LastPrice"].tolist() == [3802.0]
+    assert store.dropped == 2
+
+
+def test_should_return_zero_copy_view_when_view():
+    store = TickStore()
+    store.on_tick(make_tick("rb2401", 3800.0))
+    assert np.shares_memory(store.view("rb2401"), store.view("rb2401")) is True
+    assert len(store.view("ag2312")) == 0
+
+
+def test_should_keep_snapshot_when_clear():
+    store = TickStore()
+    store.on_tick(make_tick("rb2401", 3800.0))
+    snapshot = store.snapshot()
+    store.clear()
+    assert len(store) == 0
+    assert snapshot["rb2401"]["LastPrice"].tolist() == [3800.0]
+
+
+def test_should_store_ticks_when_attach_to_md_api(md_client, spi_callback):
+    md_client.set_spi_callback(CtpMethod.OnRtnDepthMarketData, spi_callback)
+    store = TickStore()
+    store.attach(md_client)
+    md_client.OnRtnDepthMarketData(make_tick("rb2401", 3800.0))
+    store.detach(md_client)
+    md_client.OnRtnDepthMarketData(make_tick("rb2401", 3801.0))
+    assert store.view("rb2401")["LastPrice"].tolist() == [3800.0]
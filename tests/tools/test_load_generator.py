@@ -0,0 +1,55 @@
+from openctp_client.apis import MdAPI
+from openctp_client.openctp import mdapi
+from openctp_client.tools import LoadGenerator, LoadProfile
+
+
+def test_should_multiply_rate_when_rate_at_given_burst():
+    profile = LoadProfile.session_opens(100, multiplier=10, burst=1, period=10)
+    assert profile.rate_at(0.5) == 1000
+    assert profile.rate_at(2) == 100
+    assert profile.rate_at(5.5) == 1000
+
+
+def test_should_report_latency_when_run_given_tracked_callback(md_client: MdAPI):
+    generator = LoadGenerator(md_client, instruments=3, profile=500)
+    ticks = []
+    md_client.raw_callback = generator.track(ticks.append)
+    report = generator.run(0.2)
+    assert report["sent"] > 0
+    assert report["received"] == report["sent"]
+    assert report["backlog"] == 0
+    assert 0 < report["p50_us"] <= report["p99_us"] <= report["max_us"]
+    assert {tick.InstrumentID for tick in ticks} == {"sim0000", "sim0001", "sim0002"}
+
+
+def test_should_return_max_rate_when_find_max_rate_given_synchronous_callback(md_client: MdAPI):
+    generator = LoadGenerator(md_client, instruments=1)
+    md_client.raw_callback = generator.track()
+    rate, reports = generator.find_max_rate(start=100, step=0.1, max_rate=200)
+    assert rate == 200
+    assert len(reports) == 2
+
+
+def test_should_return_zero_when_find_max_rate_given_callback_not_keeping_up(md_client: MdAPI):
+    generator = LoadGenerator(md_client, instruments=1)
+    # the ticks are received by nobody, like a queue never consumed
+    md_client.raw_callback = lambda tick: None
+    rate, reports = generator.find_max_rate(start=100, step=0.1)
+    assert rate == 0
+    assert reports[0]["backlog"] == reports[0]["sent"]
+
+
+def test_should_ignore_ticks_of_last_run_when_record_given_late_delivery(md_client: MdAPI):
+    generator = LoadGenerator(md_client, instruments=2, profile=500)
+    late = []
+    # the ticks are held like a queue still having them when the next run starts
+    md_client.raw_callback = lambda tick: late.append(tick.Volume)
+    generator.run(0.05, drain_timeout=0)
+    md_client.raw_callback = generator.track()
+    report = generator.run(0.05)
+    tick = mdapi.CThostFtdcDepthMarketDataField()
+    for sequence in late:
+        tick.Volume = sequence
+        generator.record(tick)
+    assert late and min(late) == 0
+    assert generator.received == report["received"] == report["sent"]
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from openctp_client.apis import MdAPI, TdAPI
+from openctp_client.openctp import mdapi
+from openctp_client.objects import *
+from openctp_client.objects.responses import *
+from openctp_client.stores import TickJournal, TickJournalReader
+from openctp_client.tools import Replayer
+
+
+def make_tick(instrument: str, price: float, update_time: str):
+    tick = mdapi.CThostFtdcDepthMarketDataField()
+    tick.InstrumentID = instrument
+    tick.ExchangeID = "SHFE"
+    tick.TradingDay = "20231212"
+    tick.ActionDay = "20231212"
+    tick.UpdateTime = update_time
+    tick.UpdateMillisec = 0
+    tick.LastPrice = price
+    return tick
+
+
+@pytest.fixture
+def reader(tmp_path):
+    journal = TickJournal(str(tmp_path), block_size=2)
+    journal.on_tick(make_tick("rb2401", 3800.0, "09:00:00"))
+    journal.on_tick(make_tick("ag2406", 5800.0, "09:00:01"))
+    journal.on_tick(make_tick("rb2401", 3801.0, "09:00:02"))
+    journal.close()
+    return TickJournalReader(str(tmp_path), "20231212")
+
+
+def test_should_call_md_callback_when_replay_journal(md_client: MdAPI, spi_callback, reader: TickJournalReader):
+    md_client.callback = spi_callback
+    stats = Replayer(md_client).replay_journal(reader)
+    assert stats["events"] == 3
+    ticks = [call.args[0].DepthMarketData for call in spi_callback.call_args_list]
+    assert [tick.LastPrice for tick in ticks] == [3800.0, 5800.0, 3801.0]
+    assert ticks[2].InstrumentID == "rb2401"
+    assert ticks[2].UpdateTime == "09:00:02"
+
+
+def test_should_call_tick_listener_when_replay_journal_given_instrument(md_client: MdAPI, mocker, reader: TickJournalReader):
+    listener = mocker.Mock()
+    md_client.add_tick_listener(listener)
+    Replayer(md_client).replay_journal(reader, "rb2401")
+    assert [call.args[0].LastPrice for call in listener.call_args_list] == [3800.0, 3801.0]
+
+
+def test_should_sleep_until_event_time_when_replay_given_speed(md_client: MdAPI, spi_callback, mocker, reader: TickJournalReader):
+    md_client.callback = spi_callback
+    now = [0.0]
+    sleep = mocker.Mock(side_effect=lambda seconds: now.__setitem__(0, now[0] + seconds))
+    replayer = Replayer(md_client, speed=2, clock=lambda: now[0], sleep=sleep)
+    replayer.replay_journal(reader)
+    assert [call.args[0] for call in sleep.call_args_list] == [0.5, 0.5]
+    assert spi_callback.call_count == 3
+
+
+def test_should_merge_td_events_when_replay_journal_given_events(md_client: MdAPI, td_client: TdAPI, spi_callback, reader: TickJournalReader):
+    md_client.callback = spi_callback
+    td_client.callback = spi_callback
+    trade = TradeField(InstrumentID="rb2401", TradeID="1", Price=3800.0, Volume=1)
+    timestamp = reader.records["Timestamp"][0] + 500
+    Replayer(md_client, td_client).replay_journal(reader, events=[(timestamp, CtpMethod.OnRtnTrade, (trade,))])
+    methods = [call.args[0].method for call in spi_callback.call_args_list]
+    assert methods == [CtpMethod.OnRtnDepthMarketData, CtpMethod.OnRtnTrade, CtpMethod.OnRtnDepthMarketData, CtpMethod.OnRtnDepthMarketData]
+    assert spi_callback.call_args_list[1].args[0].Trade.TradeID == "1"
+
+
+def test_should_stop_when_stop(md_client: MdAPI, reader: TickJournalReader):
+    replayer = Replayer(md_client)
+    md_client.callback = lambda rsp: replayer.stop()
+    stats = replayer.replay_journal(reader)
+    assert stats["events"] == 1
+
+
+def test_should_raise_value_error_when_replay_given_td_event_without_td_api(md_client: MdAPI):
+    with pytest.raises(ValueError):
+        Replayer(md_client).replay([(0, CtpMethod.OnRtnTrade, (TradeField(),))])
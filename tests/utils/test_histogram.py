@@ -0,0 +1,74 @@
+import logging
+
+import pytest
+
+from openctp_client.objects import CtpMethod
+from openctp_client.utils import Histogram, LatencyRecorder
+
+
+def test_should_count_exactly_when_record_given_small_values():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.record(value)
+    assert histogram.count == 100
+    assert histogram.min == 1
+    assert histogram.max == 100
+    assert histogram.mean == 50.5
+    assert histogram.percentiles((50, 99, 100)) == {50: 50, 99: 99, 100: 100}
+
+
+def test_should_be_within_precision_when_value_at_percentile_given_large_values():
+    histogram = Histogram(precision=8)
+    values = [1000 + value * 997 for value in range(10000)]
+    for value in values:
+        histogram.record(value)
+    for percentile in (50, 90, 99, 99.9):
+        exact = values[int(percentile / 100 * len(values) + 0.5) - 1]
+        assert exact <= histogram.value_at_percentile(percentile) <= exact * (1 + 2 ** -7)
+    assert histogram.value_at_percentile(100) == values[-1]
+
+
+def test_should_clamp_to_highest_when_record_given_value_out_of_range():
+    histogram = Histogram(highest=1000)
+    histogram.record(-1)
+    histogram.record(10 ** 9)
+    assert histogram.min == 0
+    assert histogram.max == 1000
+    assert histogram.value_at_percentile(100) == 1000
+
+
+def test_should_add_counts_when_merge():
+    a, b = Histogram(), Histogram()
+    a.record(10)
+    b.record(5)
+    b.record(20)
+    a.merge(b)
+    assert (a.count, a.min, a.max) == (3, 5, 20)
+    assert a.copy().percentiles((50,)) == {50: 10}
+    a.reset()
+    assert (a.count, a.max, a.value_at_percentile(50)) == (0, 0, 0)
+
+
+def test_should_report_microseconds_by_method_and_stage_when_snapshot():
+    recorder = LatencyRecorder()
+    for value in (1000, 2000, 3000):
+        recorder.record(CtpMethod.OnRtnDepthMarketData, "queueing", value)
+    recorder.record(CtpMethod.OnRtnOrder, "handler", 5000)
+    snapshot = recorder.snapshot()
+    assert snapshot["OnRtnDepthMarketData"]["queueing"]["count"] == 3
+    assert snapshot["OnRtnDepthMarketData"]["queueing"]["p50_us"] == pytest.approx(2.0, rel=2 ** -7)
+    assert snapshot["OnRtnDepthMarketData"]["queueing"]["max_us"] == 3.0
+    assert snapshot["OnRtnOrder"]["handler"]["p99.9_us"] == 5.0
+    recorder.reset()
+    assert recorder.snapshot() == {}
+
+
+def test_should_dump_snapshot_periodically_when_start_dump(caplog):
+    recorder = LatencyRecorder()
+    recorder.record(CtpMethod.OnRtnTrade, "total", 1500)
+    with caplog.at_level(logging.INFO, logger="openctp_client.utils.histogram"):
+        recorder.start_dump(0.01)
+        while "OnRtnTrade total count 1" not in caplog.text:
+            pass
+        recorder.stop_dump()
+    assert "p99 1.5us" in caplog.text
@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+
+from openctp_client.utils import enable_background_logging, disable_background_logging
+
+
+class ListHandler(logging.Handler):
+    
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: list[str] = []
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+
+
+def test_should_write_logs_by_handler_when_enable_background_logging():
+    handler = ListHandler()
+    listener = enable_background_logging(handler, level=logging.INFO)
+    
+    logging.getLogger("openctp_client.apis.md_api").info("login to %s", "md")
+    logging.getLogger("openctp_client.apis.md_api").debug("skipped %s", "debug")
+    disable_background_logging(listener)
+    
+    assert handler.messages == ["login to md"]
+
+
+def test_should_stop_writing_logs_when_disable_background_logging():
+    handler = ListHandler()
+    listener = enable_background_logging(handler)
+    disable_background_logging(listener)
+    
+    logging.getLogger("openctp_client").warning("after disabled")
+    
+    assert handler.messages == []
+    assert logging.getLogger("openctp_client").propagate is True
+
+
+def test_should_restore_level_and_handlers_when_disable_background_logging():
+    logger = logging.getLogger("openctp_client")
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    try:
+        listener = enable_background_logging(ListHandler(), level=logging.DEBUG)
+        assert handler not in logger.handlers
+        disable_background_logging(listener)
+        assert logger.handlers == [handler]
+        assert logger.level == logging.WARNING
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+
+
+def test_should_log_at_info_level_when_deprecated_log(md_client, caplog):
+    with pytest.warns(DeprecationWarning):
+        with caplog.at_level(logging.INFO, logger="openctp_client.apis.md_api"):
+            md_client.log("login", "md", sep=":")
+    assert caplog.messages == ["login:md"]
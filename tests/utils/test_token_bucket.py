@@ -0,0 +1,36 @@
+from openctp_client.utils.token_bucket import TokenBucket
+
+
+class FakeClock(object):
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_should_acquire_until_empty_when_try_acquire():
+    bucket = TokenBucket(rate=1, capacity=2, clock=FakeClock())
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is False
+
+
+def test_should_refill_by_rate_when_time_elapsed():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=1, clock=clock)
+    bucket.try_acquire()
+    assert bucket.wait_time() == 0.5
+    clock.now = 0.25
+    assert bucket.wait_time() == 0.25
+    clock.now = 10
+    assert bucket.tokens == 1
+    assert bucket.try_acquire() is True
+
+
+def test_should_wait_a_whole_token_when_drain():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+    bucket.drain()
+    assert bucket.try_acquire() is False
+    assert bucket.wait_time() == 1